@@ -3,11 +3,11 @@ import os
 import tempfile
 from dotenv import load_dotenv
 
+# 加载.env中的配置（需在导入配置模块之前）
+load_dotenv()
 
 # 导入自定义模块
-from src.document_processor.processor import DocumentProcessor
-from src.models.model_factory import ModelFactory
-from src.vector_store.vector_store import VectorStore
+from src.config import SERVICE_CONFIG
 from src.utils.helpers import get_available_models
 
 # 页面配置
@@ -25,11 +25,19 @@ if "conversation_history" not in st.session_state:
 if "current_document" not in st.session_state:
     st.session_state.current_document = None
 
-if "vector_store" not in st.session_state:
-    st.session_state.vector_store = None
+@st.cache_resource
+def get_backend():
+    """知识库后端在所有会话之间共享，每个知识库在进程内只加载一次
 
-if "document_processor" not in st.session_state:
-    st.session_state.document_processor = DocumentProcessor()
+    配置了服务地址时通过HTTP调用知识库服务（瘦客户端），否则在当前进程内直接加载知识库
+    """
+    if SERVICE_CONFIG["api_url"]:
+        from src.server.client import KnowledgeBaseClient
+        return KnowledgeBaseClient(SERVICE_CONFIG["api_url"])
+    from src.server.knowledge_base import KnowledgeBaseService
+    return KnowledgeBaseService()
+
+backend = get_backend()
 
 # 侧边栏
 with st.sidebar:
@@ -45,39 +53,43 @@ with st.sidebar:
         help="选择用于回答问题的大语言模型"
     )
     
+    # 知识库选择
+    knowledge_base = st.text_input(
+        "知识库",
+        value="default",
+        help="上传的文档导入该知识库，问题在该知识库的全部文档中检索；所有用户共享同名知识库"
+    )
+    
     # 文档上传
     uploaded_file = st.file_uploader(
         "上传文档", 
         type=["pdf", "docx", "txt"], 
-        help="支持PDF、Word和TXT格式"
+        help="支持PDF、Word和TXT格式，同名文档再次上传时替换原有内容"
     )
     
     # 上传文档处理
-    if uploaded_file and (st.session_state.current_document == uploaded_file.name):
+    if uploaded_file and st.session_state.current_document != (knowledge_base, uploaded_file.name):
         with st.spinner("正在处理文档..."):
-            # 保存上传的文件到临时目录
+            # 保存上传的文件到临时目录，文件名即文档的来源
             temp_dir = tempfile.mkdtemp()
-          
+            temp_path = os.path.join(temp_dir, uploaded_file.name)
             with open(temp_path, "wb") as f:
                 f.write(uploaded_file.getvalue())
             
-            # 处理文档
+            # 导入知识库
             try:
-                document_processor = st.session_state.document_processor
-                document_chunks = document_processor.process_document(temp_path)
-                
-                # 创建向量存储
-                vector_store = VectorStore()
-                vector_store.add_documents(document_chunks)
-                
-                # 更新会话状态
-                st.session_state.current_document = uploaded_file.name
-                st.session_state.vector_store = vector_store
+                result = backend.ingest(knowledge_base, temp_path)
+                st.session_state.current_document = (knowledge_base, uploaded_file.name)
                 st.session_state.conversation_history = []
                 
-                st.success(f"文档 '{uploaded_file.name}' 已成功处理！")
+                st.success(f"文档 '{uploaded_file.name}' 已成功导入知识库 '{knowledge_base}'！")
+                st.caption(f"新增 {result['added']} 个文本块，移除 {result['removed']} 个，"
+                           f"未变化 {result['unchanged']} 个；知识库共 {result['documents']} 个文本块")
             except Exception as e:
                 st.error(f"处理文档时出错: {str(e)}")
+            finally:
+                os.remove(temp_path)
+                os.rmdir(temp_dir)
     
     # 高级设置折叠面板
     with st.expander("高级设置"):
@@ -97,7 +109,56 @@ with st.sidebar:
             step=0.1,
             help="控制回答的创造性，较低的值使回答更确定，较高的值使回答更多样化"
         )
-    
+        
+        bypass_cache = st.checkbox(
+            "跳过回答缓存",
+            value=False,
+            help="总是重新调用大语言模型生成回答，不复用相同或相似问题的历史回答"
+        )
+        
+        try:
+            stats = backend.cache_stats()["semantic"]
+            if stats is not None:
+                st.caption(f"语义缓存：{stats['size']} 条，命中率 {stats['hit_rate']:.0%}")
+        except Exception as e:
+            st.caption(f"无法获取缓存统计: {str(e)}")
+
+    # 性能调试面板：各阶段（文档解析、分块、嵌入、检索、提示构建、首字延迟、流式输出）的耗时
+    with st.expander("性能调试"):
+        if not SERVICE_CONFIG["api_url"]:
+            from src.utils.tracing import get_tracer
+            tracer = get_tracer()
+            tracer.enabled = st.checkbox(
+                "记录各阶段耗时",
+                value=tracer.enabled,
+                help="记录文档处理、检索、提示构建和模型生成各阶段的耗时，关闭时几乎没有额外开销"
+            )
+            if st.button("清空耗时统计"):
+                tracer.reset()
+        try:
+            traces = backend.trace_stats()
+            if not traces["enabled"]:
+                st.caption("未启用耗时记录（知识库服务需设置环境变量DOCUMIND_TRACING=1）")
+            elif traces["stages"]:
+                st.dataframe(
+                    [{"阶段": row["stage"], "次数": row["count"], "平均(ms)": row["mean_ms"],
+                      "p50(ms)": row["p50_ms"], "p95(ms)": row["p95_ms"], "错误": row["errors"]}
+                     for row in traces["stages"]],
+                    hide_index=True
+                )
+                st.caption("最近的操作")
+                st.dataframe(
+                    [{"阶段": span["stage"], "耗时(ms)": span["duration_ms"],
+                      "属性": ", ".join(f"{key}={value}" for key, value in span["attributes"].items()),
+                      "错误": span["error"] or ""}
+                     for span in traces["spans"][:20]],
+                    hide_index=True
+                )
+            else:
+                st.caption("暂无记录")
+        except Exception as e:
+            st.caption(f"无法获取耗时统计: {str(e)}")
+
     # 清除对话按钮
     if st.button("清除对话历史"):
         st.session_state.conversation_history = []
@@ -109,9 +170,16 @@ with st.sidebar:
 # 主界面
 st.title("智能文档分析与问答系统")
 
-# 显示当前文档信息
-if st.session_state.current_document:
-    st.info(f"当前文档: {st.session_state.current_document}")
+# 显示当前知识库信息
+try:
+    store_info = next((store for store in backend.list_stores() if store["name"] == knowledge_base), None)
+except Exception as e:
+    store_info = None
+    st.error(f"无法连接知识库服务: {str(e)}")
+
+if store_info:
+    documents = f"（{store_info['documents']} 个文本块）" if store_info["documents"] is not None else ""
+    st.info(f"当前知识库: {knowledge_base}{documents}")
 else:
     st.warning("请先上传文档以开始对话")
 
@@ -123,7 +191,7 @@ for i, (question, answer) in enumerate(st.session_state.conversation_history):
         st.write(answer)
 
 # 问题输入
-if st.session_state.current_document:
+if store_info:
     question = st.chat_input("请输入您的问题")
     
     if question:
@@ -135,27 +203,37 @@ if st.session_state.current_document:
         with st.chat_message("assistant"):
             with st.spinner("思考中..."):
                 try:
-                    # 从向量存储中检索相关文档
-                    relevant_docs = st.session_state.vector_store.similarity_search(question, k=top_k)
-                    
-                    # 初始化模型
                     model_info = available_models[selected_model]
-                    model = ModelFactory.get_model(
-                        model_type=model_info["type"],
-                        model_name=model_info["name"],
-                        temperature=temperature
-                    )
-
-                    # 生成回答
+                    
+                    # 检索相关文档并流式生成回答
                     answer_container = st.empty()
                     full_answer = ""
-
-                    # 流式输出
-                    for token in model.generate_stream(question, relevant_docs):
-                        full_answer += token
-                        answer_container.markdown(full_answer + "▌")
+                    context = {}
+                    done = {}
+                    
+                    for event in backend.stream_answer(
+                        knowledge_base,
+                        question,
+                        model_type=model_info["type"],
+                        model_name=model_info["name"],
+                        temperature=temperature,
+                        top_k=top_k,
+                        bypass_cache=bypass_cache
+                    ):
+                        if event["type"] == "sources":
+                            context = event["context"]
+                        elif event["type"] == "token":
+                            full_answer += event["text"]
+                            answer_container.markdown(full_answer + "▌")
+                        elif event["type"] == "done":
+                            done = event
                     
                     answer_container.markdown(full_answer)
+                    if context.get("discarded_tokens"):
+                        st.caption(f"上下文 {context['packed_tokens']} 词元（预算 {context['budget']}），"
+                                   f"去除重叠 {context['redundant_tokens']}、超出预算 {context['over_budget_tokens']} 词元")
+                    if done.get("cache") == "semantic":
+                        st.caption(f"相似问题的缓存回答（相似度 {done['similarity']:.2f}）")
                     
                     # 保存对话历史
                     st.session_state.conversation_history.append((question, full_answer))
@@ -0,0 +1,119 @@
+"""近似最近邻索引的召回率与延迟报告
+
+以精确的flat索引为基准，对比IVF-Flat、IVF-PQ、HNSW在不同查询参数下的
+recall@k与单条查询延迟，用于为每个知识库选择合适的索引配置。
+
+用法：
+    # 使用合成的聚类数据
+    python benchmarks/bench_ann_recall.py --num-vectors 200000 --k 10
+    # 使用已保存知识库中的向量
+    python benchmarks/bench_ann_recall.py --store-dir knowledge_base/vector_stores --store-name my_kb
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import faiss
+
+from src.vector_store.index_factory import build_index, make_search_params
+from src.vector_store.vector_store import VectorStore
+
+# 待评估的索引配置：(索引类型, 查询参数名, 查询参数取值)
+SWEEPS = [
+    ("ivf_flat", "nprobe", [1, 4, 16, 64]),
+    ("ivf_pq", "nprobe", [1, 4, 16, 64]),
+    ("hnsw", "ef_search", [16, 32, 64, 128, 256])
+]
+
+
+def synthetic_vectors(num_vectors: int, dim: int, num_clusters: int = 100, seed: int = 0) -> np.ndarray:
+    """生成带聚类结构的归一化向量，比均匀随机向量更接近真实嵌入分布"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((num_clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, num_clusters, num_vectors)
+    vectors = centers[labels] + 0.5 * rng.standard_normal((num_vectors, dim)).astype(np.float32)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def load_store_vectors(directory: str, name: str) -> np.ndarray:
+    """读取已保存知识库中的全部向量"""
+    store = VectorStore.load(directory, name)
+    return store.get_embeddings()
+
+
+def timed_search(index: faiss.Index, queries: np.ndarray, k: int, params=None):
+    """逐条查询并记录每条查询的延迟（毫秒）"""
+    all_indices = np.empty((len(queries), k), dtype=np.int64)
+    latencies = np.empty(len(queries))
+    for i in range(len(queries)):
+        start = time.perf_counter()
+        _, indices = index.search(queries[i:i + 1], k, params=params)
+        latencies[i] = (time.perf_counter() - start) * 1000
+        all_indices[i] = indices[0]
+    return all_indices, latencies
+
+
+def recall_at_k(result: np.ndarray, truth: np.ndarray) -> float:
+    """计算recall@k"""
+    hits = sum(len(set(r) & set(t)) for r, t in zip(result, truth))
+    return hits / truth.size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ANN索引召回率/延迟报告")
+    parser.add_argument("--num-vectors", type=int, default=100000, help="合成向量数量")
+    parser.add_argument("--embedding-dim", type=int, default=768, help="合成向量维度")
+    parser.add_argument("--num-queries", type=int, default=200, help="查询数量")
+    parser.add_argument("--k", type=int, default=10, help="recall@k中的k")
+    parser.add_argument("--nlist", type=int, default=256, help="IVF聚类中心数量")
+    parser.add_argument("--pq-m", type=int, default=16, help="PQ子向量数量")
+    parser.add_argument("--hnsw-m", type=int, default=32, help="HNSW邻居数量")
+    parser.add_argument("--store-dir", help="已保存知识库的目录")
+    parser.add_argument("--store-name", help="已保存知识库的名称")
+    args = parser.parse_args()
+
+    if args.store_dir and args.store_name:
+        vectors = load_store_vectors(args.store_dir, args.store_name)
+    else:
+        vectors = synthetic_vectors(args.num_vectors, args.embedding_dim)
+    dim = vectors.shape[1]
+
+    # 查询取自库内向量并加入少量噪声
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.integers(0, len(vectors), args.num_queries)]
+    queries = queries + 0.05 * rng.standard_normal(queries.shape).astype(np.float32)
+    queries = np.ascontiguousarray(queries, dtype=np.float32)
+
+    flat = build_index("flat", dim)
+    flat.add(vectors)
+    truth, flat_latencies = timed_search(flat, queries, args.k)
+
+    print(f"向量数量: {len(vectors)}, 维度: {dim}, 查询数量: {len(queries)}, k={args.k}")
+    print(f"{'索引':<10}{'参数':<16}{'recall@k':>10}{'p50(ms)':>10}{'p99(ms)':>10}{'构建(s)':>10}")
+    print(f"{'flat':<10}{'-':<16}{1.0:>10.3f}{np.percentile(flat_latencies, 50):>10.3f}"
+          f"{np.percentile(flat_latencies, 99):>10.3f}{0.0:>10.1f}")
+
+    for index_type, param_name, values in SWEEPS:
+        start = time.perf_counter()
+        index = build_index(index_type, dim, nlist=args.nlist, pq_m=args.pq_m, hnsw_m=args.hnsw_m)
+        if not index.is_trained:
+            index.train(vectors)
+        index.add(vectors)
+        build_seconds = time.perf_counter() - start
+
+        for value in values:
+            params = make_search_params(index, **{param_name: value})
+            result, latencies = timed_search(index, queries, args.k, params=params)
+            print(f"{index_type:<10}{f'{param_name}={value}':<16}{recall_at_k(result, truth):>10.3f}"
+                  f"{np.percentile(latencies, 50):>10.3f}{np.percentile(latencies, 99):>10.3f}{build_seconds:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""启动导入耗时基准测试
+
+用 `python -X importtime` 在新进程中导入app.py启动时导入的项目模块，报告总导入耗时和
+最慢的顶层依赖，并检查faiss、PyPDF2等重依赖没有在启动时被加载。
+可设置耗时上限作为回归检查：超过上限或加载了禁止的模块时以非零状态退出。
+
+用法：
+    python benchmarks/bench_import.py --repeat 5
+    # 作为回归检查
+    python benchmarks/bench_import.py --max-ms 400
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# app.py启动时导入的项目模块（streamlit除外）
+APP_MODULES = [
+    "dotenv",
+    "src.document_processor.processor",
+    "src.document_processor.dedup",
+    "src.document_processor.splitter",
+    "src.models.model_factory",
+    "src.models.cached_model",
+    "src.vector_store.vector_store",
+    "src.vector_store.embeddings",
+    "src.vector_store.retrieval_cache",
+    "src.vector_store.semantic_cache",
+    "src.config",
+    "src.utils.helpers",
+    "src.utils.cache",
+    "src.server.knowledge_base",
+    "src.server.client"
+]
+
+# 启动时不应加载的重依赖，应在首次使用时才导入
+HEAVY_MODULES = ["faiss", "langchain", "PyPDF2", "docx", "zhipuai", "requests", "sentence_transformers"]
+
+_LINE_PATTERN = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def run_importtime(modules: list) -> list:
+    """在新进程中导入模块，解析-X importtime的输出
+
+    Returns:
+        (自身耗时us, 累计耗时us, 缩进层级, 模块名)列表
+    """
+    code = "; ".join(f"import {module}" for module in modules)
+    output = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            capture_output=True, text=True, cwd=ROOT)
+    if output.returncode != 0:
+        raise RuntimeError(output.stderr)
+    records = []
+    for line in output.stderr.splitlines():
+        match = _LINE_PATTERN.match(line)
+        if match:
+            records.append((int(match.group(1)), int(match.group(2)), len(match.group(3)) // 2, match.group(4)))
+    return records
+
+
+def loaded_heavy_modules(records: list) -> list:
+    """找出被实际导入的重依赖（延迟导入的模块在首次使用前不会出现在importtime输出中）"""
+    names = {name for _, _, _, name in records}
+    return [heavy for heavy in HEAVY_MODULES
+            if any(name == heavy or name.startswith(heavy + ".") for name in names)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="启动导入耗时基准测试")
+    parser.add_argument("--modules", nargs="+", default=APP_MODULES, help="要导入的模块")
+    parser.add_argument("--repeat", type=int, default=5, help="重复次数，取中位数")
+    parser.add_argument("--top", type=int, default=10, help="显示最慢的顶层依赖数量")
+    parser.add_argument("--max-ms", type=float, help="总导入耗时上限（毫秒），超过时以非零状态退出")
+    args = parser.parse_args()
+
+    totals = []
+    records = []
+    for _ in range(args.repeat):
+        records = run_importtime(args.modules)
+        # 顶层导入的累计耗时之和即总导入耗时
+        totals.append(sum(cumulative for _, cumulative, level, _ in records if level == 0) / 1000)
+    total_ms = statistics.median(totals)
+
+    print(f"总导入耗时（中位数，{args.repeat}次）: {total_ms:.1f} ms")
+    print(f"{'模块':<45}{'累计(ms)':>10}")
+    top_level = sorted((record for record in records if record[2] == 0), key=lambda record: -record[1])
+    for _, cumulative, _, name in top_level[:args.top]:
+        print(f"{name:<45}{cumulative / 1000:>10.1f}")
+
+    failed = False
+    heavy = loaded_heavy_modules(records)
+    if heavy:
+        print(f"启动时加载了重依赖: {', '.join(heavy)}")
+        failed = True
+    if args.max_ms is not None and total_ms > args.max_ms:
+        print(f"总导入耗时 {total_ms:.1f} ms 超过上限 {args.max_ms:.1f} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""多文档并行导入吞吐量基准测试
+
+生成一批合成的DOCX/TXT文档，用不同数量的工作进程调用
+`DocumentProcessor.process_documents` 解析分块，并在主进程中同时嵌入、添加到向量存储，
+报告各工作进程数量下的文档/秒、文本块/秒以及相对单进程的加速比。
+
+用法：
+    python benchmarks/bench_ingest.py --num-files 200 --workers 1 2 4 8
+    # 只测解析分块，不嵌入建索引
+    python benchmarks/bench_ingest.py --num-files 200 --workers 1 4 --no-index
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docx import Document
+
+from src.document_processor.processor import DocumentProcessor
+from src.vector_store.vector_store import VectorStore
+
+SENTENCES = [
+    "甲方应在合同签订后三十日内支付全部款项。",
+    "乙方保证所提供的产品符合国家相关质量标准！",
+    "本合同未尽事宜，由双方协商解决？",
+    "The supplier shall deliver the goods within thirty days.",
+    "Either party may terminate this agreement with written notice.",
+    "Confidential information must not be disclosed to third parties."
+]
+
+
+def make_corpus(directory: str, num_files: int, paragraphs: int, seed: int = 0) -> list:
+    """生成DOCX与TXT各半的合成文档，返回文件路径列表"""
+    rng = random.Random(seed)
+    paths = []
+    for i in range(num_files):
+        texts = [" ".join(rng.choice(SENTENCES) for _ in range(rng.randint(3, 12))) for _ in range(paragraphs)]
+        if i % 2 == 0:
+            path = os.path.join(directory, f"contract_{i}.docx")
+            doc = Document()
+            for text in texts:
+                doc.add_paragraph(text)
+            doc.save(path)
+        else:
+            path = os.path.join(directory, f"contract_{i}.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("\n".join(texts))
+        paths.append(path)
+    return paths
+
+
+def run(paths: list, workers: int, index: bool, embedding_dim: int) -> dict:
+    """用指定数量的工作进程导入全部文档"""
+    processor = DocumentProcessor()
+    store = VectorStore(embedding_dim=embedding_dim) if index else None
+    num_chunks = 0
+    failures = 0
+
+    start = time.perf_counter()
+    for result in processor.process_documents(paths, workers=workers):
+        if result["error"]:
+            failures += 1
+            continue
+        num_chunks += len(result["chunks"])
+        if store is not None:
+            # 主进程嵌入、建索引时，工作进程继续解析后续文档
+            store.add_documents(result["chunks"])
+    seconds = time.perf_counter() - start
+
+    return {"workers": workers, "seconds": seconds, "chunks": num_chunks, "failures": failures}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多文档并行导入吞吐量基准测试")
+    parser.add_argument("--num-files", type=int, default=200, help="合成文档数量")
+    parser.add_argument("--paragraphs", type=int, default=200, help="每个文档的段落数量")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="待测试的工作进程数量")
+    parser.add_argument("--embedding-dim", type=int, default=768, help="向量维度")
+    parser.add_argument("--no-index", action="store_true", help="只解析分块，不嵌入建索引")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="bench_ingest_")
+    try:
+        paths = make_corpus(directory, args.num_files, args.paragraphs)
+        print(f"文档数量: {len(paths)}, CPU核数: {os.cpu_count()}, 嵌入建索引: {not args.no_index}")
+        print(f"{'进程数':<8}{'耗时(s)':>10}{'文档/s':>10}{'文本块/s':>12}{'加速比':>8}{'失败':>6}")
+
+        baseline = None
+        for workers in args.workers:
+            result = run(paths, workers, not args.no_index, args.embedding_dim)
+            baseline = baseline or result["seconds"]
+            print(f"{workers:<8}{result['seconds']:>10.2f}{len(paths) / result['seconds']:>10.1f}"
+                  f"{result['chunks'] / result['seconds']:>12.1f}{baseline / result['seconds']:>8.2f}"
+                  f"{result['failures']:>6}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
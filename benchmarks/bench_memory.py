@@ -0,0 +1,94 @@
+"""向量存储内存占用基准测试
+
+对比两种向量保存方式在增量导入时的峰值内存和耗时：
+- legacy：除FAISS索引外，再用np.vstack维护一份完整的嵌入矩阵（旧实现）
+- index：索引是向量的唯一来源，需要时从索引重建（当前实现）
+
+每种方式在独立子进程中运行，以便分别统计峰值RSS。
+
+用法：
+    python benchmarks/bench_memory.py --num-vectors 1000000 --embedding-dim 768 --batch-size 10000
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def current_rss_mb() -> float:
+    """当前进程的常驻内存（MB）"""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def run_mode(mode: str, num_vectors: int, embedding_dim: int, batch_size: int) -> dict:
+    """在当前进程中按指定方式增量导入向量并统计内存"""
+    import faiss
+
+    from src.vector_store.vector_store import VectorStore
+
+    store = VectorStore(embedding_dim=embedding_dim)
+    embeddings = None
+    rng = np.random.default_rng(0)
+    baseline_mb = current_rss_mb()
+
+    start = time.perf_counter()
+    for offset in range(0, num_vectors, batch_size):
+        batch = rng.standard_normal((min(batch_size, num_vectors - offset), embedding_dim), dtype=np.float32)
+        store._add_to_index(batch, np.arange(offset, offset + len(batch), dtype=np.int64))
+        if mode == "legacy":
+            embeddings = batch if embeddings is None else np.vstack([embeddings, batch])
+    seconds = time.perf_counter() - start
+
+    # ru_maxrss在Linux上的单位是KB
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return {
+        "mode": mode,
+        "num_vectors": store.index.ntotal,
+        "embedding_dim": embedding_dim,
+        "add_seconds": round(seconds, 3),
+        "rss_mb": round(current_rss_mb() - baseline_mb, 1),
+        "peak_rss_mb": round(peak_mb - baseline_mb, 1),
+        "raw_vectors_mb": round(num_vectors * embedding_dim * 4 / 1024 / 1024, 1),
+        "faiss_version": faiss.__version__
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="向量存储内存占用基准测试")
+    parser.add_argument("--num-vectors", type=int, default=1000000, help="向量数量")
+    parser.add_argument("--embedding-dim", type=int, default=768, help="向量维度")
+    parser.add_argument("--batch-size", type=int, default=10000, help="每次add_documents的向量数量")
+    parser.add_argument("--mode", choices=["legacy", "index"], help="只运行指定方式（供子进程使用）")
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, args.num_vectors, args.embedding_dim, args.batch_size)))
+        return
+
+    for mode in ("legacy", "index"):
+        output = subprocess.run(
+            [sys.executable, __file__, "--mode", mode,
+             "--num-vectors", str(args.num_vectors),
+             "--embedding-dim", str(args.embedding_dim),
+             "--batch-size", str(args.batch_size)],
+            capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output)
+        print(f"{mode:<8} 常驻 {result['rss_mb']:>9.1f} MB  峰值 {result['peak_rss_mb']:>9.1f} MB  "
+              f"导入 {result['add_seconds']:>8.2f}s  (原始向量 {result['raw_vectors_mb']:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""MMR多样性重排的效果与开销
+
+在合成的合同文本上分块（含重叠）建立向量存储，对比普通向量检索与MMR重排后的top-k结果：
+    平均两两相似度  结果之间的平均余弦相似度，越低说明内容越不重复
+    冗余词元        组装上下文时因重叠或重复被去掉的词元数量（ContextPacker统计）
+    重排耗时        取出候选向量并完成MMR选择的耗时（不含检索本身）
+嵌入使用字符二元组哈希的词袋向量，重叠或措辞相近的文本块向量相近（HashEmbedder的向量与内容无关，无法体现重复）。
+
+用法：
+    python benchmarks/bench_mmr.py --documents 200 --k 5 --fetch-k 20
+    python benchmarks/bench_mmr.py --lambda-mult 0.3 0.5 0.7
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.document_processor.splitter import RecursiveTextSplitter
+from src.models.context_packer import ContextPacker
+from src.vector_store.embeddings import BaseEmbedder
+from src.vector_store.mmr import maximal_marginal_relevance
+from src.vector_store.vector_store import VectorStore
+
+CLAUSES = [
+    "甲方应在验收合格后{n}日内支付合同价款的百分之{p}。",
+    "乙方逾期交付的，每逾期一日按合同总价的万分之{p}支付违约金。",
+    "本合同的保修期为{n}个月，自验收合格之日起计算。",
+    "任何一方泄露商业秘密的，应赔偿对方因此遭受的全部损失，并支付违约金{n}万元。",
+    "因不可抗力导致合同无法履行的，双方互不承担违约责任，但应在{n}日内书面通知对方。",
+    "合同争议由甲方所在地人民法院管辖，诉讼费用由败诉方承担。",
+    "乙方应在收到预付款后{n}日内开始施工，并按进度计划完成第{p}阶段工作。",
+    "甲方有权对乙方的工作进行检查，发现不合格的，乙方应在{n}日内整改。"
+]
+
+
+class BigramEmbedder(BaseEmbedder):
+    """字符二元组哈希词袋嵌入（仅用于基准测试）"""
+
+    def embed(self, texts):
+        embeddings = np.zeros((len(texts), self.embedding_dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for i in range(len(text) - 1):
+                bucket = int.from_bytes(hashlib.md5(text[i:i + 2].encode()).digest()[:4], "little")
+                embeddings[row, bucket % self.embedding_dim] += 1.0
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.where(norms > 0, norms, 1.0)
+
+
+def synthetic_documents(num_documents: int, seed: int = 0):
+    """生成条款大量重复、只有数字不同的合同文本（每份文档集中在少数几类条款上，相邻文本块内容相近）"""
+    rng = np.random.default_rng(seed)
+    for d in range(num_documents):
+        topics = rng.choice(len(CLAUSES), 2, replace=False)
+        clauses = [CLAUSES[i].format(n=rng.integers(5, 60), p=rng.integers(1, 30))
+                   for i in rng.choice(topics, 40)]
+        yield f"contract_{d}.txt", "".join(clauses)
+
+
+def mean_pairwise_similarity(vectors: np.ndarray) -> float:
+    """结果之间的平均余弦相似度"""
+    if len(vectors) < 2:
+        return 0.0
+    vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    sims = vectors @ vectors.T
+    return float((sims.sum() - np.trace(sims)) / (len(vectors) * (len(vectors) - 1)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MMR多样性重排基准测试")
+    parser.add_argument("--documents", type=int, default=200, help="合成文档数量")
+    parser.add_argument("--queries", type=int, default=200, help="查询数量")
+    parser.add_argument("--k", type=int, default=5, help="每个查询返回的文档数量")
+    parser.add_argument("--fetch-k", type=int, default=20, help="MMR重排的候选数量")
+    parser.add_argument("--lambda-mult", type=float, nargs="+", default=[0.5], help="MMR的相关性权重")
+    parser.add_argument("--embedding-dim", type=int, default=768, help="嵌入维度")
+    args = parser.parse_args()
+
+    splitter = RecursiveTextSplitter(chunk_size=300, chunk_overlap=100)
+    chunks = []
+    for source, text in synthetic_documents(args.documents):
+        for chunk_id, (start, end) in enumerate(splitter.split_spans(text)):
+            chunks.append({"content": text[start:end],
+                           "metadata": {"source": source, "chunk_id": chunk_id, "start_index": start,
+                                        "end_index": end}})
+    store = VectorStore(embedder=BigramEmbedder(args.embedding_dim))
+    store.add_documents(chunks)
+
+    rng = np.random.default_rng(1)
+    queries = [CLAUSES[i].format(n=rng.integers(5, 60), p=rng.integers(1, 30))
+               for i in rng.integers(0, len(CLAUSES), args.queries)]
+    packer = ContextPacker(budget=10 ** 9)
+
+    print(f"文本块数量: {len(store)}, 查询数量: {len(queries)}, k={args.k}, fetch_k={args.fetch_k}")
+    print(f"{'方式':<14}{'平均两两相似度':>14}{'冗余词元/查询':>14}{'来源数/查询':>12}{'重排p50(ms)':>14}{'重排p99(ms)':>14}")
+
+    def report(name, results, rerank_ms):
+        similarity = np.mean([mean_pairwise_similarity(store.get_embeddings([doc["id"] for doc in docs]))
+                              for docs in results])
+        redundant = np.mean([packer.pack(docs)["redundant_tokens"] for docs in results])
+        sources = np.mean([len({doc["metadata"]["source"] for doc in docs}) for docs in results])
+        p50 = f"{np.percentile(rerank_ms, 50):.3f}" if rerank_ms else "-"
+        p99 = f"{np.percentile(rerank_ms, 99):.3f}" if rerank_ms else "-"
+        print(f"{name:<14}{similarity:>14.3f}{redundant:>14.1f}{sources:>12.2f}{p50:>14}{p99:>14}")
+
+    query_embeddings = store.embed_batch(queries)
+    report("top-k", store.similarity_search_by_vectors(query_embeddings, k=args.k), [])
+
+    candidates = store.similarity_search_by_vectors(query_embeddings, k=args.fetch_k)
+    for lambda_mult in args.lambda_mult:
+        results, rerank_ms = [], []
+        for query_embedding, docs in zip(query_embeddings, candidates):
+            # 与VectorStore.mmr_search相同：取出候选向量后做MMR选择
+            start = time.perf_counter()
+            embeddings = store.get_embeddings([doc["id"] for doc in docs])
+            order = maximal_marginal_relevance(query_embedding, embeddings, args.k, lambda_mult=lambda_mult)
+            rerank_ms.append((time.perf_counter() - start) * 1000)
+            results.append([docs[i] for i in order])
+        report(f"MMR λ={lambda_mult}", results, rerank_ms)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""文本分割器基准测试
+
+在大段中文和英文文本上对比内置的 `RecursiveTextSplitter` 与
+langchain 的 `RecursiveCharacterTextSplitter`（相同的分隔符、chunk_size、chunk_overlap）：
+导入耗时、分块耗时、吞吐量，并检查两者的分块结果是否一致。
+分块耗时按DocumentProcessor的实际用法计算：输入为合并空白后的文本，输出为文本块字典列表
+（langchain需先创建Document对象再转换为字典）。
+未安装langchain时只测试内置分割器。
+
+用法：
+    python benchmarks/bench_splitter.py --num-chars 5000000 --repeat 3
+"""
+
+import argparse
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config import DOCUMENT_PROCESSING
+from src.document_processor.splitter import RecursiveTextSplitter, DEFAULT_SEPARATORS
+
+CHINESE_WORDS = ["合同", "条款", "甲方", "乙方", "约定", "付款", "交付", "违约", "责任", "，", "、", "。", "！", "？"]
+ENGLISH_WORDS = ["the", "contract", "party", "shall", "deliver", "goods", "within", "days", "notice", ",", ".", "!", "?"]
+
+
+def make_text(words: list, num_chars: int, english: bool, seed: int = 0) -> str:
+    """生成带段落和换行的合成文本"""
+    rng = random.Random(seed)
+    parts = []
+    length = 0
+    while length < num_chars:
+        word = rng.choice(words)
+        if english and word not in ",.!?":
+            word = " " + word
+        if rng.random() < 0.01:
+            word += "\n\n" if rng.random() < 0.3 else "\n"
+        parts.append(word)
+        length += len(word)
+    # 与DocumentProcessor._clean_text一致，合并空白字符
+    return re.sub(r"\s+", " ", "".join(parts)).strip()
+
+
+def native_pipeline(splitter):
+    """内置分割器：直接由文本块位置生成字典"""
+    def run(text: str) -> list:
+        return [{"content": text[start:end], "metadata": {"chunk_id": i, "start_index": start, "end_index": end}}
+                for i, (start, end) in enumerate(splitter.split_spans(text))]
+    return run
+
+
+def langchain_pipeline(splitter):
+    """langchain分割器：先创建Document对象再转换为字典"""
+    def run(text: str) -> list:
+        return [{"content": doc.page_content, "metadata": {"chunk_id": i}}
+                for i, doc in enumerate(splitter.create_documents([text]))]
+    return run
+
+
+def import_seconds(module: str) -> float:
+    """在新进程中测量导入模块的耗时"""
+    code = f"import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return float(output.stdout) if output.returncode == 0 else float("nan")
+
+
+def best_of(func, text: str, repeat: int):
+    """重复运行取最短耗时"""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(text)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="文本分割器基准测试")
+    parser.add_argument("--num-chars", type=int, default=2000000, help="每种语言的文本长度（字符）")
+    parser.add_argument("--repeat", type=int, default=3, help="重复次数，取最短耗时")
+    parser.add_argument("--chunk-size", type=int, default=DOCUMENT_PROCESSING["chunk_size"], help="文本块大小")
+    parser.add_argument("--chunk-overlap", type=int, default=DOCUMENT_PROCESSING["chunk_overlap"], help="文本块重叠大小")
+    args = parser.parse_args()
+
+    native = RecursiveTextSplitter(chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap,
+                                   separators=DEFAULT_SEPARATORS)
+    try:
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+        reference = RecursiveCharacterTextSplitter(chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap,
+                                                   length_function=len, separators=DEFAULT_SEPARATORS)
+    except ImportError:
+        reference = None
+        print("未安装langchain，只测试内置分割器")
+
+    print(f"导入耗时: 内置 {import_seconds('src.document_processor.splitter') * 1000:.1f} ms", end="")
+    if reference is not None:
+        print(f"，langchain {import_seconds('langchain.text_splitter') * 1000:.1f} ms", end="")
+    print()
+
+    print(f"{'文本':<8}{'分割器':<12}{'耗时(s)':>10}{'MB/s':>10}{'文本块':>10}{'结果一致':>10}")
+    for name, words, english in (("中文", CHINESE_WORDS, False), ("英文", ENGLISH_WORDS, True)):
+        text = make_text(words, args.num_chars, english)
+        megabytes = len(text.encode("utf-8")) / 1024 / 1024
+
+        native_chunks, native_seconds = best_of(native_pipeline(native), text, args.repeat)
+        native_chunks = [chunk["content"] for chunk in native_chunks]
+        print(f"{name:<8}{'内置':<12}{native_seconds:>10.3f}{megabytes / native_seconds:>10.1f}{len(native_chunks):>10}{'-':>10}")
+        if reference is not None:
+            reference_chunks, reference_seconds = best_of(langchain_pipeline(reference), text, args.repeat)
+            reference_chunks = [chunk["content"] for chunk in reference_chunks]
+            print(f"{name:<8}{'langchain':<12}{reference_seconds:>10.3f}{megabytes / reference_seconds:>10.1f}"
+                  f"{len(reference_chunks):>10}{str(reference_chunks == native_chunks):>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""模型适配器首字延迟（TTFT）基准测试
+
+在本地启动一个模拟百度文心一言接口的HTTP服务（令牌接口和流式对话接口），
+对比两种情况下BaiduModelAdapter.generate_stream的首字延迟和总耗时：
+    cold  每次请求前清空令牌缓存并重建HTTP会话（等同于每次请求都获取令牌、新建连接）
+    warm  复用缓存的令牌和连接池中的长连接
+模拟服务可分别设置令牌接口延迟、新建连接的握手延迟（模拟TLS握手）和首字延迟。
+
+用法：
+    python benchmarks/bench_ttft.py --requests 50
+    python benchmarks/bench_ttft.py --token-latency 150 --connect-latency 60
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models import baidu_model, http_client
+from src.models.baidu_model import BaiduModelAdapter
+
+
+def make_handler(token_latency: float, connect_latency: float, first_token_latency: float,
+                 num_tokens: int, token_interval: float):
+    """创建模拟百度接口的请求处理类（延迟单位为秒）"""
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # 支持长连接
+
+        def setup(self):
+            # 每个新连接调用一次，模拟TLS握手
+            super().setup()
+            # 与线上服务一样关闭Nagle算法，否则长连接上的小片段会被延迟合并发送
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            time.sleep(connect_latency)
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, data: dict):
+            body = json.dumps(data).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_chunk(self, data: bytes):
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+
+            if self.path.startswith("/oauth/2.0/token"):
+                time.sleep(token_latency)
+                self._send_json({"access_token": "stub-token", "expires_in": 2592000})
+                return
+
+            time.sleep(first_token_latency)
+            if not payload.get("stream"):
+                self._send_json({"result": "模拟回答" * num_tokens})
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for i in range(num_tokens):
+                if i:
+                    time.sleep(token_interval)
+                event = json.dumps({"result": f"词{i}", "is_end": i == num_tokens - 1}, ensure_ascii=False)
+                self._send_chunk(f"data: {event}\n\n".encode("utf-8"))
+            self._send_chunk(b"")
+
+    return StubHandler
+
+
+def measure(adapter: BaiduModelAdapter, requests: int, cold: bool) -> tuple:
+    """依次发送请求，返回(首字延迟列表, 总耗时列表)，单位毫秒"""
+    ttfts, totals = [], []
+    for _ in range(requests):
+        if cold:
+            baidu_model._token_cache.clear()
+            http_client.reset_session()
+        start = time.perf_counter()
+        first = None
+        for _ in adapter.generate_stream("合同的付款期限是多久？"):
+            if first is None:
+                first = time.perf_counter()
+        end = time.perf_counter()
+        ttfts.append((first - start) * 1000)
+        totals.append((end - start) * 1000)
+    return ttfts, totals
+
+
+def percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="模型适配器首字延迟基准测试")
+    parser.add_argument("--requests", type=int, default=30, help="每种情况的请求数量")
+    parser.add_argument("--token-latency", type=float, default=80, help="令牌接口延迟（毫秒）")
+    parser.add_argument("--connect-latency", type=float, default=30, help="新建连接的握手延迟（毫秒）")
+    parser.add_argument("--first-token-latency", type=float, default=50, help="对话接口的首字延迟（毫秒）")
+    parser.add_argument("--tokens", type=int, default=20, help="每个回答的流式片段数量")
+    parser.add_argument("--token-interval", type=float, default=2, help="流式片段之间的间隔（毫秒）")
+    args = parser.parse_args()
+
+    handler = make_handler(args.token_latency / 1000, args.connect_latency / 1000, args.first_token_latency / 1000,
+                           args.tokens, args.token_interval / 1000)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    os.environ["BAIDU_API_KEY"] = "stub-key"
+    os.environ["BAIDU_SECRET_KEY"] = "stub-secret"
+    os.environ["BAIDU_API_BASE"] = f"http://127.0.0.1:{server.server_address[1]}"
+    adapter = BaiduModelAdapter(model_name="ERNIE-Bot")
+
+    # 预热：导入requests、建立首个连接
+    measure(adapter, 1, cold=False)
+
+    print(f"模拟延迟: 令牌 {args.token_latency:.0f} ms，握手 {args.connect_latency:.0f} ms，"
+          f"首字 {args.first_token_latency:.0f} ms")
+    print(f"{'情况':<8}{'TTFT中位数':>12}{'TTFT p95':>12}{'总耗时中位数':>14}{'令牌请求次数':>14}")
+    for name, cold in (("cold", True), ("warm", False)):
+        fetches = baidu_model._token_cache.fetches
+        ttfts, totals = measure(adapter, args.requests, cold)
+        print(f"{name:<8}{statistics.median(ttfts):>12.1f}{percentile(ttfts, 0.95):>12.1f}"
+              f"{statistics.median(totals):>14.1f}{baidu_model._token_cache.fetches - fetches:>14}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""比较两次run_suite.py的结果
+
+按（语言, 目标规模）匹配两次运行，输出各阶段耗时、检索延迟、磁盘占用和峰值RSS的比值（新/旧），
+比值超过阈值的指标标记为回退；存在回退时以状态码1退出，便于在CI中使用。
+两次运行的参数（meta.config）不同时给出提示。
+
+用法：
+    python benchmarks/compare_results.py baseline.json current.json
+    python benchmarks/compare_results.py baseline.json current.json --threshold 1.5
+"""
+
+import argparse
+import json
+import sys
+
+
+def metrics(run: dict) -> dict:
+    """从一次运行中取出用于比较的指标（都是越小越好）"""
+    values = {f"{stage}_s": seconds for stage, seconds in run["seconds"].items()}
+    values["search_p50_ms"] = run["search"]["p50_ms"]
+    values["search_p99_ms"] = run["search"]["p99_ms"]
+    values["store_mb"] = run["store_bytes"] / 1024 / 1024
+    values["peak_rss_mb"] = max(run["peak_rss_mb"].values())
+    return values
+
+
+def main():
+    parser = argparse.ArgumentParser(description="比较两次基准测试套件的结果")
+    parser.add_argument("baseline", help="基线结果JSON")
+    parser.add_argument("current", help="当前结果JSON")
+    parser.add_argument("--threshold", type=float, default=1.25, help="比值超过该值视为回退")
+    parser.add_argument("--min-seconds", type=float, default=0.05,
+                        help="两次耗时都低于该值（秒）的阶段不判定回退，避免计时噪声")
+    args = parser.parse_args()
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+
+    if baseline["meta"].get("config") != current["meta"].get("config"):
+        print("警告：两次运行的参数不同，结果可能不可比")
+    print(f"基线: {baseline['meta'].get('git_commit')}  当前: {current['meta'].get('git_commit')}")
+
+    baseline_runs = {(run["language"], run["target_chunks"]): run for run in baseline["runs"]}
+    regressions = []
+    for run in current["runs"]:
+        key = (run["language"], run["target_chunks"])
+        if key not in baseline_runs:
+            print(f"{key[0]} {key[1]}: 基线中没有对应的运行，跳过")
+            continue
+        old, new = metrics(baseline_runs[key]), metrics(run)
+        print(f"\n{key[0]} {key[1]} 块")
+        print(f"{'指标':<18}{'基线':>12}{'当前':>12}{'比值':>8}")
+        for name, old_value in old.items():
+            new_value = new[name]
+            ratio = new_value / old_value if old_value else float("inf") if new_value else 1.0
+            noisy = name.endswith("_s") and max(old_value, new_value) < args.min_seconds
+            mark = ""
+            if ratio > args.threshold and not noisy:
+                mark = "  回退"
+                regressions.append(f"{key[0]} {key[1]} {name}")
+            print(f"{name:<18}{old_value:>12.3f}{new_value:>12.3f}{ratio:>8.2f}{mark}")
+
+    if regressions:
+        print(f"\n{len(regressions)} 项指标回退超过 {args.threshold:.2f} 倍: {', '.join(regressions)}")
+        sys.exit(1)
+    print("\n没有超过阈值的回退")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""合成语料生成器（供基准测试使用）
+
+按固定随机种子生成中文或英文文本，写成TXT或DOCX文件，同样的参数每次生成完全相同的语料。
+先生成一个段落池，文档由池中段落随机组合而成，生成数百万文本块规模的语料也只需几秒到几十秒。
+
+用法（单独生成语料）：
+    python benchmarks/corpus.py --output-dir /tmp/corpus --language zh --num-chars 50000000 --file-chars 1000000
+"""
+
+import argparse
+import math
+import os
+import random
+from typing import Iterator, List
+
+ZH_WORDS = [
+    "合同", "甲方", "乙方", "付款", "期限", "违约金", "验收", "交付", "保修", "责任", "条款", "约定",
+    "履行", "义务", "权利", "通知", "书面", "争议", "仲裁", "法院", "管辖", "损失", "赔偿", "知识产权",
+    "保密", "信息", "项目", "进度", "质量", "标准", "费用", "发票", "税费", "变更", "解除", "终止",
+    "不可抗力", "生效", "签署", "附件", "技术", "服务", "数据", "安全", "系统", "人员", "培训", "文档"
+]
+EN_WORDS = [
+    "contract", "party", "payment", "term", "penalty", "acceptance", "delivery", "warranty", "liability",
+    "clause", "agreement", "performance", "obligation", "right", "notice", "written", "dispute", "arbitration",
+    "court", "jurisdiction", "loss", "compensation", "intellectual", "property", "confidential", "information",
+    "project", "schedule", "quality", "standard", "fee", "invoice", "tax", "amendment", "termination",
+    "force", "majeure", "effective", "signature", "appendix", "technical", "service", "data", "security"
+]
+
+
+def make_paragraph(rng: random.Random, language: str, sentences: int) -> str:
+    """生成一个段落"""
+    parts = []
+    for _ in range(sentences):
+        if language == "zh":
+            words = rng.choices(ZH_WORDS, k=rng.randint(6, 16))
+            parts.append("".join(words[:len(words) // 2]) + "，" + "".join(words[len(words) // 2:]) + "。")
+        else:
+            words = rng.choices(EN_WORDS, k=rng.randint(8, 20))
+            parts.append(" ".join(words).capitalize() + f" {rng.randint(1, 999)}. ")
+    return "".join(parts).strip()
+
+
+def iter_documents(language: str, num_chars: int, file_chars: int, seed: int = 0,
+                   pool_size: int = 2000) -> Iterator[List[str]]:
+    """逐个生成文档，每个文档为段落列表，所有文档的字符总数约为num_chars
+
+    Args:
+        language: 'zh'或'en'
+        num_chars: 语料的总字符数
+        file_chars: 每个文档的字符数
+        seed: 随机种子
+        pool_size: 段落池大小
+
+    Yields:
+        文档的段落列表
+    """
+    if language not in ("zh", "en"):
+        raise ValueError(f"不支持的语言: {language}")
+    rng = random.Random(seed)
+    pool = [make_paragraph(rng, language, rng.randint(3, 8)) for _ in range(pool_size)]
+    for _ in range(max(1, math.ceil(num_chars / file_chars))):
+        paragraphs, length = [], 0
+        while length < file_chars:
+            paragraph = pool[rng.randrange(pool_size)]
+            paragraphs.append(paragraph)
+            length += len(paragraph) + 2
+        yield paragraphs
+
+
+def write_document(path: str, paragraphs: List[str], file_format: str = "txt"):
+    """把一个文档的段落写入TXT或DOCX文件
+
+    Raises:
+        ValueError: 如果文件格式不支持
+    """
+    if file_format == "txt":
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n\n".join(paragraphs))
+    elif file_format == "docx":
+        from docx import Document
+        document = Document()
+        for paragraph in paragraphs:
+            document.add_paragraph(paragraph)
+        document.save(path)
+    else:
+        raise ValueError(f"不支持的文件格式: {file_format}")
+
+
+def write_corpus(directory: str, language: str, num_chars: int, file_chars: int, file_format: str = "txt",
+                 seed: int = 0) -> List[str]:
+    """生成语料并写入文件
+
+    Args:
+        directory: 输出目录
+        language: 'zh'或'en'
+        num_chars: 语料的总字符数
+        file_chars: 每个文件的字符数
+        file_format: 'txt'或'docx'
+        seed: 随机种子
+
+    Returns:
+        生成的文件路径列表
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for i, paragraphs in enumerate(iter_documents(language, num_chars, file_chars, seed=seed)):
+        path = os.path.join(directory, f"{language}_{i:05d}.{file_format}")
+        write_document(path, paragraphs, file_format)
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="合成语料生成器")
+    parser.add_argument("--output-dir", required=True, help="输出目录")
+    parser.add_argument("--language", choices=["zh", "en"], default="zh", help="语言")
+    parser.add_argument("--num-chars", type=int, default=10_000_000, help="语料的总字符数")
+    parser.add_argument("--file-chars", type=int, default=1_000_000, help="每个文件的字符数")
+    parser.add_argument("--format", choices=["txt", "docx"], default="txt", help="文件格式")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    args = parser.parse_args()
+
+    paths = write_corpus(args.output_dir, args.language, args.num_chars, args.file_chars, args.format, args.seed)
+    print(f"已生成 {len(paths)} 个文件到 {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
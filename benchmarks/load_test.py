@@ -0,0 +1,225 @@
+"""检索+生成的端到端压力测试
+
+启动本地模拟大模型服务（src/server/mock_provider.py，独立子进程），把百度或智谱适配器的接口地址指向它，
+用合成语料建立向量存储，然后让N个并发会话各自连续提问：每轮先检索（线程池中执行），
+再通过适配器的agenerate_stream流式生成回答，走真实的HTTP连接池、SSE解析、令牌缓存和出错处理代码。
+报告吞吐量（请求/秒、片段/秒）以及检索耗时、首字延迟和总耗时的p50/p95/p99，出错和被限流的请求单独计数。
+
+用法：
+    python benchmarks/load_test.py --sessions 100 --turns 5
+    python benchmarks/load_test.py --sessions 500 --first-token-ms 500 --tokens-per-second 50 --error-rate 0.02
+    python benchmarks/load_test.py --sessions 50 --qps-limit 20 --output load.json
+    # 使用已启动的模拟服务（或其他兼容服务）
+    python benchmarks/load_test.py --provider-url http://127.0.0.1:8001 --sessions 200
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from benchmarks.corpus import make_paragraph, write_corpus
+from src.pipeline.bulk_qa import percentile
+
+# 模拟服务返回的限流错误信息中的关键词（百度为QPS超限，智谱为并发数过高）
+RATE_LIMIT_MARKERS = ("qps request limit", "并发数过高")
+
+
+def free_port() -> int:
+    """获取一个空闲的本地端口"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_provider(args) -> tuple:
+    """在子进程中启动模拟服务，返回(进程, 地址)"""
+    import requests
+
+    port = free_port()
+    command = [sys.executable, "-m", "src.server.mock_provider", "--port", str(port),
+               "--first-token-ms", str(args.first_token_ms), "--tokens-per-second", str(args.tokens_per_second),
+               "--output-tokens", str(args.output_tokens), "--error-rate", str(args.error_rate),
+               "--rate-limit-rate", str(args.rate_limit_rate), "--token-latency-ms", str(args.token_latency_ms),
+               "--seed", str(args.seed)]
+    if args.qps_limit:
+        command += ["--qps-limit", str(args.qps_limit)]
+    process = subprocess.Popen(command, cwd=ROOT_DIR)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"{url}/health", timeout=1).ok:
+                return process, url
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("模拟服务启动超时")
+
+
+def build_store(args):
+    """用合成语料建立向量存储"""
+    from src.document_processor.processor import DocumentProcessor
+    from src.vector_store.vector_store import VectorStore
+
+    store = VectorStore(lexical=args.mode != "vector")
+    processor = DocumentProcessor()
+    with tempfile.TemporaryDirectory() as directory:
+        for path in write_corpus(directory, args.language, args.corpus_chars, 200_000, seed=args.seed):
+            store.add_documents(processor.process_document(path))
+    return store
+
+
+def make_model(args, provider_url: str):
+    """创建指向模拟服务的模型适配器"""
+    from src.models.model_factory import ModelFactory
+
+    if args.provider == "baidu":
+        os.environ.update(BAIDU_API_KEY="mock-key", BAIDU_SECRET_KEY="mock-secret", BAIDU_API_BASE=provider_url)
+    else:
+        os.environ.update(ZHIPU_API_KEY="mock-key", ZHIPU_API_BASE=f"{provider_url}/api/paas/v4")
+    return ModelFactory.get_model(args.provider, args.model_name)
+
+
+async def run_session(session_id: int, store, model, args, results: list):
+    """一个会话：连续提问，每轮检索后流式生成回答"""
+    loop = asyncio.get_running_loop()
+    rng = random.Random(args.seed * 100003 + session_id)
+    for turn in range(args.turns):
+        question = make_paragraph(rng, args.language, 1)
+        start = time.perf_counter()
+        docs = await loop.run_in_executor(None, store.search, question, args.top_k, args.mode)
+        retrieved = time.perf_counter()
+
+        first_token, pieces, text = None, 0, []
+        try:
+            async for piece in model.agenerate_stream(question, docs):
+                if first_token is None:
+                    first_token = time.perf_counter()
+                pieces += 1
+                text.append(piece)
+            error = None
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        end = time.perf_counter()
+
+        answer = "".join(text)
+        if error is None and model.is_error_response(answer):
+            error = answer.strip()
+        rate_limited = error is not None and any(marker in error.lower() for marker in RATE_LIMIT_MARKERS)
+        results.append({
+            "session": session_id,
+            "turn": turn,
+            "retrieval_ms": (retrieved - start) * 1000,
+            "ttft_ms": (first_token - retrieved) * 1000 if first_token is not None else None,
+            "generation_ms": (end - retrieved) * 1000,
+            "total_ms": (end - start) * 1000,
+            "pieces": pieces,
+            "status": "ok" if error is None else "rate_limited" if rate_limited else "error",
+            "error": error
+        })
+        if args.think_time_ms:
+            await asyncio.sleep(rng.uniform(0, 2 * args.think_time_ms) / 1000)
+
+
+async def run_load(store, model, args) -> tuple:
+    """并发运行所有会话，返回(结果列表, 总耗时秒数)"""
+    results = []
+    start = time.perf_counter()
+    await asyncio.gather(*(run_session(i, store, model, args, results) for i in range(args.sessions)))
+    elapsed = time.perf_counter() - start
+
+    from src.models.http_client import close_async_client
+    await close_async_client()
+    return results, elapsed
+
+
+def summarize(results: list, elapsed: float) -> dict:
+    """汇总吞吐量和延迟分位数"""
+    ok = [result for result in results if result["status"] == "ok"]
+    summary = {
+        "requests": len(results),
+        "ok": len(ok),
+        "errors": sum(result["status"] == "error" for result in results),
+        "rate_limited": sum(result["status"] == "rate_limited" for result in results),
+        "elapsed_seconds": round(elapsed, 3),
+        "requests_per_second": round(len(results) / elapsed, 2),
+        "pieces_per_second": round(sum(result["pieces"] for result in results) / elapsed, 1)
+    }
+    for name, rows in (("retrieval_ms", results), ("ttft_ms", ok), ("total_ms", ok)):
+        values = [row[name] for row in rows if row[name] is not None]
+        summary[name] = {f"p{int(q * 100)}": round(percentile(values, q), 1) for q in (0.5, 0.95, 0.99)}
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="检索+生成的端到端压力测试")
+    parser.add_argument("--sessions", type=int, default=100, help="并发会话数量")
+    parser.add_argument("--turns", type=int, default=3, help="每个会话的提问轮数")
+    parser.add_argument("--think-time-ms", type=float, default=0, help="每轮之间的平均间隔（毫秒）")
+    parser.add_argument("--provider", choices=["baidu", "zhipu"], default="baidu", help="模拟的模型提供方")
+    parser.add_argument("--model-name", default=None, help="模型名称，默认ERNIE-Bot或chatglm_turbo")
+    parser.add_argument("--provider-url", default=None, help="已启动的模拟服务地址，默认自动启动")
+    parser.add_argument("--first-token-ms", type=float, default=300, help="模拟服务的首字延迟（毫秒）")
+    parser.add_argument("--tokens-per-second", type=float, default=30, help="模拟服务每秒生成的片段数量")
+    parser.add_argument("--output-tokens", type=int, default=60, help="每个回答的片段数量")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="模拟服务的出错概率")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="模拟服务随机限流的概率")
+    parser.add_argument("--qps-limit", type=float, default=None, help="模拟服务每秒最多接受的请求数量")
+    parser.add_argument("--token-latency-ms", type=float, default=50, help="百度访问令牌接口的延迟（毫秒）")
+    parser.add_argument("--language", choices=["zh", "en"], default="zh", help="合成语料的语言")
+    parser.add_argument("--corpus-chars", type=int, default=1_000_000, help="合成语料的字符数")
+    parser.add_argument("--top-k", type=int, default=3, help="每轮检索的文档数量")
+    parser.add_argument("--mode", choices=["vector", "lexical", "hybrid"], default="vector", help="检索方式")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--output", help="保存汇总和逐条结果的JSON路径")
+    args = parser.parse_args()
+    args.model_name = args.model_name or ("ERNIE-Bot" if args.provider == "baidu" else "chatglm_turbo")
+
+    process = None
+    provider_url = args.provider_url
+    if provider_url is None:
+        process, provider_url = start_provider(args)
+    try:
+        store = build_store(args)
+        model = make_model(args, provider_url.rstrip("/"))
+        print(f"文本块数量: {len(store)}，会话: {args.sessions} x {args.turns} 轮，模型: {args.provider}/{args.model_name}")
+        results, elapsed = asyncio.run(run_load(store, model, args))
+
+        import requests
+        try:
+            provider_stats = requests.get(f"{provider_url.rstrip('/')}/stats", timeout=5).json()
+        except (requests.RequestException, ValueError):
+            provider_stats = None
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    summary = summarize(results, elapsed)
+    print(f"请求 {summary['requests']}（成功 {summary['ok']}，出错 {summary['errors']}，"
+          f"限流 {summary['rate_limited']}），耗时 {summary['elapsed_seconds']:.2f}s")
+    print(f"吞吐量: {summary['requests_per_second']:.2f} 请求/秒，{summary['pieces_per_second']:.1f} 片段/秒")
+    for name, label in (("retrieval_ms", "检索"), ("ttft_ms", "首字延迟"), ("total_ms", "总耗时")):
+        values = summary[name]
+        print(f"{label:<6} p50 {values['p50']:>9.1f} ms  p95 {values['p95']:>9.1f} ms  p99 {values['p99']:>9.1f} ms")
+    if provider_stats is not None:
+        print(f"模拟服务: {provider_stats}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "summary": summary, "provider": provider_stats, "results": results},
+                      f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
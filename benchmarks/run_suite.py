@@ -0,0 +1,217 @@
+"""导入、建索引与检索的可复现基准测试套件
+
+用benchmarks/corpus.py按固定随机种子生成指定规模的中文/英文合成语料，逐个文件依次测量：
+    extraction      文本提取（DocumentProcessor._iter_segments）
+    chunking        清理与分块（DocumentProcessor._chunk_segments）
+    embedding       嵌入（VectorStore.embed_batch）
+    add_documents   添加到向量存储（包含嵌入和写入索引）
+    save / load     保存与加载的耗时，以及保存后的磁盘占用
+    search          similarity_search的单次查询延迟（p50/p99）
+每个（规模, 语言）组合在独立子进程中运行，分别统计各阶段结束时的峰值RSS。
+结果以JSON输出（包含git提交、库版本与运行参数），可用benchmarks/compare_results.py比较两次运行。
+
+用法：
+    python benchmarks/run_suite.py --sizes 10000 100000 1000000 --languages zh en --output results.json
+    python benchmarks/run_suite.py --sizes 2000 --languages zh --format docx --index-type hnsw
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import iter_documents, make_paragraph, write_document
+
+STAGES = ["extraction", "chunking", "embedding", "add_documents", "save", "load", "search"]
+
+
+def peak_rss_mb() -> float:
+    """当前进程的峰值常驻内存（MB，ru_maxrss在Linux上的单位是KB）"""
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def directory_size(path: str) -> int:
+    """目录下所有文件的总字节数"""
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def latency_stats(seconds: list) -> dict:
+    """延迟分位数（毫秒）"""
+    ms = np.asarray(seconds) * 1000
+    return {"p50_ms": round(float(np.percentile(ms, 50)), 3), "p99_ms": round(float(np.percentile(ms, 99)), 3),
+            "mean_ms": round(float(ms.mean()), 3)}
+
+
+def run_case(args, num_chunks: int, language: str) -> dict:
+    """在当前进程中对一种规模和语言运行全部阶段"""
+    import random
+
+    from src.document_processor.processor import DocumentProcessor
+    from src.vector_store.vector_store import VectorStore
+
+    processor = DocumentProcessor(chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap)
+    store = VectorStore(embedding_dim=args.embedding_dim, batch_size=args.batch_size, index_type=args.index_type)
+    seconds = dict.fromkeys(STAGES, 0.0)
+    peak = {}
+    workdir = tempfile.mkdtemp(prefix="documind_suite_")
+    corpus_dir = os.path.join(workdir, "corpus")
+    os.makedirs(corpus_dir)
+    total_chunks = total_chars = num_files = 0
+    try:
+        # 按每个文本块约(chunk_size - chunk_overlap)个新字符估算语料规模，逐个文件生成、导入后删除，
+        # 磁盘和内存中都只保留一个源文件
+        num_chars = num_chunks * (args.chunk_size - args.chunk_overlap)
+        documents = iter_documents(language, num_chars, args.file_chars, seed=args.seed)
+        for i, paragraphs in enumerate(documents):
+            if total_chunks >= num_chunks:
+                break
+            path = os.path.join(corpus_dir, f"{language}_{i:05d}.{args.format}")
+            write_document(path, paragraphs, args.format)
+
+            start = time.perf_counter()
+            segments = list(processor._iter_segments(path))
+            seconds["extraction"] += time.perf_counter() - start
+
+            start = time.perf_counter()
+            chunks = list(processor._chunk_segments(iter(segments), os.path.basename(path)))
+            seconds["chunking"] += time.perf_counter() - start
+
+            start = time.perf_counter()
+            store.embed_batch([chunk["content"] for chunk in chunks])
+            seconds["embedding"] += time.perf_counter() - start
+
+            start = time.perf_counter()
+            store.add_documents(chunks)
+            seconds["add_documents"] += time.perf_counter() - start
+
+            total_chunks += len(chunks)
+            total_chars += sum(len(text) for _, text in segments)
+            num_files += 1
+            os.remove(path)
+        peak["add_documents"] = peak_rss_mb()
+
+        store_dir = os.path.join(workdir, "stores")
+        start = time.perf_counter()
+        store.save(store_dir, "suite")
+        seconds["save"] = time.perf_counter() - start
+        store_bytes = directory_size(os.path.join(store_dir, "suite"))
+        peak["save"] = peak_rss_mb()
+        del store
+
+        start = time.perf_counter()
+        store = VectorStore.load(store_dir, "suite")
+        seconds["load"] = time.perf_counter() - start
+        peak["load"] = peak_rss_mb()
+
+        # 查询取自同一段落池之外的新段落，与语料用词一致但内容不同
+        rng = random.Random(args.seed + 1)
+        queries = [make_paragraph(rng, language, 1) for _ in range(args.queries)]
+        for query in queries[:min(10, len(queries))]:
+            store.similarity_search(query, k=args.k)  # 预热
+        latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            store.similarity_search(query, k=args.k)
+            latencies.append(time.perf_counter() - start)
+        seconds["search"] = sum(latencies)
+        peak["search"] = peak_rss_mb()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "language": language,
+        "target_chunks": num_chunks,
+        "chunks": total_chunks,
+        "chars": total_chars,
+        "files": num_files,
+        "seconds": {stage: round(value, 4) for stage, value in seconds.items()},
+        "chunks_per_second": {stage: round(total_chunks / seconds[stage], 1) if seconds[stage] else None
+                              for stage in ("extraction", "chunking", "embedding", "add_documents")},
+        "store_bytes": store_bytes,
+        "search": dict(latency_stats(latencies), queries=len(latencies), k=args.k),
+        "peak_rss_mb": peak
+    }
+
+
+def environment() -> dict:
+    """运行环境信息，便于比较不同机器或不同提交上的结果"""
+    import faiss
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "faiss": faiss.__version__
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="导入、建索引与检索的基准测试套件")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000], help="语料规模（文本块数量）")
+    parser.add_argument("--languages", nargs="+", choices=["zh", "en"], default=["zh", "en"], help="语料语言")
+    parser.add_argument("--format", choices=["txt", "docx"], default="txt", help="语料文件格式")
+    parser.add_argument("--file-chars", type=int, default=1_000_000, help="每个语料文件的字符数")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="文本块大小")
+    parser.add_argument("--chunk-overlap", type=int, default=200, help="文本块重叠大小")
+    parser.add_argument("--embedding-dim", type=int, default=768, help="嵌入维度")
+    parser.add_argument("--batch-size", type=int, default=256, help="嵌入批大小")
+    parser.add_argument("--index-type", choices=["flat", "ivf_flat", "ivf_pq", "hnsw"], default="flat",
+                        help="FAISS索引类型")
+    parser.add_argument("--queries", type=int, default=200, help="检索阶段的查询数量")
+    parser.add_argument("--k", type=int, default=5, help="每个查询返回的文档数量")
+    parser.add_argument("--seed", type=int, default=0, help="语料随机种子")
+    parser.add_argument("--output", help="结果JSON的保存路径，默认只输出到标准输出")
+    parser.add_argument("--case", nargs=2, metavar=("SIZE", "LANGUAGE"), help="只运行一个组合（供子进程使用）")
+    args = parser.parse_args()
+
+    if args.case:
+        print(json.dumps(run_case(args, int(args.case[0]), args.case[1])))
+        return
+
+    config = {key: value for key, value in vars(args).items() if key not in ("output", "case")}
+    runs = []
+    for size in args.sizes:
+        for language in args.languages:
+            command = [sys.executable, __file__, "--case", str(size), language]
+            for key in ("format", "file_chars", "chunk_size", "chunk_overlap", "embedding_dim", "batch_size",
+                        "index_type", "queries", "k", "seed"):
+                command += [f"--{key.replace('_', '-')}", str(getattr(args, key))]
+            result = json.loads(subprocess.run(command, capture_output=True, text=True, check=True).stdout)
+            runs.append(result)
+            s = result["seconds"]
+            print(f"{language} {result['chunks']:>9} 块  提取 {s['extraction']:.2f}s  分块 {s['chunking']:.2f}s  "
+                  f"嵌入 {s['embedding']:.2f}s  添加 {s['add_documents']:.2f}s  保存 {s['save']:.2f}s  "
+                  f"加载 {s['load']:.2f}s  检索p50/p99 {result['search']['p50_ms']:.2f}/"
+                  f"{result['search']['p99_ms']:.2f}ms  峰值 {max(result['peak_rss_mb'].values()):.0f}MB",
+                  file=sys.stderr)
+
+    report = {"meta": dict(environment(), config=config), "runs": runs}
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
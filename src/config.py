@@ -20,15 +20,100 @@ os.makedirs(VECTOR_STORE_DIR, exist_ok=True)
 DOCUMENT_PROCESSING = {
     "chunk_size": 1000,  # 文本块大小
     "chunk_overlap": 200,  # 文本块重叠大小
+    "length_unit": "char",  # 文本块长度的计算单位：char按字符，token按近似词元
+    "dedup_threshold": 0.9,  # 近似重复文本块的相似度阈值，None表示不去重，1.0表示只剔除完全重复
+    "cross_source_dedup": False,  # 知识库服务是否跨文档去重（重复块的来源合并到已有文本块），关闭时只在单个文档内去重
     "supported_extensions": [".pdf", ".docx", ".txt"]  # 支持的文件扩展名
 }
 
+# 向量存储配置
+VECTOR_STORE_CONFIG = {
+    "embedding_batch_size": 256,  # 批量嵌入时每批的文本数量
+    "embedder_type": "hash",  # 嵌入后端类型：hash / sentence_transformer
+    "embedder_kwargs": {"embedding_dim": 768},  # 传递给嵌入后端的参数
+    "embedding_cache_path": os.path.join(KNOWLEDGE_BASE_DIR, "embedding_cache.sqlite"),  # 嵌入缓存文件，设为None关闭缓存
+    "embedding_cache_max_entries": 200000,  # 嵌入缓存最多保存的向量数量
+    "index_type": "flat",  # 索引类型：flat / ivf_flat / ivf_pq / hnsw
+    "index_params": {  # 索引参数，未指定的使用默认值
+        "nlist": 256,
+        "nprobe": 8,
+        "ef_search": 64
+    },
+    "compaction_threshold": 0.2,  # 已删除但未从索引物理移除的向量占比超过该值时后台重建索引
+    "lexical_index": True,  # 是否同时建立BM25倒排索引（jieba分词）
+    "search_mode": "hybrid",  # 检索方式：vector向量检索 / lexical关键词检索 / hybrid两者RRF融合
+    "mmr_lambda": None,  # MMR多样性重排的相关性权重（0~1，越小越偏向多样性），None表示不重排
+    "mmr_fetch_k": 20  # MMR重排前取回的候选数量
+}
+
+# 检索结果和回答缓存配置（缓存在内存中，向量存储变化后检索缓存自动失效）
+CACHE_CONFIG = {
+    "enabled": True,  # 是否启用缓存
+    "policy": "lru",  # 超过容量时的淘汰策略：lru最久未访问 / fifo最早写入
+    "retrieval_max_entries": 1024,  # 最多缓存的检索结果数量
+    "retrieval_ttl": 600,  # 检索结果的有效期（秒），None表示不过期
+    "answer_max_entries": 256,  # 最多缓存的回答数量
+    "answer_ttl": 3600,  # 回答的有效期（秒），None表示不过期
+    "semantic_enabled": True,  # 是否启用语义回答缓存（相似问题复用回答，需使用语义嵌入器，hash嵌入器只能命中相同的问题）
+    "semantic_threshold": 0.92,  # 语义缓存命中所需的最低余弦相似度
+    "semantic_max_entries": 1000,  # 语义缓存最多保存的问题数量
+    "semantic_ttl": 3600  # 语义缓存条目的有效期（秒），None表示不过期
+}
+
 # 模型配置
 MODEL_CONFIG = {
     "default_model": "智谱 ChatGLM Turbo",  # 默认模型
     "temperature": 0.7,  # 默认温度
     "max_tokens": 2048,  # 默认最大生成长度
-    "top_k": 3  # 默认检索文档数量
+    "top_k": 3,  # 默认检索文档数量
+    "context_budget": 2000,  # 提示中上下文文档的默认词元预算（不含问题），超出时按相关度取舍
+    "context_budgets": {  # 各模型的上下文词元预算，未列出的模型使用context_budget
+        "ERNIE-Bot": 1500,
+        "ERNIE-Bot-4": 1500,
+        "ERNIE-Bot-8k": 5000,
+        "ERNIE-Speed": 5000
+    }
+}
+
+# 批量问答配置
+PIPELINE_CONFIG = {
+    "concurrency": 16,  # 同时进行的模型调用数量
+    "retrieval_batch_size": 64,  # 每批检索的问题数量
+    "rate_limits": {  # 各模型提供方每秒最多发起的请求数量，None表示不限制
+        "zhipu": 10,
+        "baidu": 5
+    }
+}
+
+# 知识库HTTP服务配置
+SERVICE_CONFIG = {
+    "api_url": os.getenv("DOCUMIND_API_URL"),  # 设置后app.py通过该地址调用知识库服务，否则在Streamlit进程内直接加载知识库
+    "host": "127.0.0.1",  # 服务监听地址
+    "port": 8000,  # 服务监听端口
+    "max_upload_mb": 200  # 导入文档的最大文件大小（MB）
+}
+
+# 模拟大模型提供方服务配置（python -m src.server.mock_provider，用于离线压力测试）
+MOCK_PROVIDER_CONFIG = {
+    "host": "127.0.0.1",  # 监听地址
+    "port": 8001,  # 监听端口
+    "first_token_ms": 300,  # 首字延迟（毫秒）
+    "tokens_per_second": 30,  # 每秒生成的片段数量
+    "output_tokens": 120,  # 每个回答的片段数量
+    "error_rate": 0.0,  # 请求出错的概率，流式请求在随机位置中断
+    "rate_limit_rate": 0.0,  # 请求被随机限流的概率
+    "qps_limit": None,  # 每秒最多接受的对话请求数量，None表示不限制
+    "token_latency_ms": 50,  # 百度访问令牌接口的延迟（毫秒）
+    "seed": 0  # 随机种子
+}
+
+# 链路追踪与指标配置（启用后记录文档处理、检索、提示构建和模型生成各阶段的耗时）
+TRACING_CONFIG = {
+    "enabled": os.getenv("DOCUMIND_TRACING", "").lower() in ("1", "true", "yes"),  # 是否启用，也可在应用侧边栏中开关
+    "max_spans": 500,  # 保留的最近span数量
+    "buckets": [  # 耗时直方图的分桶上界（秒）
+        0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60
+    ]
 }
 
 # 模型类型映射
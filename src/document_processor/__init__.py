@@ -1,6 +1,20 @@
 # 文档处理模块
 # 负责解析不同格式的文档并将其分割成小块
 
-from .processor import DocumentProcessor
+import importlib
 
-__all__ = ["DocumentProcessor"]
\ No newline at end of file
+# 导出名称 -> 所在子模块，子模块在首次访问对应名称时才导入
+_EXPORTS = {
+    "DocumentProcessor": ".processor",
+    "ChunkDeduplicator": ".dedup",
+    "RecursiveTextSplitter": ".splitter",
+    "count_tokens": ".splitter",
+    "truncate_tokens": ".splitter"
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
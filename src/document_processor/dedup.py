@@ -0,0 +1,213 @@
+import hashlib
+import re
+from typing import List, Dict, Any, Optional, Tuple, Iterable, Hashable
+
+import numpy as np
+
+# 乘法-移位哈希取64位乘积的高32位
+_HASH_SHIFT = np.uint64(32)
+
+class ChunkDeduplicator:
+    """文本块去重器，剔除完全重复和近似重复的文本块
+
+    完全重复：规范化文本（合并空白、小写）的sha256相同。
+    近似重复：字符n-gram的MinHash签名通过LSH分桶找出候选，估计的Jaccard相似度不低于阈值。
+
+    每组重复只保留最先出现的文本块作为规范块，其余重复块的来源合并到规范块的
+    metadata["sources"]中，重复次数记录在metadata["duplicate_count"]中。
+    去重器是有状态的：多次调用deduplicate时，后面的文本块也会与之前保留的文本块比较。
+
+    check/forget以调用方提供的key（如向量存储中的文档ID）登记规范块，由调用方自己合并元数据。
+    """
+
+    def __init__(self, threshold: float = 0.9, num_perm: int = 64, shingle_size: int = 5, seed: int = 1):
+        """初始化去重器
+
+        Args:
+            threshold: 近似重复的Jaccard相似度阈值，设为1.0时只剔除完全重复
+            num_perm: MinHash签名长度
+            shingle_size: 字符n-gram的长度（对中文同样适用，无需分词）
+            seed: 随机种子，保证签名可复现
+        """
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+
+        rng = np.random.default_rng(seed)
+        # 乘法-移位哈希的参数，乘数取奇数
+        self._a = rng.integers(1, 2 ** 63, num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64)
+        self.bands, self.rows = self._choose_bands(num_perm, threshold)
+
+        self.reset()
+
+    @staticmethod
+    def _choose_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+        """选择LSH分桶参数，使候选概率的拐点(1/b)^(1/r)最接近阈值"""
+        best = (num_perm, 1)
+        best_error = float("inf")
+        for bands in range(1, num_perm + 1):
+            if num_perm % bands:
+                continue
+            rows = num_perm // bands
+            error = abs((1.0 / bands) ** (1.0 / rows) - threshold)
+            if error < best_error:
+                best, best_error = (bands, rows), error
+        return best
+
+    def reset(self):
+        """清空已记录的文本块和统计信息"""
+        self._canonical = []  # 规范块的key（None表示已被forget）
+        self._signatures = []
+        self._key_index = {}  # 规范块的key -> 下标
+        self._kept = {}  # deduplicate保留的规范块：key -> 文本块
+        self._exact = {}  # 文本哈希 -> 规范块下标
+        self._buckets = [{} for _ in range(self.bands)]  # 每个分段：桶键 -> 规范块下标列表
+        self.stats = {"input": 0, "exact_duplicates": 0, "near_duplicates": 0, "output": 0}
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        return re.sub(r"\s+", " ", text).strip().lower()
+
+    def _signature(self, text: str) -> Optional[np.ndarray]:
+        """计算文本的MinHash签名，文本短于n-gram长度时返回None"""
+        codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+        if len(codes) < self.shingle_size:
+            return None
+
+        # 滚动多项式哈希得到每个n-gram的64位哈希值（溢出即取模2^64）
+        shingles = np.zeros(len(codes) - self.shingle_size + 1, dtype=np.uint64)
+        for offset in range(self.shingle_size):
+            shingles = shingles * np.uint64(1000003) + codes[offset:offset + len(shingles)]
+        shingles = np.unique(shingles)
+
+        hashed = (self._a[:, None] * shingles[None, :] + self._b[:, None]) >> _HASH_SHIFT
+        return hashed.min(axis=1)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+
+    def _find_near_duplicate(self, signature: np.ndarray) -> Optional[int]:
+        """在已保留的文本块中查找近似重复的规范块"""
+        candidates = set()
+        for band, key in enumerate(self._band_keys(signature)):
+            candidates.update(self._buckets[band].get(key, ()))
+        best, best_similarity = None, self.threshold
+        for candidate in candidates:
+            if self._canonical[candidate] is None:
+                continue
+            similarity = float(np.mean(self._signatures[candidate] == signature))
+            if similarity >= best_similarity:
+                best, best_similarity = candidate, similarity
+        return best
+
+    @staticmethod
+    def _merge(canonical: Dict[str, Any], duplicate: Dict[str, Any]):
+        """将重复块的来源合并到规范块的元数据中"""
+        metadata = canonical.setdefault("metadata", {})
+        sources = metadata.setdefault("sources", [metadata["source"]] if "source" in metadata else [])
+        source = duplicate.get("metadata", {}).get("source")
+        if source is not None and source not in sources:
+            sources.append(source)
+        metadata["duplicate_count"] = metadata.get("duplicate_count", 0) + 1
+
+    @classmethod
+    def merge_sources(cls, canonical: Dict[str, Any], duplicate: Dict[str, Any]) -> Dict[str, Any]:
+        """返回合并了重复块来源的规范块副本，不修改传入的文本块
+
+        Args:
+            canonical: 规范块
+            duplicate: 重复块
+
+        Returns:
+            合并后的规范块
+        """
+        metadata = dict(canonical.get("metadata", {}))
+        if "sources" in metadata:
+            metadata["sources"] = list(metadata["sources"])
+        merged = {**canonical, "metadata": metadata}
+        cls._merge(merged, duplicate)
+        return merged
+
+    def check(self, chunk: Dict[str, Any], key: Hashable) -> Optional[Hashable]:
+        """检查文本块是否与已保留的规范块重复，不重复时以key登记为新的规范块
+
+        Args:
+            chunk: 文本块，包含内容和元数据
+            key: 文本块不重复时用于登记的key
+
+        Returns:
+            重复时返回规范块的key，否则返回None
+        """
+        self.stats["input"] += 1
+        normalized = self._normalize(chunk["content"])
+        digest = hashlib.sha256(normalized.encode("utf-8")).digest()
+
+        canonical_idx = self._exact.get(digest)
+        if canonical_idx is not None and self._canonical[canonical_idx] is not None:
+            self.stats["exact_duplicates"] += 1
+            return self._canonical[canonical_idx]
+
+        signature = self._signature(normalized) if self.threshold < 1.0 else None
+        if signature is not None:
+            canonical_idx = self._find_near_duplicate(signature)
+            if canonical_idx is not None:
+                self.stats["near_duplicates"] += 1
+                return self._canonical[canonical_idx]
+
+        # 新的规范块
+        canonical_idx = len(self._canonical)
+        self._canonical.append(key)
+        self._signatures.append(signature)
+        self._key_index[key] = (canonical_idx, digest)
+        self._exact[digest] = canonical_idx
+        if signature is not None:
+            for band, band_key in enumerate(self._band_keys(signature)):
+                self._buckets[band].setdefault(band_key, []).append(canonical_idx)
+        self.stats["output"] += 1
+        return None
+
+    def deduplicate(self, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """剔除重复的文本块
+
+        Args:
+            chunks: 文本块列表，每个文本块是一个字典，包含内容和元数据
+
+        Returns:
+            去重后的文本块列表（规范块的元数据会被就地更新）
+        """
+        unique = []
+        for chunk in chunks:
+            canonical_key = self.check(chunk, id(chunk))
+            if canonical_key is not None:
+                self._merge(self._kept[canonical_key], chunk)
+                continue
+            # 保持对规范块的引用，保证id不被复用
+            self._kept[id(chunk)] = chunk
+            unique.append(chunk)
+        return unique
+
+    def forget(self, keys: Iterable[Hashable]):
+        """不再把指定key的文本块作为规范块（例如文本块已从向量存储中删除）
+
+        Args:
+            keys: 登记规范块时使用的key
+        """
+        for key in keys:
+            entry = self._key_index.pop(key, None)
+            if entry is None:
+                continue
+            canonical_idx, digest = entry
+            if self._exact.get(digest) == canonical_idx:
+                self._exact.pop(digest)
+            # 分桶中的下标在查找时跳过
+            self._canonical[canonical_idx] = None
+            self._signatures[canonical_idx] = None
+            self._kept.pop(key, None)
+
+    def report(self) -> str:
+        """生成去重统计的可读报告"""
+        removed = self.stats["exact_duplicates"] + self.stats["near_duplicates"]
+        ratio = removed / self.stats["input"] if self.stats["input"] else 0.0
+        return (f"输入 {self.stats['input']} 个文本块，剔除完全重复 {self.stats['exact_duplicates']} 个、"
+                f"近似重复 {self.stats['near_duplicates']} 个（{ratio:.1%}），保留 {self.stats['output']} 个")
@@ -1,31 +1,52 @@
 import os
 import re
-from typing import List, Dict, Any
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import List, Dict, Any, Optional, Iterator, Iterable, Tuple, Callable
 
-# 导入文档处理相关库
-from PyPDF2 import PdfReader
-from docx import Document
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from .dedup import ChunkDeduplicator
+from .splitter import RecursiveTextSplitter, DEFAULT_SEPARATORS
+from ..utils.tracing import get_tracer, traced
+
+# 工作进程中复用的文档处理器，由_init_worker创建
+_worker_processor = None
+
+def _init_worker(chunk_size: int, chunk_overlap: int, dedup_threshold: Optional[float],
+                 length_function: Optional[Callable[[str], int]]):
+    """进程池工作进程的初始化函数"""
+    global _worker_processor
+    _worker_processor = DocumentProcessor(chunk_size, chunk_overlap, dedup_threshold, length_function)
+
+def _process_in_worker(file_path: str) -> Dict[str, Any]:
+    """在工作进程中处理单个文档"""
+    return _worker_processor._process_safely(file_path)
 
 class DocumentProcessor:
     """文档处理类，负责解析不同格式的文档并将其分割成小块"""
     
-    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200):
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200, dedup_threshold: Optional[float] = None,
+                 length_function: Optional[Callable[[str], int]] = None):
         """初始化文档处理器
         
         Args:
             chunk_size: 文本块大小
             chunk_overlap: 文本块重叠大小
+            dedup_threshold: 文档内文本块去重的相似度阈值，为None时不去重，为1.0时只剔除完全重复
+            length_function: 计算文本块长度的函数（如splitter.count_tokens按词元计算），默认按字符数计算
         """
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
-        self.text_splitter = RecursiveCharacterTextSplitter(
+        self.dedup_threshold = dedup_threshold
+        self.length_function = length_function
+        self.last_dedup_stats = None  # 最近一次处理文档时的去重统计
+        self.text_splitter = RecursiveTextSplitter(
             chunk_size=chunk_size,
             chunk_overlap=chunk_overlap,
-            length_function=len,
-            separators=["\n\n", "\n", "。", "！", "？", ".", "!", "?", " ", ""]
+            separators=DEFAULT_SEPARATORS,
+            length_function=length_function
         )
     
+    @traced("document.process")
     def process_document(self, file_path: str) -> List[Dict[str, Any]]:
         """处理文档，提取文本并分块
         
@@ -35,54 +56,204 @@ class DocumentProcessor:
         Returns:
             包含文本块和元数据的列表
         """
+        return list(self.process_document_stream(file_path))
+    
+    def process_documents(self, file_paths: Iterable[str], workers: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """使用进程池并行处理多个文档，按完成顺序返回结果
+        
+        单个文档处理失败不影响其他文档，错误信息记录在结果中。
+        调用方在消费结果（如嵌入、建索引）的同时，进程池继续解析后续文档。
+        
+        Args:
+            file_paths: 文档路径列表
+            workers: 工作进程数量，默认使用CPU核数，为1时在当前进程中依次处理
+            
+        Yields:
+            每个文档的处理结果，包含path、chunks（失败时为空列表）和error（成功时为None）
+        """
+        workers = workers or os.cpu_count() or 1
+        if workers == 1:
+            for file_path in file_paths:
+                yield self._process_safely(file_path)
+            return
+        
+        file_paths = iter(file_paths)
+        # 限制已提交但未取回的任务数量，避免大批量文档的结果堆积在内存中
+        max_pending = workers * 2
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(self.chunk_size, self.chunk_overlap, self.dedup_threshold,
+                                           self.length_function)) as executor:
+            pending = {}
+            while True:
+                for file_path in file_paths:
+                    pending[executor.submit(_process_in_worker, file_path)] = file_path
+                    if len(pending) >= max_pending:
+                        break
+                if not pending:
+                    break
+                
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    file_path = pending.pop(future)
+                    try:
+                        yield future.result()
+                    except Exception as e:
+                        # 工作进程异常退出等进程池层面的错误
+                        yield {"path": file_path, "chunks": [], "error": f"{type(e).__name__}: {e}"}
+    
+    def _process_safely(self, file_path: str) -> Dict[str, Any]:
+        """处理单个文档，捕获异常并记录在结果中"""
+        try:
+            return {"path": file_path, "chunks": self.process_document(file_path), "error": None}
+        except Exception as e:
+            return {"path": file_path, "chunks": [], "error": f"{type(e).__name__}: {e}"}
+    
+    def process_document_stream(self, file_path: str) -> Iterator[Dict[str, Any]]:
+        """流式处理文档，逐页（逐段）提取、清理并分块
+        
+        只在内存中保留尚未分块的少量文本，峰值内存与文档大小无关。
+        文本块元数据中包含其在清理后全文中的字符位置（start_index、end_index），
+        PDF文档还包含起止页码（page、page_end，从1开始）。
+        
+        Args:
+            file_path: 文档路径
+            
+        Yields:
+            包含文本和元数据的文本块字典
+            
+        Raises:
+            ValueError: 如果文件类型不支持
+        """
+        # 启用追踪时分别统计提取和分块的耗时
+        tracer = get_tracer()
+        segments = tracer.timed_iterator("document.extract", self._iter_segments(file_path),
+                                         format=os.path.splitext(file_path)[1])
+        chunks = tracer.timed_iterator("document.chunk", self._chunk_segments(segments, os.path.basename(file_path)),
+                                       exclude=segments if tracer.enabled else None)
+        
+        # 剔除文档内重复的文本块（如每页重复的页眉、免责声明）
+        if self.dedup_threshold is None:
+            yield from chunks
+            return
+        deduplicator = ChunkDeduplicator(threshold=self.dedup_threshold)
+        self.last_dedup_stats = deduplicator.stats
+        for chunk in chunks:
+            yield from deduplicator.deduplicate([chunk])
+    
+    def _iter_segments(self, file_path: str) -> Iterator[Tuple[Optional[int], str]]:
+        """根据文件类型逐段提取文本，返回(页码, 文本)，没有页码的格式页码为None
+        
+        各段文本包含与整篇提取时相同的分隔符，拼接后与_extract_text_from_*的结果一致
+        """
         # 获取文件扩展名
         _, file_extension = os.path.splitext(file_path)
         
-        # 根据文件类型提取文本
         if file_extension == ".pdf":
-            text = self._extract_text_from_pdf(file_path)
+            return self._iter_pdf_pages(file_path)
         elif file_extension == ".docx":
-            text = self._extract_text_from_docx(file_path)
+            return ((None, text + "\n") for text in self._iter_docx_paragraphs(file_path))
         elif file_extension == ".txt":
-            text = self._extract_text_from_txt(file_path)
+            return ((None, text) for text in self._iter_txt_blocks(file_path))
         else:
             raise ValueError(f"不支持的文件类型: {file_extension}")
+    
+    def _chunk_segments(self, segments: Iterator[Tuple[Optional[int], str]], source: str) -> Iterator[Dict[str, Any]]:
+        """增量地清理并分割文本段
         
-        # 清理文本
-        text = self._clean_text(text)
-        
-        # 分割文本
-        chunks = self.text_splitter.create_documents([text])
+        文本段追加到缓冲区，缓冲区超过一定长度后只输出不受后续文本影响的文本块，
+        其余部分（末尾片段及尚未合并完的短片段）留在缓冲区中与后续文本一起分块，并沿用同一顶层分隔符。
+        整篇选择的顶层分隔符在第一次分块前已出现时，块边界和重叠与整篇分块完全一致；
+        优先级更高的分隔符只出现在文档靠后位置时，之前输出的文本块按较低优先级的分隔符切分。
+        缓冲区最多保留一个顶层片段，不含顶层分隔符的超长文本会使缓冲区持续增长。
+        """
+        flush_size = max(self.chunk_size * 8, 8192)
+        buffer = ""
+        buffer_start = 0  # 缓冲区在清理后全文中的起始位置
+        page_offsets = []  # 每页在缓冲区中的起始位置
+        page_numbers = []
+        chunk_id = 0
+        separator = None  # 顶层分隔符，第一次分块时确定
         
-        # 转换为字典列表，包含文本和元数据
-        document_chunks = []
-        for i, chunk in enumerate(chunks):
-            document_chunks.append({
-                "content": chunk.page_content,
-                "metadata": {
-                    "source": os.path.basename(file_path),
-                    "chunk_id": i
+        def emit(spans):
+            nonlocal chunk_id
+            for start, end in spans:
+                metadata = {
+                    "source": source,
+                    "chunk_id": chunk_id,
+                    "start_index": buffer_start + start,
+                    "end_index": buffer_start + end
                 }
-            })
+                if page_numbers:
+                    metadata["page"] = page_numbers[max(bisect_right(page_offsets, start) - 1, 0)]
+                    metadata["page_end"] = page_numbers[max(bisect_right(page_offsets, end - 1) - 1, 0)]
+                chunk_id += 1
+                yield {"content": buffer[start:end], "metadata": metadata}
+        
+        for page, text in segments:
+            # 与_clean_text一致：连续空白（包括跨段的空白）合并为单个空格
+            text = re.sub(r"\s+", " ", text)
+            if not buffer or buffer.endswith(" "):
+                text = text.lstrip(" ")
+            if not text:
+                continue
+            if page is not None and (not page_numbers or page_numbers[-1] != page):
+                page_offsets.append(len(buffer))
+                page_numbers.append(page)
+            buffer += text
+            
+            if len(buffer) < flush_size:
+                continue
+            spans, cut, separator = self.text_splitter.split_spans_partial(buffer, separator)
+            if cut == 0:
+                continue
+            yield from emit(spans)
+            
+            # 只保留未分块的部分及其所在页的信息
+            buffer = buffer[cut:]
+            buffer_start += cut
+            first = max(bisect_right(page_offsets, cut) - 1, 0)
+            page_offsets = [max(offset - cut, 0) for offset in page_offsets[first:]]
+            page_numbers = page_numbers[first:]
         
-        return document_chunks
+        # 与_clean_text一致，去除全文末尾的空白
+        buffer = buffer.rstrip()
+        if buffer:
+            yield from emit(self.text_splitter.split_spans(buffer, separator))
     
-    def _extract_text_from_pdf(self, file_path: str) -> str:
-        """从PDF文件中提取文本"""
-        text = ""
+    def _iter_pdf_pages(self, file_path: str) -> Iterator[Tuple[int, str]]:
+        """逐页提取PDF文件中的文本（每页末尾带分隔符），页码从1开始"""
+        # 解析库在首次处理对应格式时才导入，加快启动速度
+        from PyPDF2 import PdfReader
+        
         with open(file_path, "rb") as file:
             pdf = PdfReader(file)
-            for page in pdf.pages:
-                text += page.extract_text() + "\n\n"
-        return text
+            for page_number, page in enumerate(pdf.pages, start=1):
+                yield page_number, (page.extract_text() or "") + "\n\n"
     
-    def _extract_text_from_docx(self, file_path: str) -> str:
-        """从DOCX文件中提取文本"""
+    def _iter_docx_paragraphs(self, file_path: str) -> Iterator[str]:
+        """逐段提取DOCX文件中的文本"""
+        from docx import Document
+        
         doc = Document(file_path)
-        text = ""
         for para in doc.paragraphs:
-            text += para.text + "\n"
-        return text
+            yield para.text
+    
+    def _iter_txt_blocks(self, file_path: str, block_size: int = 1 << 20) -> Iterator[str]:
+        """按固定大小分块读取TXT文件"""
+        with open(file_path, "r", encoding="utf-8") as file:
+            while True:
+                block = file.read(block_size)
+                if not block:
+                    break
+                yield block
+    
+    def _extract_text_from_pdf(self, file_path: str) -> str:
+        """从PDF文件中提取文本"""
+        return "".join(text for _, text in self._iter_pdf_pages(file_path))
+    
+    def _extract_text_from_docx(self, file_path: str) -> str:
+        """从DOCX文件中提取文本"""
+        return "".join(text + "\n" for text in self._iter_docx_paragraphs(file_path))
     
     def _extract_text_from_txt(self, file_path: str) -> str:
         """从TXT文件中提取文本"""
@@ -0,0 +1,237 @@
+import re
+from collections import deque
+from typing import List, Tuple, Optional, Callable
+
+# 默认分隔符，按优先级从高到低
+DEFAULT_SEPARATORS = ["\n\n", "\n", "。", "！", "？", ".", "!", "?", " ", ""]
+
+# 近似的词元划分：每个汉字、每个连续的字母数字串、每个其他非空白字符各算一个词元
+_TOKEN_PATTERN = re.compile(r"[㐀-鿿豈-﫿]|[A-Za-z0-9_]+|[^\sA-Za-z0-9_㐀-鿿豈-﫿]")
+
+def count_tokens(text: str) -> int:
+    """近似统计文本的词元数量，可作为按词元计算长度的length_function
+
+    Args:
+        text: 文本
+
+    Returns:
+        词元数量
+    """
+    return len(_TOKEN_PATTERN.findall(text))
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """截取文本开头不超过max_tokens个词元（按count_tokens的划分）的部分
+
+    Args:
+        text: 文本
+        max_tokens: 最多保留的词元数量
+
+    Returns:
+        截取后的文本
+    """
+    if max_tokens <= 0:
+        return ""
+    end = 0
+    for i, match in enumerate(_TOKEN_PATTERN.finditer(text)):
+        if i == max_tokens:
+            break
+        end = match.end()
+    else:
+        return text
+    return text[:end]
+
+class RecursiveTextSplitter:
+    """递归字符文本分割器
+
+    与langchain的RecursiveCharacterTextSplitter（keep_separator=True）分块结果一致：
+    依次尝试按分隔符列表中第一个出现在文本中的分隔符切分，分隔符保留在后一段的开头，
+    过长的片段用后续分隔符递归切分，再把相邻片段合并成不超过chunk_size的文本块，相邻文本块重叠不超过chunk_overlap。
+
+    所有片段都以原文中的(起始, 结束)位置表示，合并时不拼接字符串，因此能直接得到每个文本块在原文中的位置。
+    """
+
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200, separators: Optional[List[str]] = None,
+                 length_function: Optional[Callable[[str], int]] = None):
+        """初始化分割器
+
+        Args:
+            chunk_size: 文本块大小
+            chunk_overlap: 文本块重叠大小
+            separators: 分隔符列表，按优先级从高到低，默认使用DEFAULT_SEPARATORS
+            length_function: 计算文本长度的函数（如count_tokens），默认按字符数计算
+
+        Raises:
+            ValueError: 如果重叠大小大于文本块大小
+        """
+        if chunk_overlap > chunk_size:
+            raise ValueError(f"文本块重叠大小 {chunk_overlap} 不能大于文本块大小 {chunk_size}")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.separators = list(separators) if separators is not None else list(DEFAULT_SEPARATORS)
+        self.length_function = length_function
+        self._patterns = {}  # 分隔符 -> 编译后的正则表达式
+
+    def split_text(self, text: str) -> List[str]:
+        """分割文本
+
+        Args:
+            text: 待分割的文本
+
+        Returns:
+            文本块列表
+        """
+        return [text[start:end] for start, end in self.split_spans(text)]
+
+    def split_spans(self, text: str, separator: Optional[str] = None) -> List[Tuple[int, int]]:
+        """分割文本，返回每个文本块在原文中的位置
+
+        Args:
+            text: 待分割的文本
+            separator: 顶层分隔符的最低优先级（流式分块时使各段与之前的段使用相同的顶层分隔符），
+                文本中出现优先级更高的分隔符时仍使用后者；默认不限制
+
+        Returns:
+            (起始位置, 结束位置)列表，text[起始位置:结束位置]即文本块内容
+        """
+        return self._split(text, 0, len(text), self._candidates(separator))
+
+    def split_spans_partial(self, text: str, separator: Optional[str] = None) -> Tuple[List[Tuple[int, int]], int, str]:
+        """分割后面还会追加文本的前缀（用于流式分块），只返回不受后续文本影响的文本块
+
+        最后一个顶层片段可能被后续文本延长，末尾尚未合并完的短片段也可能与后续片段合并，它们都不参与本次分块。
+        把text[续接位置:]与后续文本拼接后，以返回的顶层分隔符继续分割（split_spans_partial或split_spans），
+        得到的文本块接在本次返回的文本块之后，与整篇一次分割的结果相同
+        （前提是整篇选择的顶层分隔符已出现在第一次分割的前缀中）。
+
+        Args:
+            text: 待分割的前缀
+            separator: 顶层分隔符的最低优先级，即上一次调用返回的分隔符；默认不限制
+
+        Returns:
+            (确定的文本块位置列表, 续接位置, 本次使用的顶层分隔符)
+        """
+        candidates = self._candidates(separator)
+        index = self._choose_separator(text, 0, len(text), candidates)
+        separator, remaining = candidates[index], self._remaining(candidates, index)
+
+        pieces = self._split_by_separator(text, 0, len(text), separator)
+        if len(pieces) < 2:
+            return [], 0, separator
+        resume = pieces[-1][0]
+        chunks, pending = self._split_pieces(text, pieces[:-1], remaining)
+        if pending:
+            merged, resume = self._merge(text, pending, emit_last=False)
+            chunks.extend(merged)
+        return chunks, resume, separator
+
+    def _candidates(self, separator: Optional[str]) -> List[str]:
+        """顶层分隔符的候选：优先级不低于separator的分隔符"""
+        if separator is None:
+            return self.separators
+        return self.separators[:self.separators.index(separator) + 1]
+
+    def _remaining(self, separators: List[str], index: int) -> List[str]:
+        """选择separators[index]后，过长片段递归切分时使用的后续分隔符"""
+        if separators[index] == "":
+            return []
+        return self.separators[self.separators.index(separators[index]) + 1:]
+
+    @staticmethod
+    def _choose_separator(text: str, start: int, end: int, separators: List[str]) -> int:
+        """选择第一个出现在text[start:end]中的分隔符，返回其下标，都未出现时返回最后一个"""
+        for i, candidate in enumerate(separators):
+            if candidate == "" or text.find(candidate, start, end) >= 0:
+                return i
+        return len(separators) - 1
+
+    def _split(self, text: str, start: int, end: int, separators: List[str]) -> List[Tuple[int, int]]:
+        """递归分割text[start:end]"""
+        index = self._choose_separator(text, start, end, separators)
+        pieces = self._split_by_separator(text, start, end, separators[index])
+        chunks, pending = self._split_pieces(text, pieces, self._remaining(separators, index))
+        if pending:
+            chunks.extend(self._merge(text, pending)[0])
+        return chunks
+
+    def _split_pieces(self, text: str, pieces: List[Tuple[int, int]], remaining: List[str]) -> tuple:
+        """合并短片段、递归切分过长片段
+
+        Returns:
+            (文本块位置列表, 末尾尚未合并的短片段列表)
+        """
+        chunks = []
+        pending = []  # 待合并的短片段：(起始, 结束, 长度)
+        for piece_start, piece_end in pieces:
+            if self.length_function is None:
+                length = piece_end - piece_start
+            else:
+                length = self.length_function(text[piece_start:piece_end])
+            if length < self.chunk_size:
+                pending.append((piece_start, piece_end, length))
+                continue
+
+            if pending:
+                chunks.extend(self._merge(text, pending)[0])
+                pending = []
+            if remaining:
+                chunks.extend(self._split(text, piece_start, piece_end, remaining))
+            else:
+                chunks.append((piece_start, piece_end))
+        return chunks, pending
+
+    def _split_by_separator(self, text: str, start: int, end: int, separator: str) -> List[Tuple[int, int]]:
+        """按分隔符切分，分隔符保留在后一段的开头"""
+        if separator == "":
+            return [(i, i + 1) for i in range(start, end)]
+
+        pattern = self._patterns.get(separator)
+        if pattern is None:
+            pattern = self._patterns[separator] = re.compile(re.escape(separator))
+        bounds = [start]
+        bounds.extend(match.start() for match in pattern.finditer(text, start, end))
+        bounds.append(end)
+        return [(bounds[i], bounds[i + 1]) for i in range(len(bounds) - 1) if bounds[i] < bounds[i + 1]]
+
+    def _merge(self, text: str, pieces: List[Tuple[int, int, int]], emit_last: bool = True) -> tuple:
+        """把相邻的短片段合并成文本块，保留不超过chunk_overlap的重叠
+
+        Args:
+            text: 原文
+            pieces: 短片段列表：(起始, 结束, 长度)
+            emit_last: 是否输出最后一个文本块；为False时最后一个文本块的片段留待与后续片段合并
+
+        Returns:
+            (文本块位置列表, 最后一个文本块第一个片段的起始位置，没有时为None)
+        """
+        chunks = []
+        current = deque()
+        total = 0
+        for piece in pieces:
+            length = piece[2]
+            if total + length > self.chunk_size and current:
+                chunk = self._strip(text, current[0][0], current[-1][1])
+                if chunk is not None:
+                    chunks.append(chunk)
+                # 从头部移除片段，直到剩余部分不超过重叠大小且能容纳新片段
+                while total > self.chunk_overlap or (total + length > self.chunk_size and total > 0):
+                    total -= current.popleft()[2]
+            current.append(piece)
+            total += length
+
+        if current and emit_last:
+            chunk = self._strip(text, current[0][0], current[-1][1])
+            if chunk is not None:
+                chunks.append(chunk)
+        # 从该片段开始重新合并，状态与继续合并时相同（剩余片段总长不超过chunk_size，合并时不会提前输出）
+        return chunks, current[0][0] if current else None
+
+    @staticmethod
+    def _strip(text: str, start: int, end: int) -> Optional[Tuple[int, int]]:
+        """去除文本块首尾的空白字符，全为空白时返回None"""
+        chunk = text[start:end]
+        stripped = chunk.lstrip()
+        if not stripped:
+            return None
+        start += len(chunk) - len(stripped)
+        end -= len(stripped) - len(stripped.rstrip())
+        return start, end
@@ -1,9 +1,20 @@
 # 模型适配层模块
 # 提供对不同大模型API的统一调用接口
 
-from .base_model import BaseModelAdapter
-from .zhipu_model import ZhipuModelAdapter
-from .baidu_model import BaiduModelAdapter
-from .model_factory import ModelFactory
+import importlib
 
-__all__ = ["BaseModelAdapter", "ZhipuModelAdapter", "BaiduModelAdapter", "ModelFactory"]
\ No newline at end of file
+# 导出名称 -> 所在子模块，子模块在首次访问对应名称时才导入（避免启动时导入各厂商SDK）
+_EXPORTS = {
+    "BaseModelAdapter": ".base_model",
+    "ZhipuModelAdapter": ".zhipu_model",
+    "BaiduModelAdapter": ".baidu_model",
+    "CachedModelAdapter": ".cached_model",
+    "ModelFactory": ".model_factory"
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,13 +1,27 @@
 import os
 import json
-import requests
-from typing import List, Dict, Any, Optional, Iterator
+from typing import List, Dict, Any, Optional, Iterator, AsyncIterator
 import time
+import asyncio
 import base64
 import hmac
 import hashlib
 
 from .base_model import BaseModelAdapter
+from .http_client import get_session, get_async_client, aiter_sse, TokenCache
+from ..utils.tracing import traced, traced_stream
+
+# 默认接口地址，可通过BAIDU_API_BASE环境变量改为代理或本地测试服务
+DEFAULT_API_BASE = "https://aip.baidubce.com"
+
+# 请求超时：(连接超时, 读取超时)，单位秒
+REQUEST_TIMEOUT = (5, 120)
+
+# 访问令牌有效期为30天，进程内所有适配器实例共享缓存，到期前自动刷新
+_token_cache = TokenCache()
+
+# 表示访问令牌无效或过期的错误码
+_INVALID_TOKEN_CODES = {110, 111}
 
 class BaiduModelAdapter(BaseModelAdapter):
     """百度文心一言模型适配器"""
@@ -25,6 +39,7 @@ class BaiduModelAdapter(BaseModelAdapter):
         # 获取API密钥
         self.api_key = os.getenv("BAIDU_API_KEY")
         self.secret_key = os.getenv("BAIDU_SECRET_KEY")
+        self.api_base = os.getenv("BAIDU_API_BASE", DEFAULT_API_BASE).rstrip("/")
         
         if not self.api_key or not self.secret_key:
             print("警告：未设置BAIDU_API_KEY或BAIDU_SECRET_KEY环境变量，将使用模拟模式")
@@ -37,13 +52,27 @@ class BaiduModelAdapter(BaseModelAdapter):
             "ERNIE-Speed": "ernie_speed"
         }
     
+    @property
+    def _token_key(self) -> tuple:
+        """访问令牌的缓存键"""
+        return self.api_base, self.api_key, self.secret_key
+    
+    @traced("llm.access_token")
     def _get_access_token(self) -> Optional[str]:
-        """获取百度API访问令牌
+        """获取百度API访问令牌，优先使用缓存的令牌
         
         Returns:
             访问令牌，如果获取失败则返回None
         """
-        url = "https://aip.baidubce.com/oauth/2.0/token"
+        return _token_cache.get(self._token_key, self._fetch_access_token)
+    
+    def _fetch_access_token(self) -> tuple:
+        """向百度API请求新的访问令牌
+        
+        Returns:
+            (访问令牌, 有效期秒数)，如果获取失败则访问令牌为None
+        """
+        url = f"{self.api_base}/oauth/2.0/token"
         params = {
             "grant_type": "client_credentials",
             "client_id": self.api_key,
@@ -51,13 +80,61 @@ class BaiduModelAdapter(BaseModelAdapter):
         }
         
         try:
-            response = requests.post(url, params=params)
+            response = get_session().post(url, params=params, timeout=REQUEST_TIMEOUT)
             result = response.json()
-            return result.get("access_token")
+            return result.get("access_token"), result.get("expires_in")
         except Exception as e:
             print(f"获取百度访问令牌时出错: {str(e)}")
-            return None
+            return None, None
     
+    def _chat_url(self, access_token: str) -> str:
+        """对话接口地址"""
+        api_endpoint = self.model_map.get(self.model_name, "completions_pro")
+        return f"{self.api_base}/rpc/2.0/ai_custom/v1/wenxinworkshop/chat/{api_endpoint}?access_token={access_token}"
+    
+    def _build_payload(self, full_prompt: str, stream: bool) -> Dict[str, Any]:
+        """构建对话接口的请求体"""
+        return {
+            "messages": [
+                {"role": "user", "content": full_prompt}
+            ],
+            "temperature": self.temperature,
+            "top_p": 0.8,
+            "stream": stream
+        }
+    
+    @traced("llm.access_token")
+    async def _aget_access_token(self) -> Optional[str]:
+        """异步获取百度API访问令牌，与同步调用共享令牌缓存"""
+        return await _token_cache.aget(self._token_key, self._afetch_access_token)
+    
+    async def _afetch_access_token(self) -> tuple:
+        """异步请求新的访问令牌
+        
+        Returns:
+            (访问令牌, 有效期秒数)，如果获取失败则访问令牌为None
+        """
+        url = f"{self.api_base}/oauth/2.0/token"
+        params = {
+            "grant_type": "client_credentials",
+            "client_id": self.api_key,
+            "client_secret": self.secret_key
+        }
+        
+        try:
+            response = await get_async_client().post(url, params=params)
+            result = response.json()
+            return result.get("access_token"), result.get("expires_in")
+        except Exception as e:
+            print(f"获取百度访问令牌时出错: {str(e)}")
+            return None, None
+    
+    def _check_token_error(self, result: Dict[str, Any]):
+        """服务端返回令牌无效时丢弃缓存的令牌，下次请求重新获取"""
+        if result.get("error_code") in _INVALID_TOKEN_CODES:
+            _token_cache.invalidate(self._token_key)
+    
+    @traced("llm.generate")
     def generate(self, prompt: str, context_docs: List[Dict[str, Any]] = None) -> str:
         """生成文本
         
@@ -78,29 +155,21 @@ class BaiduModelAdapter(BaseModelAdapter):
                 if not access_token:
                     return self._get_fallback_response("无法获取百度API访问令牌")
                 
-                # 确定API端点
-                api_endpoint = self.model_map.get(self.model_name, "completions_pro")
-                url = f"https://aip.baidubce.com/rpc/2.0/ai_custom/v1/wenxinworkshop/chat/{api_endpoint}?access_token={access_token}"
+                url = self._chat_url(access_token)
                 
                 # 构建请求体
-                payload = {
-                    "messages": [
-                        {"role": "user", "content": full_prompt}
-                    ],
-                    "temperature": self.temperature,
-                    "top_p": 0.8,
-                    "stream": False
-                }
+                payload = self._build_payload(full_prompt, stream=False)
                 
                 # 发送请求
                 headers = {"Content-Type": "application/json"}
-                response = requests.post(url, headers=headers, json=payload)
+                response = get_session().post(url, headers=headers, json=payload, timeout=REQUEST_TIMEOUT)
                 result = response.json()
                 
                 # 解析响应
                 if "result" in result:
                     return result["result"]
                 else:
+                    self._check_token_error(result)
                     error_msg = f"百度API错误: {result.get('error_msg', '未知错误')}"
                     print(error_msg)
                     return self._get_fallback_response(error_msg)
@@ -112,6 +181,7 @@ class BaiduModelAdapter(BaseModelAdapter):
             print(error_msg)
             return self._get_fallback_response(error_msg)
     
+    @traced_stream("llm.generate_stream", first_item_stage="llm.first_token")
     def generate_stream(self, prompt: str, context_docs: List[Dict[str, Any]] = None) -> Iterator[str]:
         """流式生成文本
         
@@ -133,32 +203,30 @@ class BaiduModelAdapter(BaseModelAdapter):
                     yield "[生成出错: 无法获取百度API访问令牌]\n"
                     return
                 
-                # 确定API端点
-                api_endpoint = self.model_map.get(self.model_name, "completions_pro")
-                url = f"https://aip.baidubce.com/rpc/2.0/ai_custom/v1/wenxinworkshop/chat/{api_endpoint}?access_token={access_token}"
+                url = self._chat_url(access_token)
                 
                 # 构建请求体
-                payload = {
-                    "messages": [
-                        {"role": "user", "content": full_prompt}
-                    ],
-                    "temperature": self.temperature,
-                    "top_p": 0.8,
-                    "stream": True
-                }
+                payload = self._build_payload(full_prompt, stream=True)
                 
                 # 发送流式请求
                 headers = {"Content-Type": "application/json"}
-                response = requests.post(url, headers=headers, json=payload, stream=True)
+                response = get_session().post(url, headers=headers, json=payload, stream=True,
+                                              timeout=REQUEST_TIMEOUT)
                 
-                # 解析流式响应
-                for line in response.iter_lines():
-                    if line:
-                        line = line.decode("utf-8")
-                        if line.startswith("data: "):
-                            data = json.loads(line[6:])
-                            if "result" in data:
-                                yield data["result"]
+                # 解析流式响应（读完或中途退出时都将连接归还连接池）
+                with response:
+                    for line in response.iter_lines():
+                        if line:
+                            line = line.decode("utf-8")
+                            if line.startswith("data: "):
+                                data = json.loads(line[6:])
+                                if "result" in data:
+                                    yield data["result"]
+                            elif line.startswith("{"):
+                                # 出错时服务端直接返回JSON错误信息
+                                result = json.loads(line)
+                                self._check_token_error(result)
+                                yield f"[生成出错: {result.get('error_msg', '未知错误')}]\n"
             else:
                 # 模拟流式响应
                 mock_response = self._get_mock_response(full_prompt)
@@ -171,6 +239,84 @@ class BaiduModelAdapter(BaseModelAdapter):
             print(error_msg)
             yield f"[生成出错: {str(e)}]\n"
     
+    @traced("llm.generate")
+    async def agenerate(self, prompt: str, context_docs: List[Dict[str, Any]] = None) -> str:
+        """异步生成文本
+        
+        Args:
+            prompt: 提示文本
+            context_docs: 上下文文档
+            
+        Returns:
+            生成的文本
+        """
+        full_prompt = self._build_prompt_with_context(prompt, context_docs)
+        
+        try:
+            if self.api_key and self.secret_key:
+                access_token = await self._aget_access_token()
+                if not access_token:
+                    return self._get_fallback_response("无法获取百度API访问令牌")
+                
+                response = await get_async_client().post(self._chat_url(access_token),
+                                                         json=self._build_payload(full_prompt, stream=False))
+                result = response.json()
+                
+                if "result" in result:
+                    return result["result"]
+                else:
+                    self._check_token_error(result)
+                    error_msg = f"百度API错误: {result.get('error_msg', '未知错误')}"
+                    print(error_msg)
+                    return self._get_fallback_response(error_msg)
+            else:
+                # 模拟模式
+                return self._get_mock_response(full_prompt)
+        except Exception as e:
+            error_msg = f"调用百度API时出错: {str(e)}"
+            print(error_msg)
+            return self._get_fallback_response(error_msg)
+    
+    @traced_stream("llm.generate_stream", first_item_stage="llm.first_token")
+    async def agenerate_stream(self, prompt: str, context_docs: List[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """异步流式生成文本
+        
+        Args:
+            prompt: 提示文本
+            context_docs: 上下文文档
+            
+        Yields:
+            生成的文本片段
+        """
+        full_prompt = self._build_prompt_with_context(prompt, context_docs)
+        
+        try:
+            if self.api_key and self.secret_key:
+                access_token = await self._aget_access_token()
+                if not access_token:
+                    yield "[生成出错: 无法获取百度API访问令牌]\n"
+                    return
+                
+                # 解析流式响应（读完或中途退出时都将连接归还连接池）
+                async with get_async_client().stream("POST", self._chat_url(access_token),
+                                                     json=self._build_payload(full_prompt, stream=True)) as response:
+                    async for data in aiter_sse(response):
+                        if "result" in data:
+                            yield data["result"]
+                        elif "error_code" in data:
+                            # 出错时服务端直接返回JSON错误信息
+                            self._check_token_error(data)
+                            yield f"[生成出错: {data.get('error_msg', '未知错误')}]\n"
+            else:
+                # 模拟流式响应
+                for word in self._get_mock_response(full_prompt).split():
+                    yield word + " "
+                    await asyncio.sleep(0.05)  # 模拟延迟
+        except Exception as e:
+            error_msg = f"调用百度API流式生成时出错: {str(e)}"
+            print(error_msg)
+            yield f"[生成出错: {str(e)}]\n"
+    
     def _get_mock_response(self, prompt: str) -> str:
         """获取模拟响应（当API密钥未设置时使用）
         
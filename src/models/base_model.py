@@ -1,20 +1,34 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional, Iterator
+from typing import List, Dict, Any, Optional, Iterator, AsyncIterator
+
+from ..config import MODEL_CONFIG
+from ..utils.tracing import traced
+from .context_packer import ContextPacker, PackedDocs
+
+# 适配器在调用失败时返回的备用回答，以及流式生成出错时输出的提示
+_FALLBACK_PREFIX = "很抱歉，我无法生成回答"
+_STREAM_ERROR_MARKER = "[生成出错"
 
 class BaseModelAdapter(ABC):
     """大模型适配器基类，定义所有模型适配器必须实现的接口"""
     
-    def __init__(self, model_name: str, temperature: float = 0.7, max_tokens: int = 2048):
+    def __init__(self, model_name: str, temperature: float = 0.7, max_tokens: int = 2048,
+                 context_budget: Optional[int] = None):
         """初始化模型适配器
         
         Args:
             model_name: 模型名称
             temperature: 温度参数，控制生成文本的随机性
             max_tokens: 生成文本的最大长度
+            context_budget: 上下文文档的词元预算，默认使用MODEL_CONFIG中该模型的预算
         """
         self.model_name = model_name
         self.temperature = temperature
         self.max_tokens = max_tokens
+        if context_budget is None:
+            context_budget = MODEL_CONFIG["context_budgets"].get(model_name, MODEL_CONFIG["context_budget"])
+        self.context_packer = ContextPacker(context_budget)
     
     @abstractmethod
     def generate(self, prompt: str, context_docs: List[Dict[str, Any]] = None) -> str:
@@ -42,9 +56,75 @@ class BaseModelAdapter(ABC):
         """
         pass
     
+    async def agenerate(self, prompt: str, context_docs: List[Dict[str, Any]] = None) -> str:
+        """异步生成文本
+        
+        默认在线程池中运行generate，有原生异步实现的适配器应覆盖该方法
+        
+        Args:
+            prompt: 提示文本
+            context_docs: 上下文文档，用于增强生成
+            
+        Returns:
+            生成的文本
+        """
+        return await asyncio.get_running_loop().run_in_executor(None, self.generate, prompt, context_docs)
+    
+    async def agenerate_stream(self, prompt: str, context_docs: List[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """异步流式生成文本
+        
+        默认在线程池中逐个读取generate_stream的输出，有原生异步实现的适配器应覆盖该方法
+        
+        Args:
+            prompt: 提示文本
+            context_docs: 上下文文档，用于增强生成
+            
+        Yields:
+            生成的文本片段
+        """
+        loop = asyncio.get_running_loop()
+        iterator = self.generate_stream(prompt, context_docs)
+        done = object()
+        try:
+            while True:
+                piece = await loop.run_in_executor(None, next, iterator, done)
+                if piece is done:
+                    break
+                yield piece
+        finally:
+            # 调用方提前停止时关闭同步生成器，释放其持有的连接
+            await loop.run_in_executor(None, iterator.close)
+    
+    @staticmethod
+    def is_error_response(text: str) -> bool:
+        """判断回答是否为调用失败时的备用回答或流式生成的出错提示
+        
+        Args:
+            text: 生成的文本
+            
+        Returns:
+            是否为出错时的回答
+        """
+        return not text.strip() or text.lstrip().startswith(_FALLBACK_PREFIX) or _STREAM_ERROR_MARKER in text
+    
+    def pack_context(self, context_docs: Optional[List[Dict[str, Any]]]) -> Dict[str, Any]:
+        """在模型的词元预算内组装上下文文档（合并重叠的文本块，按相关度取舍）
+        
+        Args:
+            context_docs: 按相关度排序的上下文文档
+            
+        Returns:
+            ContextPacker.pack的结果，包含放入的片段（docs）和词元统计
+        """
+        return self.context_packer.pack(context_docs)
+    
+    @traced("llm.build_prompt")
     def _build_prompt_with_context(self, prompt: str, context_docs: List[Dict[str, Any]]) -> str:
         """构建带有上下文的提示
         
+        上下文文档先经过pack_context合并和裁剪，不超过模型的词元预算；
+        已是pack_context结果的文档（PackedDocs）直接使用
+        
         Args:
             prompt: 原始提示
             context_docs: 上下文文档
@@ -56,11 +136,14 @@ class BaseModelAdapter(ABC):
             return prompt
         
         # 构建上下文字符串
-        context_str = "\n\n相关文档内容：\n"
+        context_parts = ["\n\n相关文档内容：\n"]
+        if not isinstance(context_docs, PackedDocs):
+            context_docs = self.pack_context(context_docs)["docs"]
         for i, doc in enumerate(context_docs):
-            context_str += f"[文档 {i+1}]\n{doc['content']}\n\n"
+            context_parts.append(f"[文档 {i+1}]\n{doc['content']}\n\n")
+        context_str = "".join(context_parts)
         
         # 构建完整提示
         full_prompt = f"{context_str}\n根据以上文档内容，{prompt}"
         
-        return full_prompt
\ No newline at end of file
+        return full_prompt
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+from typing import List, Dict, Any, Optional, Iterator, AsyncIterator, Hashable, TYPE_CHECKING
+
+from .base_model import BaseModelAdapter
+from ..utils.cache import TTLCache
+
+if TYPE_CHECKING:
+    # 只用于类型标注，避免模型适配层依赖向量存储
+    from ..vector_store.semantic_cache import SemanticAnswerCache
+
+class CachedModelAdapter(BaseModelAdapter):
+    """带回答缓存的模型适配器
+
+    缓存键为(适配器类型, 模型名称, 温度, 最大生成长度, 完整提示的sha256, 上下文文本块标识)。
+    完整提示包含上下文文本块的内容，文档变化后即使文本块ID相同也不会命中旧回答。
+    设置语义缓存后，精确缓存未命中时再按问题的语义相似度查找同一作用域（知识库和模型）内的历史回答，
+    语义缓存不区分温度和检索到的上下文。
+    命中缓存时generate_stream按小段重放缓存的回答，调用方无需区分是否命中。
+    异步接口在线程池中构建提示、查找和写入缓存（涉及分词、嵌入、SQLite和FAISS），不阻塞事件循环。
+    """
+
+    def __init__(self, model: BaseModelAdapter, cache: Optional[TTLCache] = None, replay_chunk_size: int = 16,
+                 semantic_cache: Optional["SemanticAnswerCache"] = None, scope: Hashable = None,
+                 bypass: bool = False):
+        """初始化带缓存的模型适配器
+
+        Args:
+            model: 实际生成回答的模型适配器
+            cache: 精确回答缓存，可在多个适配器实例之间共享，为None时不使用
+            replay_chunk_size: 重放缓存回答时每段的字符数
+            semantic_cache: 语义回答缓存，为None时不使用
+            scope: 语义缓存的作用域，通常为知识库的标识（如向量存储的cache_token）
+            bypass: 是否跳过缓存查找、总是调用模型（新的回答仍会写入缓存）
+        """
+        super().__init__(model.model_name, model.temperature, model.max_tokens,
+                         context_budget=model.context_packer.budget)
+        self.context_packer = model.context_packer
+        self.model = model
+        self.cache = cache
+        self.replay_chunk_size = replay_chunk_size
+        self.semantic_cache = semantic_cache
+        self.scope = scope
+        self.bypass = bypass
+        self.last_hit = None  # 最近一次调用命中的缓存：'exact'、'semantic'或None
+        self.last_similarity = None  # 最近一次语义缓存命中的相似度
+
+    def cache_key(self, prompt: str, context_docs: Optional[List[Dict[str, Any]]] = None) -> Hashable:
+        """生成回答缓存键
+
+        Args:
+            prompt: 提示文本
+            context_docs: 上下文文档，最好是pack_context的结果，避免重复组装
+
+        Returns:
+            缓存键
+        """
+        full_prompt = self.model._build_prompt_with_context(prompt, context_docs)
+        chunk_ids = tuple(
+            (doc.get("id"), doc.get("metadata", {}).get("source"), doc.get("metadata", {}).get("chunk_id"))
+            for doc in context_docs or []
+        )
+        return (
+            type(self.model).__name__,
+            self.model.model_name,
+            self.model.temperature,
+            self.model.max_tokens,
+            hashlib.sha256(full_prompt.encode("utf-8")).hexdigest(),
+            chunk_ids
+        )
+
+    def _semantic_scope(self) -> Hashable:
+        """语义缓存的作用域：知识库加上模型类型和名称"""
+        return self.scope, type(self.model).__name__, self.model.model_name
+
+    def _lookup(self, key: Hashable, prompt: str) -> tuple:
+        """依次查找精确缓存和语义缓存
+
+        Returns:
+            (缓存的回答或None, 问题的语义嵌入或None)
+        """
+        self.last_hit = None
+        self.last_similarity = None
+        if self.cache is not None and not self.bypass:
+            answer = self.cache.get(key)
+            if answer is not None:
+                self.last_hit = "exact"
+                return answer, None
+
+        if self.semantic_cache is None:
+            return None, None
+        embedding = self.semantic_cache.embed(prompt)
+        hit = self.semantic_cache.lookup(prompt, scope=self._semantic_scope(), embedding=embedding,
+                                         bypass=self.bypass)
+        if hit is None:
+            return None, embedding
+        self.last_hit = "semantic"
+        self.last_similarity = hit["similarity"]
+        return hit["answer"], None
+
+    def _prepare(self, prompt: str, context_docs: Optional[List[Dict[str, Any]]]) -> tuple:
+        """生成缓存键并查找缓存
+
+        Returns:
+            (缓存键, 缓存的回答或None, 问题的语义嵌入或None)
+        """
+        key = self.cache_key(prompt, context_docs)
+        return (key, *self._lookup(key, prompt))
+
+    def _store(self, key: Hashable, prompt: str, answer: str, embedding):
+        """将新生成的回答写入缓存（失败时的备用回答不缓存）"""
+        if self.is_error_response(answer):
+            return
+        if self.cache is not None:
+            self.cache.set(key, answer)
+        if self.semantic_cache is not None:
+            self.semantic_cache.add(prompt, answer, scope=self._semantic_scope(), embedding=embedding)
+
+    def generate(self, prompt: str, context_docs: List[Dict[str, Any]] = None) -> str:
+        key = self.cache_key(prompt, context_docs)
+        answer, embedding = self._lookup(key, prompt)
+        if answer is None:
+            answer = self.model.generate(prompt, context_docs)
+            self._store(key, prompt, answer, embedding)
+        return answer
+
+    def generate_stream(self, prompt: str, context_docs: List[Dict[str, Any]] = None) -> Iterator[str]:
+        key = self.cache_key(prompt, context_docs)
+        answer, embedding = self._lookup(key, prompt)
+        if answer is not None:
+            for start in range(0, len(answer), self.replay_chunk_size):
+                yield answer[start:start + self.replay_chunk_size]
+            return
+
+        # 边输出边收集，完整生成后才写入缓存（调用方中途停止读取时不缓存不完整的回答）
+        pieces = []
+        for piece in self.model.generate_stream(prompt, context_docs):
+            pieces.append(piece)
+            yield piece
+        self._store(key, prompt, "".join(pieces), embedding)
+
+    async def agenerate(self, prompt: str, context_docs: List[Dict[str, Any]] = None) -> str:
+        loop = asyncio.get_running_loop()
+        key, answer, embedding = await loop.run_in_executor(None, self._prepare, prompt, context_docs)
+        if answer is None:
+            answer = await self.model.agenerate(prompt, context_docs)
+            await loop.run_in_executor(None, self._store, key, prompt, answer, embedding)
+        return answer
+
+    async def agenerate_stream(self, prompt: str, context_docs: List[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        loop = asyncio.get_running_loop()
+        key, answer, embedding = await loop.run_in_executor(None, self._prepare, prompt, context_docs)
+        if answer is not None:
+            for start in range(0, len(answer), self.replay_chunk_size):
+                yield answer[start:start + self.replay_chunk_size]
+            return
+
+        pieces = []
+        async for piece in self.model.agenerate_stream(prompt, context_docs):
+            pieces.append(piece)
+            yield piece
+        await loop.run_in_executor(None, self._store, key, prompt, "".join(pieces), embedding)
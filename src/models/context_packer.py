@@ -0,0 +1,154 @@
+from typing import List, Dict, Any, Optional
+
+from ..document_processor.splitter import count_tokens, truncate_tokens
+
+class PackedDocs(list):
+    """ContextPacker.pack组装好的上下文片段，构建提示时直接使用，不再重复组装"""
+
+class ContextPacker:
+    """按词元预算组装提示中的上下文文档
+
+    1. 合并同一来源中相邻或重叠的文本块（按元数据中的start_index、end_index），重叠部分只保留一份；
+       被其他文本块完全包含的文本块和内容完全相同的文本块直接丢弃。
+    2. 按检索排名（输入顺序，即相关度从高到低）依次放入，超出预算的片段跳过，
+       剩余预算不少于min_fragment_tokens时从片段中排名最靠前的文本块开始截取放入。
+    """
+
+    def __init__(self, budget: int = 2000, min_fragment_tokens: int = 64):
+        """初始化上下文组装器
+
+        Args:
+            budget: 上下文的词元预算（不含问题和提示模板）
+            min_fragment_tokens: 片段超出预算时，剩余预算不少于该值才截取片段放入
+
+        Raises:
+            ValueError: 如果预算不是正数
+        """
+        if budget <= 0:
+            raise ValueError(f"上下文词元预算必须为正数: {budget}")
+        self.budget = budget
+        self.min_fragment_tokens = min_fragment_tokens
+
+    @staticmethod
+    def _span(doc: Dict[str, Any]) -> Optional[tuple]:
+        """文本块在原文中的(起始, 结束)位置，位置与内容长度不一致时返回None"""
+        metadata = doc.get("metadata", {})
+        start, end = metadata.get("start_index"), metadata.get("end_index")
+        if start is None or end is None or end - start != len(doc["content"]):
+            return None
+        return start, end
+
+    def merge(self, docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """合并相邻或重叠的文本块，丢弃冗余的文本块
+
+        Args:
+            docs: 按相关度排序的检索结果
+
+        Returns:
+            合并后的片段，按其中排名最靠前的文本块排序；合并了多个文本块的片段，元数据中merged_ids为这些文本块的ID
+        """
+        return [segment for segment, _ in self._merge(docs)]
+
+    def _merge(self, docs: List[Dict[str, Any]]) -> List[tuple]:
+        """合并文本块，返回(片段, 排名最靠前的文本块在片段内容中的起始位置)"""
+        segments = []  # 每个片段: {'rank', 'content', 'metadata', 'span', 'members'}
+        by_source: Dict[str, List[Dict[str, Any]]] = {}
+        seen_contents = set()
+        for rank, doc in enumerate(docs):
+            if doc["content"] in seen_contents:
+                continue
+            seen_contents.add(doc["content"])
+            segment = {"rank": rank, "content": doc["content"], "metadata": dict(doc.get("metadata", {})),
+                       "span": self._span(doc), "members": [(rank, doc)]}
+            if segment["span"] is None:
+                segments.append(segment)
+            else:
+                by_source.setdefault(segment["metadata"].get("source", ""), []).append(segment)
+
+        for source_segments in by_source.values():
+            source_segments.sort(key=lambda segment: segment["span"])
+            current = source_segments[0]
+            for segment in source_segments[1:]:
+                (start, end), (next_start, next_end) = current["span"], segment["span"]
+                if next_start > end:
+                    segments.append(current)
+                    current = segment
+                    continue
+                # 相邻或重叠：只追加超出当前片段的部分
+                if next_end > end:
+                    current["content"] += segment["content"][end - next_start:]
+                    current["span"] = (start, next_end)
+                    if "page_end" in segment["metadata"]:
+                        current["metadata"]["page_end"] = segment["metadata"]["page_end"]
+                current["rank"] = min(current["rank"], segment["rank"])
+                current["members"].extend(segment["members"])
+            segments.append(current)
+
+        segments.sort(key=lambda segment: segment["rank"])
+        merged = []
+        for segment in segments:
+            # 片段的ID和分数取排名最靠前的文本块
+            members = [doc for _, doc in sorted(segment["members"], key=lambda member: member[0])]
+            metadata = segment["metadata"]
+            if segment["span"] is not None:
+                metadata["start_index"], metadata["end_index"] = segment["span"]
+            if len(members) > 1:
+                metadata["merged_ids"] = [doc.get("id") for doc in members]
+            anchor = 0
+            if segment["span"] is not None:
+                anchor = members[0]["metadata"]["start_index"] - segment["span"][0]
+            merged.append(({"id": members[0].get("id"), "content": segment["content"], "metadata": metadata,
+                            "score": members[0].get("score")}, anchor))
+        return merged
+
+    def pack(self, docs: Optional[List[Dict[str, Any]]]) -> Dict[str, Any]:
+        """在预算内组装上下文
+
+        Args:
+            docs: 按相关度排序的检索结果
+
+        Returns:
+            包含以下字段的字典：
+                docs: 放入上下文的片段（PackedDocs）
+                budget: 词元预算
+                input_tokens: 检索结果的词元总数
+                packed_tokens: 放入上下文的词元数量
+                discarded_tokens: 未放入的词元数量（input_tokens - packed_tokens）
+                redundant_tokens: 其中因重叠或重复被去掉的词元数量
+                over_budget_tokens: 其中因超出预算被丢弃或截掉的词元数量
+                input_chunks / packed_chunks: 输入的文本块数量 / 放入的片段数量
+        """
+        docs = docs or []
+        input_tokens = sum(count_tokens(doc["content"]) for doc in docs)
+        merged_tokens = 0
+
+        packed = []
+        remaining = self.budget
+        for segment, anchor in self._merge(docs):
+            tokens = count_tokens(segment["content"])
+            merged_tokens += tokens
+            if tokens <= remaining:
+                packed.append(segment)
+                remaining -= tokens
+            elif remaining >= self.min_fragment_tokens:
+                # 从排名最靠前的文本块开始截取，合并进来的前文不挤占它的位置
+                content = truncate_tokens(segment["content"][anchor:], remaining)
+                metadata = dict(segment["metadata"], truncated=True)
+                if "start_index" in metadata:
+                    metadata["start_index"] += anchor
+                    metadata["end_index"] = metadata["start_index"] + len(content)
+                packed.append(dict(segment, content=content, metadata=metadata))
+                remaining -= count_tokens(content)
+
+        packed_tokens = self.budget - remaining
+        return {
+            "docs": PackedDocs(packed),
+            "budget": self.budget,
+            "input_tokens": input_tokens,
+            "packed_tokens": packed_tokens,
+            "discarded_tokens": input_tokens - packed_tokens,
+            "redundant_tokens": input_tokens - merged_tokens,
+            "over_budget_tokens": merged_tokens - packed_tokens,
+            "input_chunks": len(docs),
+            "packed_chunks": len(packed)
+        }
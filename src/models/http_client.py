@@ -0,0 +1,261 @@
+import asyncio
+import itertools
+import json
+import ssl
+import threading
+import time
+import weakref
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from ..utils.lazy_import import lazy_import
+
+# requests、httpx导入较慢，首次发送请求时才导入
+requests = lazy_import("requests")
+httpx = lazy_import("httpx")
+
+# 异步客户端的连接上限，单个进程需要同时维持数千个流式回答。
+# httpx的连接池每次分配连接都要遍历池中全部连接，单个大连接池在数千并发时CPU开销随并发数平方增长，
+# 因此拆分为多个小连接池，请求轮流使用
+ASYNC_POOL_SHARDS = 64
+ASYNC_CONNECTIONS_PER_SHARD = 64
+ASYNC_KEEPALIVE_PER_SHARD = 16
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session(pool_maxsize: int = 16):
+    """获取进程内共享的HTTP会话
+
+    会话内置连接池并保持长连接，同一主机的后续请求复用已建立的TCP/TLS连接
+
+    Args:
+        pool_maxsize: 每个主机最多保持的连接数量（首次创建会话时生效）
+
+    Returns:
+        requests.Session实例
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+def reset_session():
+    """关闭共享的HTTP会话，下次请求时重新创建"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+# 异步客户端绑定在创建它的事件循环上：事件循环 -> (客户端列表, 轮转计数器)
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, tuple]" = weakref.WeakKeyDictionary()
+_ssl_context = None
+
+def _get_ssl_context() -> ssl.SSLContext:
+    """所有异步客户端共用的SSL上下文（加载证书较慢，只创建一次）"""
+    global _ssl_context
+    if _ssl_context is None:
+        import certifi
+        _ssl_context = ssl.create_default_context(cafile=certifi.where())
+    return _ssl_context
+
+def get_async_client():
+    """获取当前事件循环共享的异步HTTP客户端（httpx.AsyncClient，连接池，保持长连接）
+
+    每次调用轮流返回ASYNC_POOL_SHARDS个客户端中的一个，客户端在首次轮到时创建
+
+    Returns:
+        httpx.AsyncClient实例
+    """
+    loop = asyncio.get_running_loop()
+    shards = _async_clients.get(loop)
+    if shards is None:
+        shards = _async_clients[loop] = ([None] * ASYNC_POOL_SHARDS, itertools.count())
+    clients, counter = shards
+    i = next(counter) % len(clients)
+    client = clients[i]
+    if client is None or client.is_closed:
+        client = clients[i] = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=ASYNC_CONNECTIONS_PER_SHARD,
+                                max_keepalive_connections=ASYNC_KEEPALIVE_PER_SHARD),
+            timeout=httpx.Timeout(120, connect=5),
+            verify=_get_ssl_context()
+        )
+    return client
+
+async def close_async_client():
+    """关闭当前事件循环的异步HTTP客户端（如服务停止时）"""
+    shards = _async_clients.pop(asyncio.get_running_loop(), None)
+    if shards is not None:
+        for client in shards[0]:
+            if client is not None:
+                await client.aclose()
+
+async def aiter_sse(response) -> AsyncIterator[Dict[str, Any]]:
+    """逐个解析服务端推送事件（SSE）中的JSON数据
+
+    'data: [DONE]'表示结束；不以'data:'开头的JSON行（如出错时直接返回的错误信息）原样解析后输出
+
+    Args:
+        response: 以流式方式发送请求得到的httpx.Response
+
+    Yields:
+        每个事件的JSON数据
+    """
+    async for line in response.aiter_lines():
+        if not line:
+            continue
+        if line.startswith("data:"):
+            data = line[5:].strip()
+            if data == "[DONE]":
+                return
+            yield json.loads(data)
+        elif line.startswith("{"):
+            yield json.loads(line)
+
+class TokenCache:
+    """按凭据缓存访问令牌（线程安全）
+
+    令牌剩余有效期不足refresh_ratio时提前刷新：令牌仍然有效时在后台线程（异步调用时为后台任务）中刷新，
+    当前请求继续使用旧令牌；令牌不存在或已过期时等待获取完成。同一凭据同时只有一个获取请求。
+    """
+
+    def __init__(self, refresh_ratio: float = 0.1, min_lifetime: float = 60):
+        """初始化令牌缓存
+
+        Args:
+            refresh_ratio: 剩余有效期低于总有效期的该比例时提前刷新
+            min_lifetime: 服务端未返回有效期时假定的有效期（秒）
+        """
+        self.refresh_ratio = refresh_ratio
+        self.min_lifetime = min_lifetime
+        self.fetches = 0  # 实际请求令牌的次数
+        self._entries: Dict[Hashable, Dict[str, float]] = {}  # 凭据 -> {'token', 'expires_at', 'refresh_at'}
+        self._locks: Dict[Hashable, threading.Lock] = {}
+        self._refreshing = set()
+        self._pending: Dict[tuple, "asyncio.Task"] = {}  # (事件循环, 凭据) -> 正在进行的异步获取
+        self._refresh_tasks = set()  # 后台刷新任务，事件循环只保留任务的弱引用
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, fetch: Callable[[], Tuple[Optional[str], Optional[float]]]) -> Optional[str]:
+        """获取令牌，必要时调用fetch获取新令牌
+
+        Args:
+            key: 凭据标识，如(接口地址, API Key)
+            fetch: 获取新令牌的函数，返回(令牌, 有效期秒数)，失败时令牌为None
+
+        Returns:
+            访问令牌，获取失败时返回None
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now < entry["expires_at"]:
+                if now >= entry["refresh_at"] and key not in self._refreshing:
+                    self._refreshing.add(key)
+                    threading.Thread(target=self._refresh, args=(key, fetch), name="token-refresh", daemon=True).start()
+                return entry["token"]
+            key_lock = self._locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            # 等待锁期间其他线程可能已经获取了新令牌
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and time.monotonic() < entry["expires_at"]:
+                    return entry["token"]
+            return self._fetch(key, fetch)
+
+    async def aget(self, key: Hashable, fetch: Callable[[], Awaitable[Tuple[Optional[str], Optional[float]]]]
+                   ) -> Optional[str]:
+        """异步获取令牌，必要时调用fetch获取新令牌，与get共享同一份缓存
+
+        同一事件循环中同一凭据同时只有一个获取请求，其他协程等待其结果
+
+        Args:
+            key: 凭据标识
+            fetch: 获取新令牌的协程函数，返回(令牌, 有效期秒数)
+
+        Returns:
+            访问令牌，获取失败时返回None
+        """
+        now = time.monotonic()
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now < entry["expires_at"]:
+                if now >= entry["refresh_at"] and key not in self._refreshing:
+                    self._refreshing.add(key)
+                    task = loop.create_task(self._afetch(key, fetch))
+                    self._refresh_tasks.add(task)
+                    task.add_done_callback(lambda task: self._refresh_done(key, task))
+                return entry["token"]
+            pending = self._pending.get((loop, key))
+            if pending is None:
+                pending = self._pending[(loop, key)] = loop.create_task(self._afetch(key, fetch))
+                pending.add_done_callback(lambda _: self._pending.pop((loop, key), None))
+        return await asyncio.shield(pending)
+
+    async def _afetch(self, key: Hashable, fetch: Callable[[], Awaitable[Tuple[Optional[str], Optional[float]]]]
+                      ) -> Optional[str]:
+        """异步获取并缓存新令牌"""
+        token, lifetime = await fetch()
+        return self._store(key, token, lifetime)
+
+    def _refresh_done(self, key: Hashable, task: "asyncio.Task"):
+        """后台异步刷新结束（包括失败和被取消），失败时保留旧令牌直到过期"""
+        self._refresh_tasks.discard(task)
+        with self._lock:
+            self._refreshing.discard(key)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"警告：后台刷新访问令牌失败: {str(task.exception())}")
+
+    def _fetch(self, key: Hashable, fetch: Callable[[], Tuple[Optional[str], Optional[float]]]) -> Optional[str]:
+        """获取并缓存新令牌"""
+        token, lifetime = fetch()
+        return self._store(key, token, lifetime)
+
+    def _store(self, key: Hashable, token: Optional[str], lifetime: Optional[float]) -> Optional[str]:
+        """缓存新获取的令牌"""
+        self.fetches += 1
+        if not token:
+            return None
+        lifetime = lifetime if lifetime and lifetime > 0 else self.min_lifetime
+        now = time.monotonic()
+        with self._lock:
+            self._entries[key] = {
+                "token": token,
+                "expires_at": now + lifetime,
+                "refresh_at": now + lifetime * (1 - self.refresh_ratio)
+            }
+        return token
+
+    def _refresh(self, key: Hashable, fetch: Callable[[], Tuple[Optional[str], Optional[float]]]):
+        """后台提前刷新令牌，失败时保留旧令牌直到过期"""
+        try:
+            with self._locks.setdefault(key, threading.Lock()):
+                self._fetch(key, fetch)
+        except Exception as e:
+            print(f"警告：后台刷新访问令牌失败: {str(e)}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def invalidate(self, key: Hashable):
+        """使令牌失效（如服务端返回令牌无效时），下次调用get时重新获取
+
+        Args:
+            key: 凭据标识
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """清空全部令牌"""
+        with self._lock:
+            self._entries.clear()
@@ -1,13 +1,66 @@
-from typing import List, Dict, Any, Optional, Iterator
+import importlib
+from typing import List, Dict, Any, Optional, Iterator, Type
 from .base_model import BaseModelAdapter
-from .zhipu_model import ZhipuModelAdapter
-from .baidu_model import BaiduModelAdapter
 
 class ModelFactory:
-    """模型工厂类，用于创建不同类型的模型适配器"""
+    """模型工厂类，用于创建不同类型的模型适配器
     
-    @staticmethod
-    def get_model(model_type: str, model_name: str, **kwargs) -> BaseModelAdapter:
+    模型类型注册为(模块路径, 类名)，对应模块在首次创建该类型的模型时才导入，
+    未使用的厂商SDK（如zhipuai、requests）不会在启动时加载。
+    """
+    
+    # 模型类型 -> (模块路径, 适配器类名)，相对路径相对于当前包
+    _registry: Dict[str, tuple] = {
+        "zhipu": (".zhipu_model", "ZhipuModelAdapter"),
+        "baidu": (".baidu_model", "BaiduModelAdapter")
+    }
+    
+    # 已导入的适配器类
+    _adapter_classes: Dict[str, Type[BaseModelAdapter]] = {}
+    
+    @classmethod
+    def register_model(cls, model_type: str, module_path: str, class_name: str):
+        """注册新的模型类型
+        
+        Args:
+            model_type: 模型类型，如'zhipu'
+            module_path: 适配器所在模块，可以是绝对路径或相对于src.models的相对路径
+            class_name: 适配器类名，需继承BaseModelAdapter
+        """
+        model_type = model_type.lower()
+        cls._registry[model_type] = (module_path, class_name)
+        cls._adapter_classes.pop(model_type, None)
+    
+    @classmethod
+    def supported_types(cls) -> List[str]:
+        """获取已注册的模型类型"""
+        return list(cls._registry)
+    
+    @classmethod
+    def get_adapter_class(cls, model_type: str) -> Type[BaseModelAdapter]:
+        """获取模型类型对应的适配器类，首次调用时导入其模块
+        
+        Args:
+            model_type: 模型类型
+            
+        Returns:
+            适配器类
+            
+        Raises:
+            ValueError: 如果模型类型不支持
+        """
+        model_type = model_type.lower()
+        adapter_class = cls._adapter_classes.get(model_type)
+        if adapter_class is None:
+            if model_type not in cls._registry:
+                raise ValueError(f"不支持的模型类型: {model_type}")
+            module_path, class_name = cls._registry[model_type]
+            module = importlib.import_module(module_path, __package__)
+            adapter_class = cls._adapter_classes[model_type] = getattr(module, class_name)
+        return adapter_class
+    
+    @classmethod
+    def get_model(cls, model_type: str, model_name: str, **kwargs) -> BaseModelAdapter:
         """获取模型适配器实例
         
         Args:
@@ -21,9 +74,4 @@ class ModelFactory:
         Raises:
             ValueError: 如果模型类型不支持
         """
-        if model_type.lower() == "zhipu":
-            return ZhipuModelAdapter(model_name=model_name, **kwargs)
-        elif model_type.lower() == "baidu":
-            return BaiduModelAdapter(model_name=model_name, **kwargs)
-        else:
-            raise ValueError(f"不支持的模型类型: {model_type}")
\ No newline at end of file
+        return cls.get_adapter_class(model_type)(model_name=model_name, **kwargs)
@@ -1,11 +1,42 @@
 import os
 import json
-from typing import List, Dict, Any, Optional, Iterator
+from typing import List, Dict, Any, Optional, Iterator, AsyncIterator
 import time
+import asyncio
+import threading
 import zhipuai
 from zhipuai import ZhipuAI  # 导入 ZhipuAI 客户端
 
 from .base_model import BaseModelAdapter
+from .http_client import get_async_client, aiter_sse
+from ..utils.tracing import traced, traced_stream
+
+# 异步调用直接请求HTTP接口（SDK没有基于asyncio的客户端），未设置ZHIPU_API_BASE时使用该地址
+DEFAULT_API_BASE = "https://open.bigmodel.cn/api/paas/v4"
+
+# 客户端内部持有HTTP连接池，按(API Key, 接口地址)在进程内复用，避免每次请求重新建立连接
+_clients: Dict[tuple, ZhipuAI] = {}
+_clients_lock = threading.Lock()
+
+def get_client(api_key: str, base_url: Optional[str] = None) -> ZhipuAI:
+    """获取进程内共享的智谱AI客户端
+    
+    Args:
+        api_key: API密钥
+        base_url: 接口地址，为None时使用SDK的默认地址
+        
+    Returns:
+        ZhipuAI客户端
+    """
+    key = (api_key, base_url)
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = ZhipuAI(api_key=api_key, base_url=base_url) if base_url else ZhipuAI(api_key=api_key)
+                _clients[key] = client
+    return client
 
 class ZhipuModelAdapter(BaseModelAdapter):
     """智谱AI模型适配器"""
@@ -27,7 +58,10 @@ class ZhipuModelAdapter(BaseModelAdapter):
         
         # 将 API Key 存储在实例变量中
         self.api_key = api_key
+        # 接口地址，可通过ZHIPU_API_BASE环境变量改为代理或本地测试服务
+        self.api_base = os.getenv("ZHIPU_API_BASE")
     
+    @traced("llm.generate")
     def generate(self, prompt: str, context_docs: List[Dict[str, Any]] = None) -> str:
         """生成文本
         
@@ -43,7 +77,7 @@ class ZhipuModelAdapter(BaseModelAdapter):
         
         try:
             if self.api_key: # 检查实例变量 self.api_key
-                client = ZhipuAI(api_key=self.api_key) # 初始化客户端时传入 API Key
+                client = get_client(self.api_key, self.api_base)
                 # 调用智谱AI API (v2)
                 response = client.chat.completions.create(
                     model=self.model_name,
@@ -75,6 +109,7 @@ class ZhipuModelAdapter(BaseModelAdapter):
             print(error_msg)
             return self._get_fallback_response(error_msg)
     
+    @traced_stream("llm.generate_stream", first_item_stage="llm.first_token")
     def generate_stream(self, prompt: str, context_docs: List[Dict[str, Any]] = None) -> Iterator[str]:
         """流式生成文本
         
@@ -90,10 +125,13 @@ class ZhipuModelAdapter(BaseModelAdapter):
         
         try:
             if self.api_key: # 检查实例变量 self.api_key
-                client = ZhipuAI(api_key=self.api_key) # 初始化客户端时传入 API Key
+                client = get_client(self.api_key, self.api_base)
                 # 调用智谱AI API（流式模式 v2）
                 response = client.chat.completions.create(
                     model=self.model_name,
+                    messages=[
+                        {"role": "user", "content": full_prompt}
+                    ],
                     temperature=self.temperature,
                     top_p=0.7, # top_p 参数可能需要根据模型支持情况调整
                     # max_tokens=self.max_tokens, # 确认 max_tokens 是否支持或需要调整
@@ -103,7 +141,8 @@ class ZhipuModelAdapter(BaseModelAdapter):
                 # 解析流式响应 (v2)
                 for chunk in response:
                     # 检查 chunk 结构和内容
-                    print("chunk")
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
 
             else:
                 # 模拟流式响应
@@ -119,6 +158,86 @@ class ZhipuModelAdapter(BaseModelAdapter):
             print(error_msg)
             yield f"[生成出错: {str(e)}]\n"
     
+    def _build_request(self, full_prompt: str, stream: bool) -> Dict[str, Any]:
+        """构建异步调用对话接口的请求参数"""
+        return {
+            "url": f"{(self.api_base or DEFAULT_API_BASE).rstrip('/')}/chat/completions",
+            "headers": {"Authorization": f"Bearer {self.api_key}"},
+            "json": {
+                "model": self.model_name,
+                "messages": [
+                    {"role": "user", "content": full_prompt}
+                ],
+                "temperature": self.temperature,
+                "top_p": 0.7,
+                "stream": stream
+            }
+        }
+    
+    @traced("llm.generate")
+    async def agenerate(self, prompt: str, context_docs: List[Dict[str, Any]] = None) -> str:
+        """异步生成文本
+        
+        Args:
+            prompt: 提示文本
+            context_docs: 上下文文档
+            
+        Returns:
+            生成的文本
+        """
+        full_prompt = self._build_prompt_with_context(prompt, context_docs)
+        
+        try:
+            if self.api_key:
+                response = await get_async_client().post(**self._build_request(full_prompt, stream=False))
+                result = response.json()
+                if result.get("choices"):
+                    return result["choices"][0]["message"]["content"].strip()
+                error_msg = f"智谱AI API 返回了无效的响应结构: {result}"
+                print(error_msg)
+                return self._get_fallback_response(error_msg)
+            else:
+                # 模拟模式
+                return self._get_mock_response(full_prompt)
+        except Exception as e:
+            error_msg = f"调用智谱AI API时出错: {str(e)}"
+            print(error_msg)
+            return self._get_fallback_response(error_msg)
+    
+    @traced_stream("llm.generate_stream", first_item_stage="llm.first_token")
+    async def agenerate_stream(self, prompt: str, context_docs: List[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """异步流式生成文本
+        
+        Args:
+            prompt: 提示文本
+            context_docs: 上下文文档
+            
+        Yields:
+            生成的文本片段
+        """
+        full_prompt = self._build_prompt_with_context(prompt, context_docs)
+        
+        try:
+            if self.api_key:
+                # 解析流式响应（读完或中途退出时都将连接归还连接池）
+                async with get_async_client().stream("POST", **self._build_request(full_prompt, stream=True)) as response:
+                    async for data in aiter_sse(response):
+                        if data.get("choices"):
+                            content = data["choices"][0].get("delta", {}).get("content")
+                            if content:
+                                yield content
+                        elif "error" in data:
+                            yield f"[生成出错: {data['error'].get('message', '未知错误')}]\n"
+            else:
+                # 模拟流式响应
+                for word in self._get_mock_response(full_prompt).split():
+                    yield word + " "
+                    await asyncio.sleep(0.05)  # 模拟延迟
+        except Exception as e:
+            error_msg = f"调用智谱AI API流式生成时出错: {str(e)}"
+            print(error_msg)
+            yield f"[生成出错: {str(e)}]\n"
+    
     def _get_mock_response(self, prompt: str) -> str:
         """获取模拟响应（当API密钥未设置时使用）
         
@@ -0,0 +1,18 @@
+# 批量处理模块
+# 提供离线批量问答等命令行流水线
+
+import importlib
+
+# 导出名称 -> 所在子模块，子模块在首次访问对应名称时才导入
+_EXPORTS = {
+    "BulkQAPipeline": ".bulk_qa",
+    "read_questions": ".bulk_qa",
+    "load_completed": ".bulk_qa"
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,404 @@
+"""批量问答流水线
+
+从JSONL或CSV文件读取问题，在已保存的知识库上分批检索，以受控的并发和按提供方限流调用大语言模型，
+每完成一个问题就追加写入JSONL结果文件。重新运行时跳过结果文件中已成功的问题（断点续跑），
+重新处理的问题的新结果替换原有的结果行，结束时输出吞吐量和p50/p95/p99延迟。
+
+用法：
+    python -m src.pipeline.bulk_qa --store-dir knowledge_base/vector_stores --store-name contracts \\
+        --questions questions.jsonl --output answers.jsonl --model-type zhipu --model-name chatglm_turbo
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import math
+import os
+import shutil
+import time
+from typing import List, Dict, Any, Optional, Iterator, Set
+
+from ..config import VECTOR_STORE_CONFIG, MODEL_CONFIG, PIPELINE_CONFIG
+from ..models.base_model import BaseModelAdapter
+from ..models.model_factory import ModelFactory
+from ..utils.rate_limit import AsyncRateLimiter, get_rate_limiter
+from ..vector_store.embeddings import get_embedder
+from ..vector_store.vector_store import VectorStore
+
+def read_questions(path: str, question_field: str = "question", id_field: str = "id") -> Iterator[Dict[str, Any]]:
+    """逐条读取问题
+
+    JSONL文件每行一个JSON对象，CSV文件第一行为表头；没有ID字段（或为null）时以行号作为ID
+
+    Args:
+        path: 问题文件路径（.jsonl或.csv）
+        question_field: 问题文本所在的字段
+        id_field: 问题ID所在的字段
+
+    Yields:
+        问题记录，包含'id'、'question'以及原始记录中的其他字段
+
+    Raises:
+        ValueError: 如果文件格式不支持、缺少问题字段或问题ID重复
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in (".jsonl", ".csv"):
+        raise ValueError(f"不支持的问题文件格式: {extension}")
+
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        if extension == ".csv":
+            rows = enumerate(csv.DictReader(f), start=1)
+        else:
+            rows = ((line_no, json.loads(line)) for line_no, line in enumerate(f, start=1) if line.strip())
+        seen = set()
+        for line_no, row in rows:
+            if not row.get(question_field):
+                raise ValueError(f"第{line_no}条记录缺少问题字段: {question_field}")
+            record = dict(row)
+            record_id = row.get(id_field)
+            record["id"] = str(line_no if record_id is None else record_id)
+            # ID重复时断点续跑会把后一个问题当作已完成而跳过
+            if record["id"] in seen:
+                raise ValueError(f"第{line_no}条记录的问题ID重复: {record['id']}")
+            seen.add(record["id"])
+            record["question"] = row[question_field]
+            yield record
+
+def load_completed(path: str, retry_errors: bool = True) -> Set[str]:
+    """读取结果文件中已完成的问题ID
+
+    中断时写了一半的最后一行会被忽略
+
+    Args:
+        path: 结果文件路径
+        retry_errors: 是否重新处理出错的问题
+
+    Returns:
+        已完成的问题ID集合
+    """
+    completed = set()
+    if not os.path.exists(path):
+        return completed
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if not (retry_errors and result.get("error")):
+                completed.add(str(result["id"]))
+    return completed
+
+def repair_output(path: str):
+    """截掉结果文件末尾中断时写了一半的行，使后续追加的结果从新的一行开始
+
+    Args:
+        path: 结果文件路径
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, "rb+") as f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+        # 从末尾向前分块查找最后一个换行符
+        end = size
+        while end > 0:
+            start = max(0, end - (1 << 16))
+            f.seek(start)
+            newline = f.read(end - start).rfind(b"\n")
+            if newline >= 0:
+                f.truncate(start + newline + 1)
+                return
+            end = start
+        f.truncate(0)
+
+def drop_replaced(path: str, end: int, ids: Set[str]):
+    """删除结果文件前end字节中属于ids的结果行，这些问题已重新处理，新结果追加在end之后
+
+    Args:
+        path: 结果文件路径
+        end: 本次运行开始追加前的文件大小
+        ids: 本次运行处理的问题ID
+    """
+    if end == 0 or not ids:
+        return
+
+    def replaced(line: bytes) -> bool:
+        try:
+            return str(json.loads(line)["id"]) in ids
+        except (ValueError, KeyError, TypeError):
+            return False
+
+    with open(path, "rb") as f:
+        if not any(replaced(line) for line in _iter_lines(f, end)):
+            return
+        f.seek(0)
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as out:
+            for line in _iter_lines(f, end):
+                if not replaced(line):
+                    out.write(line)
+            shutil.copyfileobj(f, out)
+    os.replace(temp_path, path)
+
+def _iter_lines(f, end: int) -> Iterator[bytes]:
+    """从当前位置逐行读取到第end字节（end位于行首）"""
+    while f.tell() < end:
+        yield f.readline()
+
+def percentile(values: List[float], q: float) -> float:
+    """计算分位数（最近秩法）
+
+    Args:
+        values: 数值列表
+        q: 分位点，0到1之间
+
+    Returns:
+        分位数，列表为空时返回0
+    """
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, math.ceil(q * len(values)) - 1))]
+
+class BulkQAPipeline:
+    """批量问答流水线
+
+    检索在线程池中分批进行，与模型调用重叠；同时进行的模型调用数量不超过concurrency，
+    发起调用前先从提供方的限流器获取令牌。
+    """
+
+    def __init__(self, store: VectorStore, model: BaseModelAdapter, top_k: int = 3, mode: str = "vector",
+                 concurrency: int = 16, batch_size: int = 64, rate_limiter: Optional[AsyncRateLimiter] = None,
+                 lambda_mult: Optional[float] = None, fetch_k: Optional[int] = None):
+        """初始化流水线
+
+        Args:
+            store: 知识库向量存储
+            model: 模型适配器
+            top_k: 每个问题检索的文档数量
+            mode: 检索方式，'vector'、'lexical'或'hybrid'
+            concurrency: 同时进行的模型调用数量
+            batch_size: 每批检索的问题数量
+            rate_limiter: 模型提供方的限流器，为None时不限流
+            lambda_mult: MMR多样性重排的权衡参数，为None时不重排
+            fetch_k: MMR重排的候选数量
+        """
+        self.store = store
+        self.model = model
+        self.top_k = top_k
+        self.mode = mode
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.rate_limiter = rate_limiter
+        self.lambda_mult = lambda_mult
+        self.fetch_k = fetch_k
+
+    def retrieve(self, questions: List[str]) -> List[List[Dict[str, Any]]]:
+        """分批检索，向量检索（不重排）时一批问题一起嵌入和搜索
+
+        Args:
+            questions: 问题文本列表
+
+        Returns:
+            与questions一一对应的检索结果
+        """
+        if self.mode == "vector" and self.lambda_mult is None:
+            return self.store.similarity_search_batch(questions, k=self.top_k)
+        return [self.store.search(question, k=self.top_k, mode=self.mode, lambda_mult=self.lambda_mult,
+                                  fetch_k=self.fetch_k) for question in questions]
+
+    async def run(self, records: Iterator[Dict[str, Any]], output_path: str,
+                  completed: Optional[Set[str]] = None) -> Dict[str, Any]:
+        """运行流水线，结果逐条追加写入output_path
+
+        结束后删除重新处理的问题在结果文件中原有的结果行；中断时新旧结果行同时保留，
+        load_completed按其中任一成功的结果行判断问题已完成。
+
+        Args:
+            records: 问题记录（read_questions的输出）
+            output_path: 结果文件路径（JSONL）
+            completed: 已完成、需要跳过的问题ID
+
+        Returns:
+            运行统计
+        """
+        completed = completed or set()
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks = set()
+        latencies = []
+        answered = set()
+        stats = {"processed": 0, "skipped": 0, "errors": 0, "context_tokens": 0, "discarded_tokens": 0}
+
+        directory = os.path.dirname(output_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        repair_output(output_path)
+        previous_size = os.path.getsize(output_path) if os.path.exists(output_path) else 0
+
+        async def answer(record: Dict[str, Any], docs: List[Dict[str, Any]], retrieval_ms: float, out):
+            try:
+                try:
+                    result = await self._answer(record, docs, retrieval_ms)
+                except Exception as e:
+                    # 打包上下文、限流等步骤出错时同样写入错误结果，续跑时重新处理
+                    result = dict(record)
+                    result.update({"answer": "", "sources": [], "retrieval_ms": round(retrieval_ms, 2),
+                                   "generation_ms": 0.0, "rate_limit_wait_ms": 0.0, "context_tokens": 0,
+                                   "discarded_tokens": 0, "error": f"{type(e).__name__}: {e}"})
+                out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                out.flush()
+                answered.add(record["id"])
+
+                stats["processed"] += 1
+                stats["context_tokens"] += result["context_tokens"]
+                stats["discarded_tokens"] += result["discarded_tokens"]
+                if result["error"]:
+                    stats["errors"] += 1
+                else:
+                    latencies.append(result["retrieval_ms"] + result["generation_ms"])
+            finally:
+                semaphore.release()
+
+        started = time.perf_counter()
+        with open(output_path, "a", encoding="utf-8") as out:
+            batch = []
+            for record in self._pending(records, completed, stats):
+                batch.append(record)
+                if len(batch) < self.batch_size:
+                    continue
+                await self._dispatch(batch, answer, out, semaphore, tasks, loop)
+                batch = []
+            if batch:
+                await self._dispatch(batch, answer, out, semaphore, tasks, loop)
+            if tasks:
+                await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+        # 重新处理的问题只保留新结果
+        drop_replaced(output_path, previous_size, answered)
+
+        stats.update({
+            "elapsed_s": round(elapsed, 3),
+            "throughput_qps": round(stats["processed"] / elapsed, 3) if elapsed > 0 else 0.0,
+            "latency_p50_ms": round(percentile(latencies, 0.50), 2),
+            "latency_p95_ms": round(percentile(latencies, 0.95), 2),
+            "latency_p99_ms": round(percentile(latencies, 0.99), 2)
+        })
+        return stats
+
+    async def _answer(self, record: Dict[str, Any], docs: List[Dict[str, Any]], retrieval_ms: float) -> Dict[str, Any]:
+        """为一个问题打包上下文并调用模型，返回结果记录（模型调用出错时记录在error字段中）"""
+        context = self.model.pack_context(docs)
+        wait = await self.rate_limiter.acquire() if self.rate_limiter is not None else 0.0
+        start = time.perf_counter()
+        error = None
+        try:
+            answer_text = await self.model.agenerate(record["question"], context["docs"])
+            if self.model.is_error_response(answer_text):
+                error = answer_text
+        except Exception as e:
+            answer_text, error = "", f"{type(e).__name__}: {e}"
+        generation_ms = (time.perf_counter() - start) * 1000
+
+        result = dict(record)
+        result.update({
+            "answer": answer_text,
+            "sources": [{"id": doc.get("id"), "source": doc["metadata"].get("source"), "score": doc.get("score")}
+                        for doc in docs],
+            "retrieval_ms": round(retrieval_ms, 2),
+            "generation_ms": round(generation_ms, 2),
+            "rate_limit_wait_ms": round(wait * 1000, 2),
+            "context_tokens": context["packed_tokens"],
+            "discarded_tokens": context["discarded_tokens"],
+            "error": error
+        })
+        return result
+
+    @staticmethod
+    def _pending(records: Iterator[Dict[str, Any]], completed: Set[str], stats: Dict[str, Any]):
+        """跳过已完成的问题"""
+        for record in records:
+            if record["id"] in completed:
+                stats["skipped"] += 1
+            else:
+                yield record
+
+    async def _dispatch(self, batch: List[Dict[str, Any]], answer, out, semaphore: asyncio.Semaphore, tasks: set,
+                        loop: asyncio.AbstractEventLoop):
+        """在线程池中检索一批问题，再为每个问题创建模型调用任务（并发数达到上限时等待）"""
+        start = time.perf_counter()
+        docs_lists = await loop.run_in_executor(None, self.retrieve, [record["question"] for record in batch])
+        retrieval_ms = (time.perf_counter() - start) * 1000 / len(batch)
+        for record, docs in zip(batch, docs_lists):
+            await semaphore.acquire()
+            task = loop.create_task(answer(record, docs, retrieval_ms, out))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+def main():
+    parser = argparse.ArgumentParser(description="批量问答流水线")
+    parser.add_argument("--store-dir", required=True, help="知识库所在目录")
+    parser.add_argument("--store-name", required=True, help="知识库名称")
+    parser.add_argument("--questions", required=True, help="问题文件（.jsonl或.csv）")
+    parser.add_argument("--output", required=True, help="结果文件（.jsonl），已存在时跳过其中已完成的问题")
+    parser.add_argument("--question-field", default="question", help="问题文本所在的字段")
+    parser.add_argument("--id-field", default="id", help="问题ID所在的字段，缺失时使用行号")
+    parser.add_argument("--model-type", default="zhipu", help="模型类型，如zhipu、baidu")
+    parser.add_argument("--model-name", default="chatglm_turbo", help="模型名称")
+    parser.add_argument("--temperature", type=float, default=MODEL_CONFIG["temperature"], help="温度参数")
+    parser.add_argument("--top-k", type=int, default=MODEL_CONFIG["top_k"], help="每个问题检索的文档数量")
+    parser.add_argument("--mode", default=VECTOR_STORE_CONFIG["search_mode"], choices=["vector", "lexical", "hybrid"],
+                        help="检索方式")
+    parser.add_argument("--mmr-lambda", type=float, default=VECTOR_STORE_CONFIG["mmr_lambda"],
+                        help="MMR多样性重排的相关性权重（0~1），不设置时不重排")
+    parser.add_argument("--mmr-fetch-k", type=int, default=VECTOR_STORE_CONFIG["mmr_fetch_k"],
+                        help="MMR重排前取回的候选数量")
+    parser.add_argument("--concurrency", type=int, default=PIPELINE_CONFIG["concurrency"], help="同时进行的模型调用数量")
+    parser.add_argument("--batch-size", type=int, default=PIPELINE_CONFIG["retrieval_batch_size"],
+                        help="每批检索的问题数量")
+    parser.add_argument("--rate-limit", type=float, help="每秒最多发起的模型请求数量，默认使用配置中该提供方的限制")
+    parser.add_argument("--no-retry-errors", action="store_true", help="续跑时不重新处理之前出错的问题")
+    args = parser.parse_args()
+
+    embedder = get_embedder(
+        VECTOR_STORE_CONFIG["embedder_type"],
+        cache_path=VECTOR_STORE_CONFIG["embedding_cache_path"],
+        cache_max_entries=VECTOR_STORE_CONFIG["embedding_cache_max_entries"],
+        **VECTOR_STORE_CONFIG["embedder_kwargs"]
+    )
+    store = VectorStore.load(args.store_dir, args.store_name, embedder=embedder)
+    model = ModelFactory.get_model(model_type=args.model_type, model_name=args.model_name,
+                                   temperature=args.temperature)
+    rate = args.rate_limit if args.rate_limit is not None else PIPELINE_CONFIG["rate_limits"].get(args.model_type.lower())
+
+    pipeline = BulkQAPipeline(
+        store, model,
+        top_k=args.top_k,
+        mode=args.mode,
+        concurrency=args.concurrency,
+        batch_size=args.batch_size,
+        rate_limiter=get_rate_limiter(args.model_type.lower(), rate),
+        lambda_mult=args.mmr_lambda,
+        fetch_k=args.mmr_fetch_k
+    )
+    completed = load_completed(args.output, retry_errors=not args.no_retry_errors)
+    if completed:
+        print(f"结果文件中已有 {len(completed)} 个完成的问题，将跳过")
+
+    records = read_questions(args.questions, question_field=args.question_field, id_field=args.id_field)
+    stats = asyncio.run(pipeline.run(records, args.output, completed))
+
+    print(f"完成 {stats['processed']} 个问题（跳过 {stats['skipped']}，出错 {stats['errors']}），"
+          f"耗时 {stats['elapsed_s']:.1f} 秒，吞吐量 {stats['throughput_qps']:.2f} 问/秒")
+    print(f"延迟（检索+生成）: p50 {stats['latency_p50_ms']:.0f} ms，p95 {stats['latency_p95_ms']:.0f} ms，"
+          f"p99 {stats['latency_p99_ms']:.0f} ms")
+    print(f"上下文: 共放入 {stats['context_tokens']} 词元，舍弃 {stats['discarded_tokens']} 词元")
+
+if __name__ == "__main__":
+    main()
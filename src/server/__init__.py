@@ -0,0 +1,21 @@
+# 知识库服务模块
+# 提供进程内共享的知识库服务、HTTP接口（SSE流式回答）及其客户端，以及用于压力测试的模拟大模型提供方服务
+
+import importlib
+
+# 导出名称 -> 所在子模块，子模块在首次访问对应名称时才导入（避免未使用服务端时导入fastapi）
+_EXPORTS = {
+    "KnowledgeBaseService": ".knowledge_base",
+    "KnowledgeBaseNotFound": ".knowledge_base",
+    "KnowledgeBaseClient": ".client",
+    "create_app": ".api",
+    "MockProvider": ".mock_provider",
+    "create_mock_provider_app": ".mock_provider"
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
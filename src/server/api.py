@@ -0,0 +1,167 @@
+"""知识库HTTP服务
+
+进程内只加载一次各知识库，所有请求共用；提供导入文档、检索和回答（服务端推送事件SSE流式输出）接口。
+检索、文档解析等阻塞操作在线程池中执行，模型调用使用异步接口，单个进程可以同时处理大量流式回答。
+
+接口：
+    GET    /health                                   健康检查
+    GET    /stores                                   列出知识库
+    GET    /stats                                    缓存统计
+    GET    /traces                                   各阶段耗时统计和最近的span
+    GET    /metrics                                  Prometheus格式的指标
+    PUT    /stores/{name}/documents/{filename}       导入文档（请求体为文件内容），知识库不存在时创建
+    DELETE /stores/{name}/documents/{filename}       删除文档
+    POST   /stores/{name}/search                     检索，请求体{'query', 'k', 'mode'}
+    POST   /stores/{name}/answer                     流式回答，请求体{'question', 'model_type', 'model_name', ...}
+
+回答以SSE返回，每个事件为'data: <JSON>'，依次为sources、若干token、done（出错时为error），最后为'data: [DONE]'。
+
+用法：
+    python -m src.server.api --host 127.0.0.1 --port 8000
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+
+from ..config import APP_CONFIG, MODEL_CONFIG, SERVICE_CONFIG, TEMP_DIR
+from ..models.base_model import BaseModelAdapter
+from ..models.http_client import close_async_client
+from ..utils.tracing import get_tracer
+from .knowledge_base import KnowledgeBaseService, KnowledgeBaseNotFound, sources_event, done_event
+
+class SearchRequest(BaseModel):
+    query: str
+    k: int = MODEL_CONFIG["top_k"]
+    mode: Optional[str] = None
+
+class AnswerRequest(BaseModel):
+    question: str
+    model_type: str = "zhipu"
+    model_name: str = "chatglm_turbo"
+    temperature: float = MODEL_CONFIG["temperature"]
+    top_k: int = MODEL_CONFIG["top_k"]
+    mode: Optional[str] = None
+    bypass_cache: bool = False
+
+def format_sse(data: Any) -> bytes:
+    """编码一个服务端推送事件"""
+    payload = data if isinstance(data, str) else json.dumps(data, ensure_ascii=False, default=str)
+    return f"data: {payload}\n\n".encode("utf-8")
+
+async def answer_events(model: BaseModelAdapter, question: str, context: Dict[str, Any]) -> AsyncIterator[bytes]:
+    """流式生成回答的SSE事件，客户端断开时停止生成"""
+    yield format_sse(sources_event(context))
+    try:
+        async for token in model.agenerate_stream(question, context["docs"]):
+            yield format_sse({"type": "token", "text": token})
+        yield format_sse(done_event(model))
+    except Exception as e:
+        yield format_sse({"type": "error", "message": f"{type(e).__name__}: {e}"})
+    yield format_sse("[DONE]")
+
+def create_app(service: Optional[KnowledgeBaseService] = None) -> FastAPI:
+    """创建HTTP服务应用
+
+    Args:
+        service: 知识库服务，默认创建新的实例（知识库保存在VECTOR_STORE_DIR）
+
+    Returns:
+        FastAPI应用
+    """
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        yield
+        await close_async_client()
+
+    app = FastAPI(title=APP_CONFIG["title"], version=APP_CONFIG["version"], lifespan=lifespan)
+    app.state.service = service = service or KnowledgeBaseService()
+
+    @app.exception_handler(ValueError)
+    async def handle_value_error(request: Request, exc: ValueError):
+        status_code = 404 if isinstance(exc, KnowledgeBaseNotFound) else 400
+        return JSONResponse(status_code=status_code, content={"detail": str(exc)})
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok", "version": APP_CONFIG["version"]}
+
+    @app.get("/stores")
+    async def list_stores():
+        return {"stores": service.list_stores()}
+
+    @app.get("/stats")
+    async def stats():
+        return service.cache_stats()
+
+    @app.get("/traces")
+    async def traces(limit: int = 50):
+        return service.trace_stats(limit)
+
+    @app.get("/metrics")
+    async def metrics():
+        return PlainTextResponse(get_tracer().export_prometheus(), media_type="text/plain; version=0.0.4")
+
+    @app.put("/stores/{name}/documents/{filename}")
+    async def ingest(name: str, filename: str, request: Request):
+        # 请求体逐块写入临时文件，文件名即文档的来源
+        temp_dir = tempfile.mkdtemp(dir=TEMP_DIR)
+        try:
+            path = os.path.join(temp_dir, os.path.basename(filename))
+            size = 0
+            with open(path, "wb") as f:
+                async for chunk in request.stream():
+                    size += len(chunk)
+                    if size > SERVICE_CONFIG["max_upload_mb"] * 1024 * 1024:
+                        return JSONResponse(status_code=413,
+                                            content={"detail": f"文件超过{SERVICE_CONFIG['max_upload_mb']}MB"})
+                    f.write(chunk)
+            return await run_in_threadpool(service.ingest, name, path)
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    @app.delete("/stores/{name}/documents/{filename}")
+    async def remove(name: str, filename: str):
+        return await run_in_threadpool(service.remove, name, os.path.basename(filename))
+
+    @app.post("/stores/{name}/search")
+    async def search(name: str, body: SearchRequest):
+        results = await run_in_threadpool(service.search, name, body.query, body.k, body.mode)
+        return {"results": results}
+
+    @app.post("/stores/{name}/answer")
+    async def answer(name: str, body: AnswerRequest):
+        # 先完成检索，知识库不存在等错误以HTTP状态码返回
+        model, context = await run_in_threadpool(
+            service.prepare_answer, name, body.question, body.model_type, body.model_name,
+            temperature=body.temperature, top_k=body.top_k, mode=body.mode, bypass_cache=body.bypass_cache
+        )
+        return StreamingResponse(
+            answer_events(model, body.question, context),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}  # 禁止反向代理缓冲
+        )
+
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description="知识库HTTP服务")
+    parser.add_argument("--host", default=SERVICE_CONFIG["host"], help="监听地址")
+    parser.add_argument("--port", type=int, default=SERVICE_CONFIG["port"], help="监听端口")
+    args = parser.parse_args()
+
+    import uvicorn
+    # 知识库保存在进程内存中，只使用单个工作进程
+    uvicorn.run(create_app(), host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
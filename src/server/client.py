@@ -0,0 +1,131 @@
+import json
+import os
+from typing import List, Dict, Any, Optional, Iterator
+from urllib.parse import quote
+
+from ..config import SERVICE_CONFIG
+from ..models.http_client import get_session
+
+class KnowledgeBaseClient:
+    """知识库HTTP服务的客户端
+
+    方法与KnowledgeBaseService一致，调用方（如app.py）可以不区分知识库在本进程内还是在服务端
+    """
+
+    def __init__(self, base_url: Optional[str] = None, timeout: tuple = (5, 300)):
+        """初始化客户端
+
+        Args:
+            base_url: 服务地址，默认使用SERVICE_CONFIG中的api_url
+            timeout: (连接超时, 读取超时)，单位秒
+
+        Raises:
+            ValueError: 如果没有提供服务地址
+        """
+        base_url = base_url or SERVICE_CONFIG["api_url"]
+        if not base_url:
+            raise ValueError("未配置知识库服务地址")
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def _request(self, method: str, path: str, **kwargs):
+        """发送请求，服务端返回错误时抛出ValueError"""
+        response = get_session().request(method, self.base_url + path, timeout=self.timeout, **kwargs)
+        if response.status_code >= 400:
+            try:
+                detail = response.json().get("detail")
+            except ValueError:
+                detail = response.text
+            response.close()
+            raise ValueError(f"知识库服务返回错误（{response.status_code}）: {detail}")
+        return response
+
+    def health(self) -> Dict[str, Any]:
+        """检查服务状态"""
+        return self._request("GET", "/health").json()
+
+    def list_stores(self) -> List[Dict[str, Any]]:
+        """列出知识库"""
+        return self._request("GET", "/stores").json()["stores"]
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """获取服务端各缓存的统计信息"""
+        return self._request("GET", "/stats").json()
+
+    def trace_stats(self, limit: int = 50) -> Dict[str, Any]:
+        """获取服务端各阶段的耗时统计和最近的span"""
+        return self._request("GET", "/traces", params={"limit": limit}).json()
+
+    def ingest(self, name: str, file_path: str) -> Dict[str, Any]:
+        """上传文档到知识库，知识库不存在时创建
+
+        Args:
+            name: 知识库名称
+            file_path: 文档路径，文件名作为文档的来源
+
+        Returns:
+            导入统计
+        """
+        path = f"/stores/{quote(name, safe='')}/documents/{quote(os.path.basename(file_path), safe='')}"
+        with open(file_path, "rb") as f:
+            return self._request("PUT", path, data=f).json()
+
+    def remove(self, name: str, filename: str) -> Dict[str, Any]:
+        """从知识库中删除文档
+
+        Args:
+            name: 知识库名称
+            filename: 文档的文件名（导入时的来源）
+
+        Returns:
+            删除统计
+        """
+        path = f"/stores/{quote(name, safe='')}/documents/{quote(filename, safe='')}"
+        return self._request("DELETE", path).json()
+
+    def search(self, name: str, query: str, k: int = 3, mode: Optional[str] = None) -> List[Dict[str, Any]]:
+        """在知识库中检索"""
+        return self._request("POST", f"/stores/{quote(name, safe='')}/search",
+                             json={"query": query, "k": k, "mode": mode}).json()["results"]
+
+    def stream_answer(self, name: str, question: str, model_type: str, model_name: str,
+                      temperature: Optional[float] = None, top_k: Optional[int] = None, mode: Optional[str] = None,
+                      bypass_cache: bool = False) -> Iterator[Dict[str, Any]]:
+        """流式回答问题
+
+        Args:
+            name: 知识库名称
+            question: 问题
+            model_type: 模型类型
+            model_name: 模型名称
+            temperature: 温度参数，默认使用服务端配置
+            top_k: 检索的文档数量，默认使用服务端配置
+            mode: 检索方式，默认使用服务端配置
+            bypass_cache: 是否跳过回答缓存
+
+        Yields:
+            回答事件，与KnowledgeBaseService.stream_answer相同
+
+        Raises:
+            ValueError: 如果服务端返回错误
+        """
+        payload = {"question": question, "model_type": model_type, "model_name": model_name, "mode": mode,
+                   "bypass_cache": bypass_cache}
+        if temperature is not None:
+            payload["temperature"] = temperature
+        if top_k is not None:
+            payload["top_k"] = top_k
+
+        response = self._request("POST", f"/stores/{quote(name, safe='')}/answer", json=payload, stream=True)
+        with response:
+            response.encoding = "utf-8"
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    return
+                event = json.loads(data)
+                if event["type"] == "error":
+                    raise ValueError(f"生成回答时出错: {event['message']}")
+                yield event
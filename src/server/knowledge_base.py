@@ -0,0 +1,329 @@
+import os
+import re
+import threading
+from typing import List, Dict, Any, Optional, Iterator, Tuple
+
+from ..config import DOCUMENT_PROCESSING, VECTOR_STORE_CONFIG, CACHE_CONFIG, MODEL_CONFIG, VECTOR_STORE_DIR
+from ..document_processor.dedup import ChunkDeduplicator
+from ..document_processor.processor import DocumentProcessor
+from ..document_processor.splitter import count_tokens
+from ..models.base_model import BaseModelAdapter
+from ..models.cached_model import CachedModelAdapter
+from ..models.model_factory import ModelFactory
+from ..utils.cache import TTLCache
+from ..utils.tracing import get_tracer
+from ..vector_store.embeddings import BaseEmbedder, get_embedder
+from ..vector_store.retrieval_cache import RetrievalCache
+from ..vector_store.semantic_cache import SemanticAnswerCache
+from ..vector_store.storage import DiskStorage
+from ..vector_store.vector_store import VectorStore
+
+# 知识库名称用作目录名，只允许字母、数字、汉字、下划线和连字符
+_NAME_PATTERN = re.compile(r"^[\w\-]{1,64}$")
+
+class KnowledgeBaseNotFound(ValueError):
+    """知识库不存在"""
+
+def sources_event(context: Dict[str, Any]) -> Dict[str, Any]:
+    """回答事件流的第一个事件：放入上下文的文档及其词元统计（BaseModelAdapter.pack_context的结果）"""
+    return {
+        "type": "sources",
+        "sources": [{"id": doc.get("id"), "content": doc["content"], "metadata": doc["metadata"],
+                     "score": doc.get("score")} for doc in context["docs"]],
+        "context": {key: value for key, value in context.items() if key != "docs"}
+    }
+
+def done_event(model: BaseModelAdapter) -> Dict[str, Any]:
+    """回答事件流的最后一个事件：缓存命中情况"""
+    return {
+        "type": "done",
+        "cache": getattr(model, "last_hit", None),
+        "similarity": getattr(model, "last_similarity", None)
+    }
+
+class KnowledgeBaseService:
+    """进程内共享的知识库服务
+
+    每个知识库在进程内只加载一次，所有请求（Streamlit会话或HTTP请求）共用同一个向量存储、
+    嵌入器和缓存。检索之间、检索与写入之间可以同时进行（向量存储对索引的查询和修改加锁，嵌入在锁外进行）；
+    同一知识库的写入（导入或删除文档并保存）串行执行。
+    """
+
+    def __init__(self, directory: str = VECTOR_STORE_DIR, embedder: Optional[BaseEmbedder] = None,
+                 processor: Optional[DocumentProcessor] = None):
+        """初始化知识库服务
+
+        Args:
+            directory: 知识库保存目录，每个知识库为其中的一个子目录
+            embedder: 嵌入器，默认按VECTOR_STORE_CONFIG创建
+            processor: 文档处理器，默认按DOCUMENT_PROCESSING创建
+        """
+        self.directory = directory
+        self.embedder = embedder or get_embedder(
+            VECTOR_STORE_CONFIG["embedder_type"],
+            cache_path=VECTOR_STORE_CONFIG["embedding_cache_path"],
+            cache_max_entries=VECTOR_STORE_CONFIG["embedding_cache_max_entries"],
+            **VECTOR_STORE_CONFIG["embedder_kwargs"]
+        )
+        self.processor = processor or DocumentProcessor(
+            chunk_size=DOCUMENT_PROCESSING["chunk_size"],
+            chunk_overlap=DOCUMENT_PROCESSING["chunk_overlap"],
+            dedup_threshold=DOCUMENT_PROCESSING["dedup_threshold"],
+            length_function=count_tokens if DOCUMENT_PROCESSING["length_unit"] == "token" else None
+        )
+        self.retrieval_cache = None
+        self.answer_cache = None
+        self.semantic_cache = None
+        if CACHE_CONFIG["enabled"]:
+            self.retrieval_cache = RetrievalCache(
+                max_entries=CACHE_CONFIG["retrieval_max_entries"],
+                ttl=CACHE_CONFIG["retrieval_ttl"],
+                policy=CACHE_CONFIG["policy"]
+            )
+            self.answer_cache = TTLCache(
+                max_entries=CACHE_CONFIG["answer_max_entries"],
+                ttl=CACHE_CONFIG["answer_ttl"],
+                policy=CACHE_CONFIG["policy"]
+            )
+            if CACHE_CONFIG["semantic_enabled"]:
+                self.semantic_cache = SemanticAnswerCache(
+                    self.embedder,
+                    threshold=CACHE_CONFIG["semantic_threshold"],
+                    max_entries=CACHE_CONFIG["semantic_max_entries"],
+                    ttl=CACHE_CONFIG["semantic_ttl"]
+                )
+        self._stores: Dict[str, VectorStore] = {}
+        self._models: Dict[tuple, BaseModelAdapter] = {}  # (模型类型, 模型名称, 温度) -> 模型适配器
+        self._locks: Dict[str, threading.Lock] = {}  # 知识库名称 -> 加载和写入锁
+        self._lock = threading.Lock()
+
+    def _store_lock(self, name: str) -> threading.Lock:
+        """获取知识库的加载和写入锁"""
+        with self._lock:
+            return self._locks.setdefault(name, threading.Lock())
+
+    def _exists_on_disk(self, name: str) -> bool:
+        """知识库是否已保存在磁盘上"""
+        return (DiskStorage.exists(os.path.join(self.directory, name))
+                or os.path.exists(os.path.join(self.directory, f"{name}.pkl")))
+
+    def _new_deduplicator(self) -> Optional[ChunkDeduplicator]:
+        """按配置创建跨文档的文本块去重器，未开启跨文档去重时返回None（文档内去重由文档处理器完成）"""
+        threshold = DOCUMENT_PROCESSING["dedup_threshold"]
+        if threshold is None or not DOCUMENT_PROCESSING["cross_source_dedup"]:
+            return None
+        return ChunkDeduplicator(threshold=threshold)
+
+    def get_store(self, name: str, create: bool = False) -> VectorStore:
+        """获取知识库的向量存储，首次访问时从磁盘加载
+
+        Args:
+            name: 知识库名称
+            create: 知识库不存在时是否创建空的知识库
+
+        Returns:
+            向量存储实例
+
+        Raises:
+            ValueError: 如果知识库名称不合法
+            KnowledgeBaseNotFound: 如果知识库不存在且create为False
+        """
+        if not _NAME_PATTERN.match(name):
+            raise ValueError(f"知识库名称不合法: {name}")
+        store = self._stores.get(name)
+        if store is not None:
+            return store
+
+        with self._store_lock(name):
+            # 等待锁期间其他请求可能已经加载了该知识库
+            store = self._stores.get(name)
+            if store is not None:
+                return store
+            if self._exists_on_disk(name):
+                store = VectorStore.load(self.directory, name, embedder=self.embedder)
+                store.set_deduplicator(self._new_deduplicator())
+            elif create:
+                store = VectorStore(
+                    batch_size=VECTOR_STORE_CONFIG["embedding_batch_size"],
+                    embedder=self.embedder,
+                    index_type=VECTOR_STORE_CONFIG["index_type"],
+                    index_params=VECTOR_STORE_CONFIG["index_params"],
+                    compaction_threshold=VECTOR_STORE_CONFIG["compaction_threshold"],
+                    deduplicator=self._new_deduplicator(),
+                    lexical=VECTOR_STORE_CONFIG["lexical_index"]
+                )
+            else:
+                raise KnowledgeBaseNotFound(f"知识库不存在: {name}")
+            with self._lock:
+                self._stores[name] = store
+        return store
+
+    def list_stores(self) -> List[Dict[str, Any]]:
+        """列出已加载和已保存的知识库
+
+        Returns:
+            知识库信息列表，包含name、loaded和documents（未加载时为None）
+        """
+        names = set(self._stores)
+        if os.path.isdir(self.directory):
+            names.update(entry for entry in os.listdir(self.directory)
+                         if _NAME_PATTERN.match(entry) and DiskStorage.exists(os.path.join(self.directory, entry)))
+        stores = []
+        for name in sorted(names):
+            store = self._stores.get(name)
+            stores.append({"name": name, "loaded": store is not None,
+                           "documents": len(store) if store is not None else None})
+        return stores
+
+    def ingest(self, name: str, file_path: str) -> Dict[str, Any]:
+        """导入文档到知识库并保存，知识库不存在时创建
+
+        同名文档（按文件名）再次导入时替换其原有的文本块，未变化的文本块不会重新嵌入
+
+        Args:
+            name: 知识库名称
+            file_path: 文档路径
+
+        Returns:
+            包含source、chunks、added、removed、unchanged和documents（知识库文档总数）的统计
+
+        Raises:
+            ValueError: 如果知识库名称不合法或文件类型不支持
+        """
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension not in DOCUMENT_PROCESSING["supported_extensions"]:
+            raise ValueError(f"不支持的文件类型: {extension}")
+
+        store = self.get_store(name, create=True)
+        # 解析和分块不需要持有锁
+        chunks = list(self.processor.process_document_stream(file_path))
+        with self._store_lock(name):
+            stats = store.upsert_document(chunks)
+            store.save(self.directory, name)
+        return {"source": os.path.basename(file_path), "chunks": len(chunks), **stats, "documents": len(store)}
+
+    def remove(self, name: str, source: str) -> Dict[str, Any]:
+        """从知识库中删除一个文档（来源）并保存
+
+        跨文档去重时与其他文档共用的文本块会保留，只移除该来源
+
+        Args:
+            name: 知识库名称
+            source: 文档来源，即导入时的文件名
+
+        Returns:
+            包含source、removed（删除的文本块数量）和documents（知识库文档总数）的统计
+
+        Raises:
+            KnowledgeBaseNotFound: 如果知识库不存在
+        """
+        store = self.get_store(name)
+        with self._store_lock(name):
+            removed = store.remove_source(source)
+            store.save(self.directory, name)
+        return {"source": source, "removed": removed, "documents": len(store)}
+
+    def search(self, name: str, query: str, k: int = 3, mode: Optional[str] = None) -> List[Dict[str, Any]]:
+        """在知识库中检索，按配置做MMR多样性重排
+
+        Args:
+            name: 知识库名称
+            query: 查询文本
+            k: 返回的文档数量
+            mode: 检索方式，默认使用配置中的search_mode
+
+        Returns:
+            最相关的k个文档
+
+        Raises:
+            KnowledgeBaseNotFound: 如果知识库不存在
+        """
+        store = self.get_store(name)
+        mode = mode or VECTOR_STORE_CONFIG["search_mode"]
+        mmr = {"lambda_mult": VECTOR_STORE_CONFIG["mmr_lambda"], "fetch_k": VECTOR_STORE_CONFIG["mmr_fetch_k"]}
+        if self.retrieval_cache is not None:
+            return self.retrieval_cache.search(store, query, k=k, mode=mode, **mmr)
+        return store.search(query, k=k, mode=mode, **mmr)
+
+    def prepare_answer(self, name: str, question: str, model_type: str, model_name: str,
+                       temperature: Optional[float] = None, top_k: Optional[int] = None, mode: Optional[str] = None,
+                       bypass_cache: bool = False) -> Tuple[BaseModelAdapter, Dict[str, Any]]:
+        """检索问题的相关文档，创建回答所用的模型，并在模型的词元预算内组装上下文
+
+        模型适配器在所有调用之间共享；启用缓存时每次调用用新的CachedModelAdapter包装（记录本次的缓存命中情况），
+        缓存本身在所有调用之间共享
+
+        Args:
+            name: 知识库名称
+            question: 问题
+            model_type: 模型类型，如'zhipu'、'baidu'
+            model_name: 模型名称
+            temperature: 温度参数，默认使用MODEL_CONFIG中的值
+            top_k: 检索的文档数量，默认使用MODEL_CONFIG中的值
+            mode: 检索方式，默认使用配置中的search_mode
+            bypass_cache: 是否跳过回答缓存
+
+        Returns:
+            (模型适配器, 组装好的上下文)，上下文为pack_context的结果，其中docs为应传给模型的文档
+
+        Raises:
+            KnowledgeBaseNotFound: 如果知识库不存在
+            ValueError: 如果模型类型不支持
+        """
+        docs = self.search(name, question, k=top_k or MODEL_CONFIG["top_k"], mode=mode)
+        temperature = MODEL_CONFIG["temperature"] if temperature is None else temperature
+        key = (model_type.lower(), model_name, temperature)
+        model = self._models.get(key)
+        if model is None:
+            model = ModelFactory.get_model(model_type=model_type, model_name=model_name, temperature=temperature)
+            with self._lock:
+                model = self._models.setdefault(key, model)
+        if self.answer_cache is not None:
+            model = CachedModelAdapter(
+                model,
+                self.answer_cache,
+                semantic_cache=self.semantic_cache,
+                scope=self.get_store(name).cache_token[:2],  # 知识库实例和版本
+                bypass=bypass_cache
+            )
+        return model, model.pack_context(docs)
+
+    def stream_answer(self, name: str, question: str, model_type: str, model_name: str, **kwargs
+                      ) -> Iterator[Dict[str, Any]]:
+        """流式回答问题
+
+        Args:
+            name: 知识库名称
+            question: 问题
+            model_type: 模型类型
+            model_name: 模型名称
+            **kwargs: 传递给prepare_answer的其他参数
+
+        Yields:
+            回答事件：{'type': 'sources'}、若干{'type': 'token', 'text'}、{'type': 'done'}
+        """
+        model, context = self.prepare_answer(name, question, model_type, model_name, **kwargs)
+        yield sources_event(context)
+        for token in model.generate_stream(question, context["docs"]):
+            yield {"type": "token", "text": token}
+        yield done_event(model)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """获取各缓存的统计信息，未启用的缓存为None"""
+        return {
+            "retrieval": self.retrieval_cache.stats() if self.retrieval_cache is not None else None,
+            "answer": self.answer_cache.stats() if self.answer_cache is not None else None,
+            "semantic": self.semantic_cache.stats() if self.semantic_cache is not None else None
+        }
+
+    def trace_stats(self, limit: int = 50) -> Dict[str, Any]:
+        """获取各阶段的耗时统计和最近的span
+
+        Args:
+            limit: 最多返回的span数量
+
+        Returns:
+            包含enabled（是否启用追踪）、stages（Tracer.summary的结果）和spans（最近的span）的字典
+        """
+        tracer = get_tracer()
+        return {"enabled": tracer.enabled, "stages": tracer.summary(), "spans": tracer.recent_spans(limit)}
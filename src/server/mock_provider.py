@@ -0,0 +1,315 @@
+"""模拟大模型提供方的本地HTTP服务
+
+实现百度文心一言（千帆wenxinworkshop）和智谱AI（chat/completions）对话接口的请求与响应格式，
+把适配器的接口地址指向本服务后，适配器走真实的HTTP请求、SSE解析、令牌缓存和出错处理代码，可离线做压力测试。
+首字延迟、生成速度、出错概率和限流都可以配置；所有等待都是异步的，单个进程可以同时维持数千个流式回答。
+
+接口：
+    POST /oauth/2.0/token                                          百度访问令牌
+    POST /rpc/2.0/ai_custom/v1/wenxinworkshop/chat/{endpoint}      百度对话（stream为true时以SSE返回）
+    POST /api/paas/v4/chat/completions                             智谱对话（stream为true时以SSE返回）
+    GET  /health                                                   健康检查
+    GET  /stats                                                    请求、出错和限流次数
+
+用法：
+    python -m src.server.mock_provider --port 8001 --first-token-ms 300 --tokens-per-second 30 --error-rate 0.01
+    BAIDU_API_KEY=mock BAIDU_SECRET_KEY=mock BAIDU_API_BASE=http://127.0.0.1:8001 streamlit run app.py
+    ZHIPU_API_KEY=mock ZHIPU_API_BASE=http://127.0.0.1:8001/api/paas/v4 streamlit run app.py
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from ..config import MOCK_PROVIDER_CONFIG
+from ..document_processor.splitter import count_tokens
+
+# 生成回答时随机选用的词语
+_WORDS = ["根据", "合同", "约定", "甲方", "乙方", "应当", "在", "验收", "合格", "后", "三十日", "内", "支付",
+          "全部", "款项", "，", "逾期", "的", "按", "日", "万分之五", "支付", "违约金", "。"]
+
+# 百度接口的错误码：访问令牌无效、QPS超限、服务内部错误
+_BAIDU_INVALID_TOKEN = (110, "Access token invalid or no longer valid")
+_BAIDU_RATE_LIMITED = (18, "Open api qps request limit reached")
+_BAIDU_SERVER_ERROR = (336100, "try again later")
+
+class MockProvider:
+    """模拟服务的行为设置和统计（线程安全）"""
+
+    def __init__(self, first_token_ms: float = 300, tokens_per_second: float = 30, output_tokens: int = 120,
+                 error_rate: float = 0.0, rate_limit_rate: float = 0.0, qps_limit: Optional[float] = None,
+                 token_latency_ms: float = 50, seed: Optional[int] = None):
+        """初始化模拟服务
+
+        Args:
+            first_token_ms: 收到请求到返回第一个片段的延迟（毫秒）
+            tokens_per_second: 之后每秒返回的片段数量
+            output_tokens: 每个回答的片段数量
+            error_rate: 请求出错的概率，流式请求在随机位置中断并返回错误信息
+            rate_limit_rate: 请求被随机限流的概率
+            qps_limit: 每秒最多接受的对话请求数量，超过的请求返回限流错误，None表示不限制
+            token_latency_ms: 百度访问令牌接口的延迟（毫秒）
+            seed: 随机种子
+
+        Raises:
+            ValueError: 如果概率不在0到1之间或速度不是正数
+        """
+        for name, value in (("error_rate", error_rate), ("rate_limit_rate", rate_limit_rate)):
+            if not 0.0 <= value <= 1.0:
+                raise ValueError(f"{name}必须在0到1之间: {value}")
+        if tokens_per_second <= 0:
+            raise ValueError(f"生成速度必须为正数: {tokens_per_second}")
+        self.first_token_ms = first_token_ms
+        self.tokens_per_second = tokens_per_second
+        self.output_tokens = output_tokens
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.qps_limit = qps_limit
+        self.token_latency_ms = token_latency_ms
+        self._rng = random.Random(seed)
+        self._tokens: set = set()  # 已签发的百度访问令牌
+        self._bucket = float(qps_limit) if qps_limit else 0.0
+        self._bucket_updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "streams": 0, "active_streams": 0, "completed": 0, "errors": 0,
+                      "rate_limited": 0, "tokens": 0, "access_tokens": 0}
+
+    def _count(self, key: str, delta: int = 1):
+        with self._lock:
+            self.stats[key] += delta
+
+    def issue_token(self) -> str:
+        """签发一个百度访问令牌"""
+        token = f"mock-{uuid.uuid4().hex}"
+        with self._lock:
+            self._tokens.add(token)
+            self.stats["access_tokens"] += 1
+        return token
+
+    def is_valid_token(self, token: Optional[str]) -> bool:
+        """访问令牌是否由本服务签发（服务重启后旧令牌失效，可测试适配器的令牌刷新）"""
+        return token in self._tokens
+
+    def admit(self) -> str:
+        """决定一次对话请求的结果
+
+        Returns:
+            'ok'正常返回，'rate_limited'限流，'error'中途出错
+        """
+        with self._lock:
+            self.stats["requests"] += 1
+            if self.qps_limit:
+                now = time.monotonic()
+                self._bucket = min(float(self.qps_limit), self._bucket + (now - self._bucket_updated) * self.qps_limit)
+                self._bucket_updated = now
+                if self._bucket < 1:
+                    self.stats["rate_limited"] += 1
+                    return "rate_limited"
+                self._bucket -= 1
+            if self._rng.random() < self.rate_limit_rate:
+                self.stats["rate_limited"] += 1
+                return "rate_limited"
+            if self._rng.random() < self.error_rate:
+                self.stats["errors"] += 1
+                return "error"
+            return "ok"
+
+    def make_answer(self, prompt: str) -> List[str]:
+        """生成回答的各个片段（同样的问题得到同样的回答）"""
+        rng = random.Random(prompt)
+        return [rng.choice(_WORDS) for _ in range(self.output_tokens)]
+
+    def error_position(self) -> int:
+        """出错的请求在第几个片段之后中断"""
+        with self._lock:
+            return self._rng.randrange(max(self.output_tokens, 1))
+
+    async def stream_pieces(self, pieces: List[str], fail_after: Optional[int] = None) -> AsyncIterator[Optional[str]]:
+        """按首字延迟和生成速度逐个产出片段，在fail_after个片段之后产出None表示出错"""
+        self._count("streams")
+        self._count("active_streams")
+        try:
+            await asyncio.sleep(self.first_token_ms / 1000)
+            interval = 1.0 / self.tokens_per_second
+            for i, piece in enumerate(pieces):
+                if i == fail_after:
+                    yield None
+                    return
+                if i:
+                    await asyncio.sleep(interval)
+                self._count("tokens")
+                yield piece
+            self._count("completed")
+        finally:
+            self._count("active_streams", -1)
+
+    async def generate(self, pieces: List[str]) -> str:
+        """非流式请求：等待整个回答生成完"""
+        await asyncio.sleep(self.first_token_ms / 1000 + max(len(pieces) - 1, 0) / self.tokens_per_second)
+        self._count("tokens", len(pieces))
+        self._count("completed")
+        return "".join(pieces)
+
+def _prompt_of(payload: Dict[str, Any]) -> str:
+    """对话请求中最后一条消息的内容"""
+    messages = payload.get("messages") or [{}]
+    return str(messages[-1].get("content", ""))
+
+def _usage(prompt: str, pieces: List[str]) -> Dict[str, int]:
+    prompt_tokens = count_tokens(prompt)
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": len(pieces),
+            "total_tokens": prompt_tokens + len(pieces)}
+
+def _sse(data: Any) -> bytes:
+    payload = data if isinstance(data, str) else json.dumps(data, ensure_ascii=False)
+    return f"data: {payload}\n\n".encode("utf-8")
+
+def create_mock_provider_app(provider: Optional[MockProvider] = None) -> FastAPI:
+    """创建模拟服务应用
+
+    Args:
+        provider: 模拟服务的行为设置，默认使用MOCK_PROVIDER_CONFIG
+
+    Returns:
+        FastAPI应用
+    """
+    if provider is None:
+        provider = MockProvider(**{key: value for key, value in MOCK_PROVIDER_CONFIG.items()
+                                   if key not in ("host", "port")})
+    app = FastAPI(title="Mock LLM provider")
+    app.state.provider = provider
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    @app.get("/stats")
+    async def stats():
+        return dict(provider.stats)
+
+    @app.post("/oauth/2.0/token")
+    async def baidu_token(request: Request):
+        await asyncio.sleep(provider.token_latency_ms / 1000)
+        if not request.query_params.get("client_id") or not request.query_params.get("client_secret"):
+            return JSONResponse({"error": "invalid_client", "error_description": "unknown client id"}, status_code=401)
+        return {"access_token": provider.issue_token(), "expires_in": 2592000}
+
+    @app.post("/rpc/2.0/ai_custom/v1/wenxinworkshop/chat/{endpoint}")
+    async def baidu_chat(endpoint: str, request: Request):
+        # 百度接口出错时HTTP状态码仍为200，响应体为带error_code的JSON
+        if not provider.is_valid_token(request.query_params.get("access_token")):
+            code, message = _BAIDU_INVALID_TOKEN
+            return {"error_code": code, "error_msg": message}
+        payload = await request.json()
+        outcome = provider.admit()
+        if outcome == "rate_limited":
+            code, message = _BAIDU_RATE_LIMITED
+            return {"error_code": code, "error_msg": message}
+
+        prompt = _prompt_of(payload)
+        pieces = provider.make_answer(prompt)
+        request_id = f"as-{uuid.uuid4().hex[:10]}"
+        if not payload.get("stream"):
+            if outcome == "error":
+                code, message = _BAIDU_SERVER_ERROR
+                return {"error_code": code, "error_msg": message}
+            result = await provider.generate(pieces)
+            return {"id": request_id, "object": "chat.completion", "created": int(time.time()), "result": result,
+                    "is_truncated": False, "need_clear_history": False, "usage": _usage(prompt, pieces)}
+
+        async def events():
+            fail_after = provider.error_position() if outcome == "error" else None
+            sentence_id = 0
+            async for piece in provider.stream_pieces(pieces, fail_after):
+                if piece is None:
+                    code, message = _BAIDU_SERVER_ERROR
+                    yield json.dumps({"error_code": code, "error_msg": message}).encode("utf-8") + b"\n"
+                    return
+                is_end = sentence_id == len(pieces) - 1
+                yield _sse({"id": request_id, "object": "chat.completion", "created": int(time.time()),
+                            "sentence_id": sentence_id, "is_end": is_end, "is_truncated": False, "result": piece,
+                            "need_clear_history": False,
+                            "usage": _usage(prompt, pieces) if is_end else None})
+                sentence_id += 1
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.post("/api/paas/v4/chat/completions")
+    async def zhipu_chat(request: Request):
+        if not request.headers.get("authorization", "").startswith("Bearer "):
+            return JSONResponse({"error": {"code": "1000", "message": "身份验证失败。"}}, status_code=401)
+        payload = await request.json()
+        outcome = provider.admit()
+        if outcome == "rate_limited":
+            return JSONResponse({"error": {"code": "1302", "message": "您当前使用该API的并发数过高，请降低并发"}},
+                                status_code=429)
+
+        prompt = _prompt_of(payload)
+        pieces = provider.make_answer(prompt)
+        request_id = uuid.uuid4().hex
+        model = payload.get("model", "")
+        if not payload.get("stream"):
+            if outcome == "error":
+                return JSONResponse({"error": {"code": "500", "message": "内部错误"}}, status_code=500)
+            result = await provider.generate(pieces)
+            return {"id": request_id, "created": int(time.time()), "model": model,
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": result}}],
+                    "usage": _usage(prompt, pieces)}
+
+        async def events():
+            fail_after = provider.error_position() if outcome == "error" else None
+            async for piece in provider.stream_pieces(pieces, fail_after):
+                if piece is None:
+                    yield _sse({"error": {"code": "500", "message": "内部错误"}})
+                    return
+                yield _sse({"id": request_id, "created": int(time.time()), "model": model,
+                            "choices": [{"index": 0, "delta": {"role": "assistant", "content": piece}}]})
+            yield _sse({"id": request_id, "created": int(time.time()), "model": model,
+                        "choices": [{"index": 0, "finish_reason": "stop",
+                                     "delta": {"role": "assistant", "content": ""}}],
+                        "usage": _usage(prompt, pieces)})
+            yield _sse("[DONE]")
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description="模拟大模型提供方的本地HTTP服务")
+    parser.add_argument("--host", default=MOCK_PROVIDER_CONFIG["host"], help="监听地址")
+    parser.add_argument("--port", type=int, default=MOCK_PROVIDER_CONFIG["port"], help="监听端口")
+    parser.add_argument("--first-token-ms", type=float, default=MOCK_PROVIDER_CONFIG["first_token_ms"],
+                        help="首字延迟（毫秒）")
+    parser.add_argument("--tokens-per-second", type=float, default=MOCK_PROVIDER_CONFIG["tokens_per_second"],
+                        help="每秒生成的片段数量")
+    parser.add_argument("--output-tokens", type=int, default=MOCK_PROVIDER_CONFIG["output_tokens"],
+                        help="每个回答的片段数量")
+    parser.add_argument("--error-rate", type=float, default=MOCK_PROVIDER_CONFIG["error_rate"], help="出错概率")
+    parser.add_argument("--rate-limit-rate", type=float, default=MOCK_PROVIDER_CONFIG["rate_limit_rate"],
+                        help="随机限流的概率")
+    parser.add_argument("--qps-limit", type=float, default=MOCK_PROVIDER_CONFIG["qps_limit"],
+                        help="每秒最多接受的对话请求数量")
+    parser.add_argument("--token-latency-ms", type=float, default=MOCK_PROVIDER_CONFIG["token_latency_ms"],
+                        help="百度访问令牌接口的延迟（毫秒）")
+    parser.add_argument("--seed", type=int, default=MOCK_PROVIDER_CONFIG["seed"], help="随机种子")
+    args = parser.parse_args()
+
+    provider = MockProvider(first_token_ms=args.first_token_ms, tokens_per_second=args.tokens_per_second,
+                            output_tokens=args.output_tokens, error_rate=args.error_rate,
+                            rate_limit_rate=args.rate_limit_rate, qps_limit=args.qps_limit,
+                            token_latency_ms=args.token_latency_ms, seed=args.seed)
+
+    import uvicorn
+    uvicorn.run(create_mock_provider_app(provider), host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
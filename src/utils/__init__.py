@@ -2,5 +2,11 @@
 # 提供项目中需要的辅助功能
 
 from .helpers import get_available_models, format_document_for_display, create_empty_file
+from .lazy_import import lazy_import
+from .cache import TTLCache, normalize_query
+from .rate_limit import AsyncRateLimiter, get_rate_limiter
+from .tracing import Tracer, get_tracer, traced, traced_stream
 
-__all__ = ["get_available_models", "format_document_for_display", "create_empty_file"]
\ No newline at end of file
+__all__ = ["get_available_models", "format_document_for_display", "create_empty_file", "lazy_import", "TTLCache",
+           "normalize_query", "AsyncRateLimiter", "get_rate_limiter", "Tracer", "get_tracer", "traced",
+           "traced_stream"]
\ No newline at end of file
@@ -0,0 +1,138 @@
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_query(text: str) -> str:
+    """规范化查询文本，用作缓存键
+
+    统一全角/半角（NFKC）、转为小写、合并空白字符，使仅有格式差异的相同问题命中同一缓存
+
+    Args:
+        text: 查询文本
+
+    Returns:
+        规范化后的文本
+    """
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip().lower()
+
+class TTLCache:
+    """带过期时间和容量上限的内存缓存（线程安全）
+
+    条目超过ttl秒后视为过期，读取时惰性删除；超过容量上限时按淘汰策略删除：
+    'lru'淘汰最久未访问的条目，'fifo'淘汰最早写入的条目。
+    """
+
+    POLICIES = ("lru", "fifo")
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = 3600, policy: str = "lru"):
+        """初始化缓存
+
+        Args:
+            max_entries: 最多缓存的条目数量
+            ttl: 条目的有效期（秒），为None时不过期
+            policy: 淘汰策略，'lru'或'fifo'
+
+        Raises:
+            ValueError: 如果淘汰策略不支持
+        """
+        if policy not in self.POLICIES:
+            raise ValueError(f"不支持的缓存淘汰策略: {policy}")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.policy = policy
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # 键 -> (过期时间, 值)，按淘汰顺序排列
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """读取缓存
+
+        Args:
+            key: 缓存键
+            default: 未命中或已过期时返回的值
+
+        Returns:
+            缓存的值
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is not None and entry[0] <= time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            if self.policy == "lru":
+                self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any):
+        """写入缓存，超过容量时先清理过期条目，再按淘汰策略删除
+
+        Args:
+            key: 缓存键
+            value: 缓存的值
+        """
+        if self.max_entries <= 0:
+            return
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_entries:
+                self._purge_expired()
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """删除并返回缓存条目
+
+        Args:
+            key: 缓存键
+            default: 条目不存在时返回的值
+
+        Returns:
+            缓存的值
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            return default if entry is None else entry[1]
+
+    def _purge_expired(self):
+        """删除全部过期条目"""
+        now = time.monotonic()
+        expired = [key for key, (expires, _) in self._entries.items() if expires is not None and expires <= now]
+        for key in expired:
+            del self._entries[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+            "max_entries": self.max_entries
+        }
+
+    def clear(self):
+        """清空缓存并重置统计"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
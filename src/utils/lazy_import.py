@@ -0,0 +1,30 @@
+import importlib.util
+import sys
+from types import ModuleType
+
+def lazy_import(name: str) -> ModuleType:
+    """延迟导入模块：立即返回模块对象，首次访问其属性时才真正执行导入
+
+    用于faiss等导入较慢、但并非每次启动都会用到的依赖。
+
+    Args:
+        name: 模块名称，如'faiss'
+
+    Returns:
+        模块对象（已导入时直接返回sys.modules中的模块）
+
+    Raises:
+        ImportError: 如果模块不存在
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f"未找到模块: {name}")
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
@@ -0,0 +1,73 @@
+import asyncio
+import threading
+from typing import Dict, Optional
+
+class AsyncRateLimiter:
+    """异步令牌桶限流器
+
+    令牌以rate个/秒的速度补充，最多积累burst个；每次请求消耗一个令牌，令牌不足时按先来后到等待。
+    """
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        """初始化限流器
+
+        Args:
+            rate: 每秒允许的请求数量
+            burst: 允许的突发请求数量，默认为max(1, rate)
+
+        Raises:
+            ValueError: 如果rate不是正数
+        """
+        if rate <= 0:
+            raise ValueError(f"限流速率必须为正数: {rate}")
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1, int(rate))
+        self._tokens = float(self.burst)
+        self._updated = None
+        self._lock = None
+
+    async def acquire(self) -> float:
+        """获取一个令牌，必要时等待
+
+        Returns:
+            等待的秒数
+        """
+        loop = asyncio.get_running_loop()
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            now = loop.time()
+            if self._updated is not None:
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+
+            # 持有锁等待，后到的请求排在后面
+            wait = (1 - self._tokens) / self.rate
+            await asyncio.sleep(wait)
+            self._tokens = 0.0
+            self._updated = loop.time()
+            return wait
+
+_limiters: Dict[str, AsyncRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter(provider: str, rate: Optional[float]) -> Optional[AsyncRateLimiter]:
+    """获取模型提供方共享的限流器，同一提供方的所有调用共用一个令牌桶
+
+    Args:
+        provider: 模型提供方，如'zhipu'、'baidu'
+        rate: 每秒允许的请求数量，为None时不限流（首次创建时生效）
+
+    Returns:
+        限流器，不限流时返回None
+    """
+    if rate is None:
+        return None
+    with _limiters_lock:
+        limiter = _limiters.get(provider)
+        if limiter is None:
+            limiter = _limiters[provider] = AsyncRateLimiter(rate)
+        return limiter
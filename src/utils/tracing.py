@@ -0,0 +1,381 @@
+import bisect
+import functools
+import inspect
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+from ..config import TRACING_CONFIG
+
+# 各阶段耗时直方图和出错次数在Prometheus中的指标名
+STAGE_DURATION_METRIC = "documind_stage_duration_seconds"
+STAGE_ERRORS_METRIC = "documind_stage_errors_total"
+
+class Histogram:
+    """固定分桶的耗时直方图（线程安全），与Prometheus的histogram类型对应"""
+
+    def __init__(self, buckets: Sequence[float]):
+        """初始化直方图
+
+        Args:
+            buckets: 各分桶的上界（秒），从小到大排列
+        """
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # 最后一个分桶为+Inf
+        self.sum = 0.0
+        self.count = 0
+        self.min = None
+        self.max = None
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        """记录一次观测值"""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+            self.min = value if self.min is None else min(self.min, value)
+            self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """按分桶线性插值估计分位数（与Prometheus的histogram_quantile相同），没有观测值时返回None
+
+        估计值限制在实际观测到的最小值和最大值之间，样本很少时不会偏离实际耗时太远
+        """
+        with self._lock:
+            counts, total, low, high = list(self.counts), self.count, self.min, self.max
+        if total == 0:
+            return None
+        rank = q * total
+        cumulative = 0
+        estimate = high
+        for i, count in enumerate(counts):
+            if cumulative + count >= rank and count > 0:
+                if i < len(self.buckets):
+                    lower = self.buckets[i - 1] if i > 0 else 0.0
+                    estimate = lower + (self.buckets[i] - lower) * (rank - cumulative) / count
+                break
+            cumulative += count
+        return min(max(estimate, low), high)
+
+class Tracer:
+    """轻量的链路追踪与指标收集
+
+    span记录一次操作的起止时间和属性，结束时把耗时计入该阶段的直方图，最近的span保存在环形缓冲区中供调试查看。
+    禁用时span()返回共享的空操作对象，traced装饰的函数只多一次属性判断。
+    """
+
+    def __init__(self, enabled: bool = False, max_spans: int = 500, buckets: Optional[Sequence[float]] = None):
+        """初始化追踪器
+
+        Args:
+            enabled: 是否启用
+            max_spans: 保留的最近span数量
+            buckets: 耗时直方图的分桶上界（秒），默认使用TRACING_CONFIG中的设置
+        """
+        self.enabled = enabled
+        self.buckets = list(buckets if buckets is not None else TRACING_CONFIG["buckets"])
+        self._histograms: Dict[str, Histogram] = {}  # 阶段 -> 耗时直方图
+        self._errors: Dict[str, int] = {}  # 阶段 -> 出错次数
+        self._spans = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+
+    def span(self, stage: str, **attributes) -> "Span":
+        """创建一个span，用作上下文管理器
+
+        Args:
+            stage: 阶段名称，如'vector_store.search'
+            **attributes: span的属性，如文档数量
+
+        Returns:
+            span对象，禁用时为空操作对象
+        """
+        if not self.enabled:
+            return _NOOP_SPAN
+        return Span(self, stage, attributes)
+
+    def record(self, stage: str, seconds: float, start: Optional[float] = None,
+               attributes: Optional[Dict[str, Any]] = None, error: Optional[str] = None):
+        """记录一次已完成的操作
+
+        Args:
+            stage: 阶段名称
+            seconds: 耗时（秒）
+            start: 开始时间（Unix时间戳），默认按当前时间减去耗时计算
+            attributes: span的属性
+            error: 出错时的异常描述
+        """
+        histogram = self._histograms.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(stage, Histogram(self.buckets))
+        histogram.observe(seconds)
+        if error is not None:
+            with self._lock:
+                self._errors[stage] = self._errors.get(stage, 0) + 1
+        self._spans.append({
+            "stage": stage,
+            "start": start if start is not None else time.time() - seconds,
+            "duration_ms": round(seconds * 1000, 3),
+            "thread": threading.current_thread().name,
+            "attributes": dict(attributes or {}),
+            "error": error
+        })
+
+    def timed_iterator(self, stage: str, iterator: Iterator, exclude: Optional["TimedIterator"] = None,
+                       **attributes) -> Iterator:
+        """包装迭代器，统计产出元素所花的时间（不含调用方处理元素的时间），读完时记录
+
+        用于拆分流水线式的生成器：如分块生成器从提取生成器中读取文本，
+        把提取生成器作为exclude传入，分块阶段的耗时即扣除提取耗时后的部分。
+
+        Args:
+            stage: 阶段名称
+            iterator: 被包装的迭代器
+            exclude: 耗时需要扣除的上游TimedIterator
+            **attributes: span的属性
+
+        Returns:
+            包装后的迭代器，禁用时原样返回
+        """
+        if not self.enabled:
+            return iterator
+        return TimedIterator(self, stage, iterator, exclude, attributes)
+
+    def recent_spans(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """最近的span，按结束时间从新到旧排列
+
+        Args:
+            limit: 最多返回的数量
+
+        Returns:
+            span字典列表
+        """
+        spans = list(self._spans)[::-1]
+        return spans[:limit] if limit is not None else spans
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """各阶段的耗时统计（次数、平均值和p50/p95/p99，单位毫秒），按总耗时从多到少排列"""
+        with self._lock:
+            items = list(self._histograms.items())
+            errors = dict(self._errors)
+        rows = []
+        for stage, histogram in items:
+            if histogram.count == 0:
+                continue
+            row = {"stage": stage, "count": histogram.count, "errors": errors.get(stage, 0),
+                   "total_ms": round(histogram.sum * 1000, 1),
+                   "mean_ms": round(histogram.sum * 1000 / histogram.count, 3)}
+            for name, q in (("p50_ms", 0.5), ("p95_ms", 0.95), ("p99_ms", 0.99)):
+                row[name] = round(histogram.quantile(q) * 1000, 3)
+            rows.append(row)
+        return sorted(rows, key=lambda row: row["total_ms"], reverse=True)
+
+    def export_prometheus(self) -> str:
+        """以Prometheus文本格式（0.0.4版）导出各阶段的耗时直方图和出错次数"""
+        with self._lock:
+            items = sorted(self._histograms.items())
+            errors = sorted(self._errors.items())
+        lines = [f"# HELP {STAGE_DURATION_METRIC} Duration of RAG pipeline stages in seconds.",
+                 f"# TYPE {STAGE_DURATION_METRIC} histogram"]
+        for stage, histogram in items:
+            label = _escape_label(stage)
+            with histogram._lock:
+                counts, total, count = list(histogram.counts), histogram.sum, histogram.count
+            cumulative = 0
+            for bound, bucket_count in zip(histogram.buckets + [float("inf")], counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                lines.append(f'{STAGE_DURATION_METRIC}_bucket{{stage="{label}",le="{le}"}} {cumulative}')
+            lines.append(f'{STAGE_DURATION_METRIC}_sum{{stage="{label}"}} {total!r}')
+            lines.append(f'{STAGE_DURATION_METRIC}_count{{stage="{label}"}} {count}')
+        lines.extend([f"# HELP {STAGE_ERRORS_METRIC} Number of RAG pipeline stage calls that raised an exception.",
+                      f"# TYPE {STAGE_ERRORS_METRIC} counter"])
+        for stage, count in errors:
+            lines.append(f'{STAGE_ERRORS_METRIC}{{stage="{_escape_label(stage)}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        """清空所有指标和span"""
+        with self._lock:
+            self._histograms.clear()
+            self._errors.clear()
+            self._spans.clear()
+
+class Span:
+    """一次被追踪的操作，退出上下文时记录耗时"""
+
+    __slots__ = ("tracer", "stage", "attributes", "_start", "_wall_start")
+
+    def __init__(self, tracer: Tracer, stage: str, attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.stage = stage
+        self.attributes = attributes
+
+    def set(self, key: str, value: Any):
+        """设置span的属性"""
+        self.attributes[key] = value
+
+    def __enter__(self) -> "Span":
+        self._wall_start = time.time()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        error = f"{exc_type.__name__}: {exc}" if exc_type is not None else None
+        self.tracer.record(self.stage, time.perf_counter() - self._start, self._wall_start, self.attributes, error)
+        return False
+
+class TimedIterator:
+    """统计产出元素所花时间的迭代器包装，迭代结束时记录一次"""
+
+    def __init__(self, tracer: Tracer, stage: str, iterator: Iterator, exclude: Optional["TimedIterator"],
+                 attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.stage = stage
+        self.iterator = iter(iterator)
+        self.exclude = exclude
+        self.attributes = attributes
+        self.seconds = 0.0
+        self.items = 0
+        self._wall_start = None
+
+    def __iter__(self) -> "TimedIterator":
+        return self
+
+    def __next__(self):
+        if self._wall_start is None:
+            self._wall_start = time.time()
+        start = time.perf_counter()
+        try:
+            item = next(self.iterator)
+        except StopIteration:
+            self.seconds += time.perf_counter() - start
+            seconds = self.seconds - (self.exclude.seconds if self.exclude is not None else 0.0)
+            self.tracer.record(self.stage, max(seconds, 0.0), self._wall_start,
+                               dict(self.attributes, items=self.items))
+            raise
+        self.seconds += time.perf_counter() - start
+        self.items += 1
+        return item
+
+class _NoopSpan:
+    """禁用追踪时使用的空操作span"""
+
+    __slots__ = ()
+
+    def set(self, key: str, value: Any):
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NOOP_SPAN = _NoopSpan()
+
+def _escape_label(value: str) -> str:
+    """转义Prometheus标签值中的反斜杠、双引号和换行"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+_tracer = Tracer(enabled=TRACING_CONFIG["enabled"], max_spans=TRACING_CONFIG["max_spans"])
+
+def get_tracer() -> Tracer:
+    """获取进程内共享的追踪器"""
+    return _tracer
+
+def traced(stage: str) -> Callable:
+    """装饰器：追踪函数（同步或异步）的每次调用
+
+    Args:
+        stage: 阶段名称
+
+    Returns:
+        装饰器
+    """
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not _tracer.enabled:
+                    return await func(*args, **kwargs)
+                with Span(_tracer, stage, {}):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _tracer.enabled:
+                return func(*args, **kwargs)
+            with Span(_tracer, stage, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def traced_stream(stage: str, first_item_stage: Optional[str] = None) -> Callable:
+    """装饰器：追踪生成器函数（同步或异步），记录从调用到读完的总耗时，以及到产出第一个元素的耗时
+
+    调用方提前停止读取时同样记录，span属性中items为已产出的元素数量。
+
+    Args:
+        stage: 总耗时的阶段名称
+        first_item_stage: 首个元素耗时的阶段名称（如首字延迟），为None时不单独记录
+
+    Returns:
+        装饰器
+    """
+    def decorator(func):
+        if inspect.isasyncgenfunction(func):
+            @functools.wraps(func)
+            def async_wrapper(*args, **kwargs):
+                iterator = func(*args, **kwargs)
+                if not _tracer.enabled:
+                    return iterator
+                return _trace_async_iterator(iterator, stage, first_item_stage)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            iterator = func(*args, **kwargs)
+            if not _tracer.enabled:
+                return iterator
+            return _trace_iterator(iterator, stage, first_item_stage)
+        return wrapper
+    return decorator
+
+def _trace_iterator(iterator: Iterator, stage: str, first_item_stage: Optional[str]) -> Iterator:
+    """逐个转发迭代器的元素并记录耗时"""
+    wall_start, start = time.time(), time.perf_counter()
+    items, error = 0, None
+    try:
+        for item in iterator:
+            if items == 0 and first_item_stage is not None:
+                _tracer.record(first_item_stage, time.perf_counter() - start, wall_start)
+            items += 1
+            yield item
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        iterator.close()
+        _tracer.record(stage, time.perf_counter() - start, wall_start, {"items": items}, error)
+
+async def _trace_async_iterator(iterator, stage: str, first_item_stage: Optional[str]):
+    """逐个转发异步迭代器的元素并记录耗时"""
+    wall_start, start = time.time(), time.perf_counter()
+    items, error = 0, None
+    try:
+        async for item in iterator:
+            if items == 0 and first_item_stage is not None:
+                _tracer.record(first_item_stage, time.perf_counter() - start, wall_start)
+            items += 1
+            yield item
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        await iterator.aclose()
+        _tracer.record(stage, time.perf_counter() - start, wall_start, {"items": items}, error)
@@ -1,6 +1,26 @@
 # 向量存储模块
 # 用于存储和检索文档的向量表示
 
-from .vector_store import VectorStore
+import importlib
 
-__all__ = ["VectorStore"]
\ No newline at end of file
+# 导出名称 -> 所在子模块，子模块在首次访问对应名称时才导入
+_EXPORTS = {
+    "VectorStore": ".vector_store",
+    "ShardedVectorStore": ".sharded_store",
+    "RetrievalCache": ".retrieval_cache",
+    "SemanticAnswerCache": ".semantic_cache",
+    "maximal_marginal_relevance": ".mmr",
+    "BaseEmbedder": ".embeddings",
+    "HashEmbedder": ".embeddings",
+    "SentenceTransformerEmbedder": ".embeddings",
+    "EmbeddingCache": ".embeddings",
+    "CachedEmbedder": ".embeddings",
+    "get_embedder": ".embeddings"
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,305 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+class BaseEmbedder(ABC):
+    """嵌入器基类，定义所有嵌入后端必须实现的接口"""
+
+    def __init__(self, embedding_dim: int):
+        """初始化嵌入器
+
+        Args:
+            embedding_dim: 嵌入向量的维度
+        """
+        self.embedding_dim = embedding_dim
+
+    @property
+    def embedder_id(self) -> str:
+        """嵌入器标识，用于区分不同后端/模型产生的向量（例如作为缓存键的一部分）"""
+        return f"{type(self).__name__}:{self.embedding_dim}"
+
+    @abstractmethod
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """批量计算文本的嵌入向量
+
+        Args:
+            texts: 输入文本列表
+
+        Returns:
+            形状为(n, embedding_dim)的float32嵌入矩阵
+        """
+        pass
+
+class HashEmbedder(BaseEmbedder):
+    """基于文本哈希的模拟嵌入器（向量化实现）
+
+    这里使用一个简单的方法来模拟嵌入，实际应用中应该使用预训练模型，
+    如BERT、Sentence-BERT或大模型API提供的嵌入功能
+    """
+
+    def __init__(self, embedding_dim: int = 768):
+        super().__init__(embedding_dim)
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        n = len(texts)
+        embeddings = np.zeros((n, self.embedding_dim), dtype=np.float32)
+        if n == 0:
+            return embeddings
+
+        # 一次性拼接所有MD5摘要，得到(n, 16)的字节矩阵
+        digests = b"".join(hashlib.md5(text.encode()).digest() for text in texts)
+        hash_values = np.frombuffer(digests, dtype=np.uint8).reshape(n, 16)
+
+        # 前16维直接使用哈希值
+        head = min(16, self.embedding_dim)
+        embeddings[:, :head] = hash_values[:, :head].astype(np.float32) / 255.0
+
+        # 剩余维度：embedding[i] = sin(i * embedding[i % 16])
+        if self.embedding_dim > 16:
+            positions = np.arange(16, self.embedding_dim)
+            scales = positions.astype(np.float32)
+            embeddings[:, 16:] = np.sin(scales * embeddings[:, positions % 16])
+
+        # 按行归一化
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        np.divide(embeddings, norms, out=embeddings, where=norms > 0)
+
+        return embeddings
+
+class SentenceTransformerEmbedder(BaseEmbedder):
+    """基于sentence-transformers的本地嵌入器"""
+
+    def __init__(self, model_name: str = "shibing624/text2vec-base-chinese", device: Optional[str] = None):
+        """初始化本地嵌入模型
+
+        Args:
+            model_name: sentence-transformers模型名称或本地路径
+            device: 运行设备，如'cpu'、'cuda'，默认自动选择
+
+        Raises:
+            ImportError: 如果未安装sentence-transformers
+        """
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError("使用SentenceTransformerEmbedder需要先安装sentence-transformers: pip install sentence-transformers") from e
+
+        self.model_name = model_name
+        self.model = SentenceTransformer(model_name, device=device)
+        super().__init__(self.model.get_sentence_embedding_dimension())
+
+    @property
+    def embedder_id(self) -> str:
+        return f"{type(self).__name__}:{self.model_name}"
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.embedding_dim), dtype=np.float32)
+        embeddings = self.model.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+        return np.ascontiguousarray(embeddings, dtype=np.float32)
+
+class EmbeddingCache:
+    """持久化的内容寻址嵌入缓存
+
+    以(嵌入器标识, 文本的sha256)为键将向量保存在SQLite文件中，
+    超过容量上限时按最近最少使用（LRU）顺序淘汰。
+    """
+
+    # SQLite单条语句允许的参数数量有限，批量查询时需要分段
+    _QUERY_CHUNK = 500
+
+    def __init__(self, path: str, max_entries: int = 100000):
+        """初始化嵌入缓存
+
+        Args:
+            path: 缓存数据库文件路径
+            max_entries: 最多缓存的向量数量
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, accessed INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_accessed ON embeddings(accessed)")
+        self._conn.commit()
+
+        # 使用单调递增的访问计数作为LRU时钟，避免同一时刻的写入无法排序
+        count, clock = self._conn.execute("SELECT COUNT(*), COALESCE(MAX(accessed), 0) FROM embeddings").fetchone()
+        self._size = count
+        self._clock = clock
+
+    @staticmethod
+    def make_key(embedder_id: str, text: str) -> str:
+        """生成缓存键"""
+        return f"{embedder_id}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """批量查询缓存，命中的条目会刷新其访问时间
+
+        Args:
+            keys: 缓存键列表
+
+        Returns:
+            命中的缓存键到向量的映射
+        """
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+        with self._lock:
+            for start in range(0, len(unique_keys), self._QUERY_CHUNK):
+                chunk = unique_keys[start:start + self._QUERY_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+
+            if found:
+                self._clock += 1
+                self._conn.executemany(
+                    "UPDATE embeddings SET accessed = ? WHERE key = ?",
+                    [(self._clock, key) for key in found]
+                )
+                self._conn.commit()
+
+            self.hits += sum(1 for key in keys if key in found)
+            self.misses += sum(1 for key in keys if key not in found)
+        return found
+
+    def put_many(self, items: Dict[str, np.ndarray]):
+        """批量写入缓存，超过容量时淘汰最久未访问的条目
+
+        Args:
+            items: 缓存键到向量的映射
+        """
+        if not items:
+            return
+        with self._lock:
+            self._clock += 1
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, accessed) VALUES (?, ?, ?)",
+                [(key, np.asarray(vector, dtype=np.float32).tobytes(), self._clock) for key, vector in items.items()]
+            )
+            self._size += self._conn.total_changes - before
+
+            overflow = self._size - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY accessed ASC LIMIT ?)",
+                    (overflow,)
+                )
+                self._size -= overflow
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": self._size,
+            "max_entries": self.max_entries
+        }
+
+    def clear(self):
+        """清空缓存并重置统计"""
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+            self._size = 0
+            self.hits = 0
+            self.misses = 0
+
+    def close(self):
+        """关闭缓存数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+class CachedEmbedder(BaseEmbedder):
+    """带缓存的嵌入器，命中缓存的文本不再重新计算嵌入"""
+
+    def __init__(self, embedder: BaseEmbedder, cache: EmbeddingCache):
+        """初始化带缓存的嵌入器
+
+        Args:
+            embedder: 实际计算嵌入的后端
+            cache: 嵌入缓存
+        """
+        super().__init__(embedder.embedding_dim)
+        self.embedder = embedder
+        self.cache = cache
+
+    @property
+    def embedder_id(self) -> str:
+        return self.embedder.embedder_id
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        embeddings = np.empty((len(texts), self.embedding_dim), dtype=np.float32)
+        keys = [EmbeddingCache.make_key(self.embedder_id, text) for text in texts]
+        cached = self.cache.get_many(keys)
+
+        # 只对未命中的文本（去重后）计算嵌入
+        missing = {}
+        for i, key in enumerate(keys):
+            if key in cached:
+                embeddings[i] = cached[key]
+            else:
+                missing.setdefault(key, []).append(i)
+
+        if missing:
+            missing_keys = list(missing)
+            computed = self.embedder.embed([texts[missing[key][0]] for key in missing_keys])
+            for key, vector in zip(missing_keys, computed):
+                embeddings[missing[key]] = vector
+            self.cache.put_many(dict(zip(missing_keys, computed)))
+
+        return embeddings
+
+# 可用的嵌入后端
+EMBEDDER_REGISTRY = {
+    "hash": HashEmbedder,
+    "sentence_transformer": SentenceTransformerEmbedder
+}
+
+def get_embedder(embedder_type: str = "hash", cache_path: Optional[str] = None,
+                 cache_max_entries: int = 100000, **kwargs) -> BaseEmbedder:
+    """创建嵌入器实例
+
+    Args:
+        embedder_type: 嵌入后端类型，如'hash'、'sentence_transformer'
+        cache_path: 嵌入缓存文件路径，为None时不使用缓存
+        cache_max_entries: 嵌入缓存的容量上限
+        **kwargs: 传递给嵌入后端的参数
+
+    Returns:
+        嵌入器实例
+
+    Raises:
+        ValueError: 如果嵌入后端类型不支持
+    """
+    embedder_cls = EMBEDDER_REGISTRY.get(embedder_type.lower())
+    if embedder_cls is None:
+        raise ValueError(f"不支持的嵌入后端类型: {embedder_type}")
+
+    embedder = embedder_cls(**kwargs)
+    if cache_path:
+        embedder = CachedEmbedder(embedder, EmbeddingCache(cache_path, max_entries=cache_max_entries))
+    return embedder
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+from typing import Dict, Any, Optional
+
+from ..utils.lazy_import import lazy_import
+
+# faiss导入较慢，首次创建或读取索引时才导入
+faiss = lazy_import("faiss")
+
+# 支持的索引类型
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+# 默认索引参数
+DEFAULT_INDEX_PARAMS = {
+    "nlist": 256,  # IVF聚类中心数量
+    "pq_m": 16,  # PQ子向量数量，需要整除向量维度
+    "pq_nbits": 8,  # 每个PQ子向量的编码位数
+    "hnsw_m": 32,  # HNSW每个节点的邻居数量
+    "ef_construction": 40,  # HNSW构建时的搜索宽度
+    "nprobe": 8,  # IVF查询时探测的聚类数量
+    "ef_search": 64  # HNSW查询时的搜索宽度
+}
+
+# FAISS建议每个聚类中心至少有39个训练样本
+_TRAINING_POINTS_PER_CENTROID = 39
+
+def build_index(index_type: str, embedding_dim: int, **params) -> faiss.Index:
+    """创建指定类型的FAISS索引
+
+    Args:
+        index_type: 索引类型，如'flat'、'ivf_flat'、'ivf_pq'、'hnsw'
+        embedding_dim: 嵌入向量的维度
+        **params: 索引参数，未指定的使用DEFAULT_INDEX_PARAMS中的默认值
+
+    Returns:
+        FAISS索引（IVF类索引需要训练后才能添加向量）
+
+    Raises:
+        ValueError: 如果索引类型不支持或参数不合法
+    """
+    params = {**DEFAULT_INDEX_PARAMS, **params}
+    index_type = index_type.lower()
+
+    if index_type == "flat":
+        index = faiss.IndexFlatL2(embedding_dim)
+    elif index_type == "ivf_flat":
+        quantizer = faiss.IndexFlatL2(embedding_dim)
+        index = faiss.IndexIVFFlat(quantizer, embedding_dim, params["nlist"], faiss.METRIC_L2)
+    elif index_type == "ivf_pq":
+        if embedding_dim % params["pq_m"] != 0:
+            raise ValueError(f"pq_m={params['pq_m']} 必须整除向量维度 {embedding_dim}")
+        quantizer = faiss.IndexFlatL2(embedding_dim)
+        index = faiss.IndexIVFPQ(quantizer, embedding_dim, params["nlist"], params["pq_m"], params["pq_nbits"])
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(embedding_dim, params["hnsw_m"])
+        index.hnsw.efConstruction = params["ef_construction"]
+    else:
+        raise ValueError(f"不支持的索引类型: {index_type}，可选: {', '.join(INDEX_TYPES)}")
+
+    set_search_params(index, nprobe=params["nprobe"], ef_search=params["ef_search"])
+    return index
+
+def training_size(index_type: str, **params) -> int:
+    """获取自动训练索引所需的最少向量数量
+
+    Args:
+        index_type: 索引类型
+        **params: 索引参数
+
+    Returns:
+        需要的训练向量数量，不需要训练的索引返回0
+    """
+    params = {**DEFAULT_INDEX_PARAMS, **params}
+    index_type = index_type.lower()
+    if index_type == "ivf_flat":
+        return params["nlist"] * _TRAINING_POINTS_PER_CENTROID
+    if index_type == "ivf_pq":
+        return max(params["nlist"], 2 ** params["pq_nbits"]) * _TRAINING_POINTS_PER_CENTROID
+    return 0
+
+def with_ids(index: faiss.Index) -> faiss.Index:
+    """让索引支持以自定义ID添加和删除向量
+
+    IVF索引本身支持自定义ID（删除时需要哈希表形式的direct map），
+    其余索引包装在IndexIDMap2中。
+
+    Args:
+        index: 新建的FAISS索引
+
+    Returns:
+        支持add_with_ids的索引
+    """
+    if isinstance(index, faiss.IndexIVF):
+        return index
+    return faiss.IndexIDMap2(index)
+
+def unwrap_index(index: faiss.Index) -> faiss.Index:
+    """获取IndexIDMap包装下的实际索引"""
+    if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        return faiss.downcast_index(index.index)
+    return index
+
+def supports_remove(index: faiss.Index) -> bool:
+    """判断索引是否支持物理删除向量（HNSW不支持，只能在查询时过滤）"""
+    return not isinstance(unwrap_index(index), faiss.IndexHNSW)
+
+def prepare_ivf_ids(index: faiss.Index):
+    """为已训练的IVF索引启用哈希表direct map，以支持按ID重建和删除向量"""
+    index = unwrap_index(index)
+    if isinstance(index, faiss.IndexIVF) and index.direct_map.type != faiss.DirectMap.Hashtable:
+        index.set_direct_map_type(faiss.DirectMap.Hashtable)
+
+def set_search_params(index: faiss.Index, nprobe: Optional[int] = None, ef_search: Optional[int] = None):
+    """设置索引的默认查询参数，对不适用的索引类型忽略对应参数
+
+    Args:
+        index: FAISS索引
+        nprobe: IVF查询时探测的聚类数量
+        ef_search: HNSW查询时的搜索宽度
+    """
+    index = unwrap_index(index)
+    if nprobe is not None and isinstance(index, faiss.IndexIVF):
+        index.nprobe = nprobe
+    if ef_search is not None and isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = ef_search
+
+def make_search_params(index: faiss.Index, nprobe: Optional[int] = None, ef_search: Optional[int] = None,
+                       sel: Optional[faiss.IDSelector] = None) -> Optional[faiss.SearchParameters]:
+    """创建单次查询使用的参数对象，不修改索引本身的设置（可安全地在多线程中使用）
+
+    Args:
+        index: FAISS索引
+        nprobe: IVF查询时探测的聚类数量
+        ef_search: HNSW查询时的搜索宽度
+        sel: 查询时的ID过滤器，只返回被选中的向量
+
+    Returns:
+        查询参数对象，没有需要覆盖的参数时返回None
+    """
+    index = unwrap_index(index)
+    extra = {"sel": sel} if sel is not None else {}
+    # 未指定的查询参数沿用索引当前的设置
+    if isinstance(index, faiss.IndexIVF) and (nprobe is not None or sel is not None):
+        return faiss.SearchParametersIVF(nprobe=nprobe if nprobe is not None else index.nprobe, **extra)
+    if isinstance(index, faiss.IndexHNSW) and (ef_search is not None or sel is not None):
+        return faiss.SearchParametersHNSW(efSearch=ef_search if ef_search is not None else index.hnsw.efSearch, **extra)
+    if sel is not None:
+        return faiss.SearchParameters(sel=sel)
+    return None
+
+def describe_index(index: faiss.Index) -> Dict[str, Any]:
+    """获取索引的基本信息"""
+    info = {
+        "type": type(unwrap_index(index)).__name__,
+        "ntotal": index.ntotal,
+        "is_trained": index.is_trained
+    }
+    index = unwrap_index(index)
+    if isinstance(index, faiss.IndexIVF):
+        info["nlist"] = index.nlist
+        info["nprobe"] = index.nprobe
+    if isinstance(index, faiss.IndexHNSW):
+        info["ef_search"] = index.hnsw.efSearch
+    return info
@@ -0,0 +1,246 @@
+import os
+import re
+from array import array
+from collections import Counter
+from typing import List, Dict, Optional, Tuple
+
+import numpy as np
+
+from ..utils.lazy_import import lazy_import
+
+# jieba加载词典较慢，首次分词时才导入
+jieba = lazy_import("jieba")
+
+# 英文/数字词（允许以-_./连接，如零件编号、条款编号）或连续的汉字
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*|[㐀-鿿豈-﫿]+")
+_COMPOUND_SPLIT = re.compile(r"[-_./]")
+# 词的最大长度，更长的词（多为base64、URL等编码串）不参与检索
+MAX_TOKEN_LENGTH = 64
+
+def tokenize(text: str) -> List[str]:
+    """将文本切分为检索用的词
+
+    中文使用jieba分词；英文和数字转为小写，带连接符的编号（如'GB-2023.1'）同时保留整体和各部分。
+    长度超过MAX_TOKEN_LENGTH的词被丢弃。
+
+    Args:
+        text: 文本
+
+    Returns:
+        词列表
+    """
+    tokens = []
+    for match in _TOKEN_PATTERN.finditer(text.lower()):
+        token = match.group()
+        if token[0] >= "㐀":
+            tokens.extend(word for word in jieba.lcut(token) if word.strip() and len(word) <= MAX_TOKEN_LENGTH)
+            continue
+        if len(token) <= MAX_TOKEN_LENGTH:
+            tokens.append(token)
+        parts = _COMPOUND_SPLIT.split(token)
+        if len(parts) > 1:
+            tokens.extend(part for part in parts if len(part) <= MAX_TOKEN_LENGTH)
+    return tokens
+
+class BM25Index:
+    """BM25倒排索引
+
+    每个词的倒排表由两个紧凑数组组成：文档ID（uint32）和词频（uint16），支持增量追加。
+    删除文档时只将其长度置零，查询时跳过长度为零的文档；倒排表中已删除文档的记录在compact时移除（保存时自动进行）。
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        """初始化BM25索引
+
+        Args:
+            k1: 词频饱和参数
+            b: 文档长度归一化参数
+        """
+        self.k1 = k1
+        self.b = b
+        self.vocabulary: Dict[str, int] = {}  # 词 -> 词ID
+        self._postings_ids: List[array] = []  # 词ID -> 文档ID数组
+        self._postings_tfs: List[array] = []  # 词ID -> 词频数组
+        self.doc_lengths = array("I")  # 文档ID -> 词数，已删除或未索引的文档为0
+        self.num_docs = 0  # 已索引且未删除的文档数量
+        self.total_length = 0  # 已索引且未删除文档的总词数
+
+    def __len__(self) -> int:
+        return self.num_docs
+
+    def add(self, ids: List[int], token_lists: List[List[str]]):
+        """添加已分词的文档
+
+        Args:
+            ids: 文档ID列表
+            token_lists: 与ids一一对应的词列表
+        """
+        for doc_id, tokens in zip(ids, token_lists):
+            if doc_id >= len(self.doc_lengths):
+                self.doc_lengths.extend([0] * (doc_id + 1 - len(self.doc_lengths)))
+            if not tokens or self.doc_lengths[doc_id]:
+                continue
+
+            for token, tf in Counter(tokens).items():
+                term_id = self.vocabulary.get(token)
+                if term_id is None:
+                    term_id = self.vocabulary[token] = len(self._postings_ids)
+                    self._postings_ids.append(array("I"))
+                    self._postings_tfs.append(array("H"))
+                self._postings_ids[term_id].append(doc_id)
+                self._postings_tfs[term_id].append(min(tf, 0xFFFF))
+
+            self.doc_lengths[doc_id] = len(tokens)
+            self.num_docs += 1
+            self.total_length += len(tokens)
+
+    def add_texts(self, ids: List[int], texts: List[str]):
+        """分词并添加文档
+
+        Args:
+            ids: 文档ID列表
+            texts: 与ids一一对应的文本
+        """
+        self.add(ids, [tokenize(text) for text in texts])
+
+    def remove(self, ids: List[int]):
+        """删除文档
+
+        Args:
+            ids: 文档ID列表
+        """
+        for doc_id in ids:
+            if 0 <= doc_id < len(self.doc_lengths) and self.doc_lengths[doc_id]:
+                self.num_docs -= 1
+                self.total_length -= self.doc_lengths[doc_id]
+                self.doc_lengths[doc_id] = 0
+
+    def search(self, query: str, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """BM25检索
+
+        Args:
+            query: 查询文本
+            k: 返回的文档数量
+
+        Returns:
+            (文档ID数组, BM25分数数组)，按分数从高到低排列
+        """
+        query_terms = Counter(term for term in tokenize(query) if term in self.vocabulary)
+        if not query_terms or self.num_docs == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        lengths = np.frombuffer(self.doc_lengths, dtype=np.uint32)
+        avg_length = self.total_length / self.num_docs
+        all_ids = []
+        all_scores = []
+        for term, query_tf in query_terms.items():
+            term_id = self.vocabulary[term]
+            ids = np.frombuffer(self._postings_ids[term_id], dtype=np.uint32)
+            doc_lengths = lengths[ids]
+            live = doc_lengths > 0
+            df = int(np.count_nonzero(live))
+            if df == 0:
+                continue
+            ids = ids[live]
+            tfs = np.frombuffer(self._postings_tfs[term_id], dtype=np.uint16)[live].astype(np.float32)
+            idf = np.log(1.0 + (self.num_docs - df + 0.5) / (df + 0.5))
+            norm = self.k1 * (1.0 - self.b + self.b * doc_lengths[live] / avg_length)
+            all_ids.append(ids)
+            all_scores.append(query_tf * idf * tfs * (self.k1 + 1.0) / (tfs + norm))
+
+        if not all_ids:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        # 合并各词的得分
+        doc_ids, inverse = np.unique(np.concatenate(all_ids), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(all_scores))
+        if len(doc_ids) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            doc_ids, scores = doc_ids[top], scores[top]
+        order = np.argsort(-scores, kind="stable")
+        return doc_ids[order].astype(np.int64), scores[order].astype(np.float32)
+
+    def compact(self):
+        """从倒排表中移除已删除文档的记录，并删除不再出现在任何文档中的词"""
+        lengths = np.frombuffer(self.doc_lengths, dtype=np.uint32)
+        vocabulary = {}
+        postings_ids = []
+        postings_tfs = []
+        for term, term_id in self.vocabulary.items():
+            ids = np.frombuffer(self._postings_ids[term_id], dtype=np.uint32)
+            live = lengths[ids] > 0
+            if not live.any():
+                continue
+            vocabulary[term] = len(postings_ids)
+            if live.all():
+                postings_ids.append(self._postings_ids[term_id])
+                postings_tfs.append(self._postings_tfs[term_id])
+            else:
+                tfs = np.frombuffer(self._postings_tfs[term_id], dtype=np.uint16)
+                postings_ids.append(array("I", ids[live].tobytes()))
+                postings_tfs.append(array("H", tfs[live].tobytes()))
+        self.vocabulary = vocabulary
+        self._postings_ids = postings_ids
+        self._postings_tfs = postings_tfs
+
+    def save(self, path: str):
+        """移除已删除文档的记录后保存索引（写入临时文件后原子替换）
+
+        Args:
+            path: 保存路径（.npz）
+        """
+        self.compact()
+        terms = list(self.vocabulary)
+        # 词表存为一段UTF-8字节和偏移数组（定长字符串数组会把每个词补齐到最长词的长度）
+        encoded_terms = [term.encode("utf-8") for term in terms]
+        term_offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        term_offsets[1:] = np.cumsum([len(term) for term in encoded_terms])
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(self._postings_ids[self.vocabulary[term]]) for term in terms])
+        ids = b"".join(self._postings_ids[self.vocabulary[term]].tobytes() for term in terms)
+        tfs = b"".join(self._postings_tfs[self.vocabulary[term]].tobytes() for term in terms)
+
+        tmp_path = path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            terms_blob=np.frombuffer(b"".join(encoded_terms), dtype=np.uint8),
+            term_offsets=term_offsets,
+            offsets=offsets,
+            postings_ids=np.frombuffer(ids, dtype=np.uint32),
+            postings_tfs=np.frombuffer(tfs, dtype=np.uint16),
+            doc_lengths=np.frombuffer(self.doc_lengths, dtype=np.uint32),
+            params=np.array([self.k1, self.b])
+        )
+        # np.savez会自动补全扩展名，因此临时文件名以.npz结尾
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        """加载索引
+
+        Args:
+            path: 索引路径（.npz）
+
+        Returns:
+            BM25索引
+        """
+        with np.load(path) as data:
+            k1, b = data["params"].tolist()
+            index = cls(k1=k1, b=b)
+            offsets = data["offsets"]
+            postings_ids = data["postings_ids"]
+            postings_tfs = data["postings_tfs"]
+            blob = data["terms_blob"].tobytes()
+            term_offsets = data["term_offsets"].tolist()
+            terms = [blob[start:end].decode("utf-8") for start, end in zip(term_offsets, term_offsets[1:])]
+            for term_id, term in enumerate(terms):
+                index.vocabulary[term] = term_id
+                start, end = offsets[term_id], offsets[term_id + 1]
+                index._postings_ids.append(array("I", postings_ids[start:end].tobytes()))
+                index._postings_tfs.append(array("H", postings_tfs[start:end].tobytes()))
+            index.doc_lengths = array("I", data["doc_lengths"].astype(np.uint32).tobytes())
+
+        lengths = np.frombuffer(index.doc_lengths, dtype=np.uint32)
+        index.num_docs = int(np.count_nonzero(lengths))
+        index.total_length = int(lengths.sum(dtype=np.int64))
+        return index
@@ -0,0 +1,53 @@
+from typing import List
+
+import numpy as np
+
+def maximal_marginal_relevance(query_embedding: np.ndarray, embeddings: np.ndarray, k: int,
+                               lambda_mult: float = 0.5) -> List[int]:
+    """最大边际相关性（MMR）选择
+
+    每一步选择lambda_mult * 与查询的相似度 - (1 - lambda_mult) * 与已选文档的最大相似度 最高的候选。
+    相似度为余弦相似度；候选之间的相似度矩阵一次算出，每一步只做向量运算，不逐个遍历候选。
+
+    Args:
+        query_embedding: 形状为(embedding_dim,)的查询向量
+        embeddings: 形状为(n, embedding_dim)的候选向量
+        k: 选择的数量
+        lambda_mult: 相关性与多样性的权衡，1表示只看相关性，0表示只看多样性
+
+    Returns:
+        按选择顺序排列的候选下标
+
+    Raises:
+        ValueError: 如果lambda_mult不在0到1之间
+    """
+    if not 0.0 <= lambda_mult <= 1.0:
+        raise ValueError(f"lambda_mult必须在0到1之间: {lambda_mult}")
+    n = len(embeddings)
+    k = min(k, n)
+    if k <= 0:
+        return []
+
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    embeddings = embeddings / np.where(norms > 0, norms, 1.0)
+    query = np.asarray(query_embedding, dtype=np.float32).reshape(-1)
+    query_norm = np.linalg.norm(query)
+    if query_norm > 0:
+        query = query / query_norm
+
+    relevance = lambda_mult * (embeddings @ query)
+    similarity = (1.0 - lambda_mult) * (embeddings @ embeddings.T)
+
+    selected = [int(np.argmax(relevance))]
+    max_similarity = similarity[selected[0]].copy()  # 每个候选与已选文档的最大相似度（已乘权重）
+    chosen = np.zeros(n, dtype=bool)
+    chosen[selected[0]] = True
+    for _ in range(k - 1):
+        scores = relevance - max_similarity
+        scores[chosen] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        chosen[best] = True
+        np.maximum(max_similarity, similarity[best], out=max_similarity)
+    return selected
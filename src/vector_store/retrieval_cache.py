@@ -0,0 +1,54 @@
+from typing import List, Dict, Any, Optional
+
+from ..utils.cache import TTLCache, normalize_query
+
+class RetrievalCache:
+    """检索结果缓存
+
+    缓存键为(向量存储的cache_token, 规范化后的查询, k, 检索方式, MMR参数)。
+    向量存储增删文档或修改查询参数后cache_token随之改变，旧的缓存条目不会再被命中，随后按TTL/LRU淘汰，
+    因此无需手动清理。
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = 600, policy: str = "lru"):
+        """初始化检索结果缓存
+
+        Args:
+            max_entries: 最多缓存的检索结果数量
+            ttl: 检索结果的有效期（秒），为None时不过期
+            policy: 淘汰策略，'lru'或'fifo'
+        """
+        self.cache = TTLCache(max_entries=max_entries, ttl=ttl, policy=policy)
+
+    def search(self, store, query: str, k: int = 3, mode: str = "vector", lambda_mult: Optional[float] = None,
+               fetch_k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """带缓存的检索，未命中时调用store.search并缓存结果
+
+        查询先经过规范化再检索，仅有大小写、全半角或空白差异的查询得到相同的结果
+
+        Args:
+            store: 向量存储
+            query: 查询文本
+            k: 返回的文档数量
+            mode: 检索方式，'vector'、'lexical'或'hybrid'
+            lambda_mult: MMR重排的权衡参数，为None时不重排
+            fetch_k: MMR重排的候选数量
+
+        Returns:
+            最相关的k个文档（副本，调用方修改不会影响缓存）
+        """
+        query = normalize_query(query)
+        key = (store.cache_token, query, k, mode, lambda_mult, fetch_k)
+        results = self.cache.get(key)
+        if results is None:
+            results = store.search(query, k=k, mode=mode, lambda_mult=lambda_mult, fetch_k=fetch_k)
+            self.cache.set(key, results)
+        return [doc.copy() for doc in results]
+
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        return self.cache.stats()
+
+    def clear(self):
+        """清空缓存"""
+        self.cache.clear()
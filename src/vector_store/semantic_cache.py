@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Hashable
+
+import numpy as np
+
+from .embeddings import BaseEmbedder
+from ..utils.cache import normalize_query
+from ..utils.lazy_import import lazy_import
+
+# faiss导入较慢，首次写入缓存时才导入
+faiss = lazy_import("faiss")
+
+class SemanticAnswerCache:
+    """语义回答缓存，相似的问题直接复用之前的回答
+
+    问题用知识库的嵌入器嵌入并做L2归一化，按作用域（如知识库）分别保存在小型FAISS内积索引中，
+    查询时取同一作用域内余弦相似度最高的历史问题，达到阈值即命中。
+    缓存条目总数有上限，超过时淘汰最久未命中的条目；条目超过ttl秒后过期。
+    """
+
+    def __init__(self, embedder: BaseEmbedder, threshold: float = 0.92, max_entries: int = 1000,
+                 ttl: Optional[float] = 3600):
+        """初始化语义回答缓存
+
+        Args:
+            embedder: 嵌入器，应与知识库使用的嵌入器一致
+            threshold: 命中所需的最低余弦相似度
+            max_entries: 最多缓存的问题数量（所有作用域合计）
+            ttl: 缓存条目的有效期（秒），为None时不过期
+        """
+        self.embedder = embedder
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.evictions = 0
+        self._hit_similarity = 0.0  # 命中时相似度之和，用于统计平均相似度
+        self._indexes: Dict[Hashable, Any] = {}  # 作用域 -> FAISS索引
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()  # 条目ID -> 条目，按最近命中顺序排列
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def embed(self, question: str) -> np.ndarray:
+        """嵌入问题并归一化
+
+        Args:
+            question: 问题文本
+
+        Returns:
+            形状为(embedding_dim,)的float32单位向量
+        """
+        vector = np.asarray(self.embedder.embed([normalize_query(question)])[0], dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def lookup(self, question: str, scope: Hashable = None, embedding: Optional[np.ndarray] = None,
+               bypass: bool = False) -> Optional[Dict[str, Any]]:
+        """查找相似的历史问题
+
+        Args:
+            question: 问题文本
+            scope: 作用域，只在同一作用域的历史问题中查找
+            embedding: 已计算的问题嵌入（embed的返回值），避免重复嵌入
+            bypass: 是否跳过缓存（只计入统计，始终返回None）
+
+        Returns:
+            命中时返回{'answer', 'question', 'similarity'}，否则返回None
+        """
+        if bypass:
+            with self._lock:
+                self.bypassed += 1
+            return None
+
+        with self._lock:
+            index = self._indexes.get(scope)
+            if index is None or index.ntotal == 0:
+                self.misses += 1
+                return None
+
+        if embedding is None:
+            embedding = self.embed(question)
+        with self._lock:
+            index = self._indexes.get(scope)
+            if index is None or index.ntotal == 0:
+                self.misses += 1
+                return None
+            similarities, ids = index.search(embedding.reshape(1, -1), 1)
+            entry_id, similarity = int(ids[0][0]), float(similarities[0][0])
+            entry = self._entries.get(entry_id)
+            if entry is not None and entry["expires"] is not None and entry["expires"] <= time.monotonic():
+                self._remove(entry_id)
+                entry = None
+            if entry is None or similarity < self.threshold:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(entry_id)
+            self.hits += 1
+            self._hit_similarity += similarity
+            return {"answer": entry["answer"], "question": entry["question"], "similarity": similarity}
+
+    def add(self, question: str, answer: str, scope: Hashable = None, embedding: Optional[np.ndarray] = None):
+        """缓存问题的回答，超过容量时淘汰最久未命中的条目
+
+        Args:
+            question: 问题文本
+            answer: 回答
+            scope: 作用域
+            embedding: 已计算的问题嵌入（embed的返回值），避免重复嵌入
+        """
+        if self.max_entries <= 0:
+            return
+        if embedding is None:
+            embedding = self.embed(question)
+        with self._lock:
+            index = self._indexes.get(scope)
+            if index is None:
+                index = self._indexes[scope] = faiss.IndexIDMap2(faiss.IndexFlatIP(len(embedding)))
+            entry_id = self._next_id
+            self._next_id += 1
+            index.add_with_ids(embedding.reshape(1, -1), np.asarray([entry_id], dtype=np.int64))
+            self._entries[entry_id] = {
+                "scope": scope,
+                "question": question,
+                "answer": answer,
+                "expires": time.monotonic() + self.ttl if self.ttl is not None else None
+            }
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, entry_id: int):
+        """删除条目及其向量，作用域为空时删除其索引"""
+        entry = self._entries.pop(entry_id)
+        index = self._indexes[entry["scope"]]
+        index.remove_ids(np.asarray([entry_id], dtype=np.int64))
+        if index.ntotal == 0:
+            del self._indexes[entry["scope"]]
+
+    def clear_scope(self, scope: Hashable):
+        """删除某个作用域的全部缓存（如知识库被删除或重建时）
+
+        Args:
+            scope: 作用域
+        """
+        with self._lock:
+            for entry_id in [entry_id for entry_id, entry in self._entries.items() if entry["scope"] == scope]:
+                self._remove(entry_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "avg_hit_similarity": self._hit_similarity / self.hits if self.hits else 0.0,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+            "scopes": len(self._indexes),
+            "max_entries": self.max_entries
+        }
+
+    def clear(self):
+        """清空缓存并重置统计"""
+        with self._lock:
+            self._indexes.clear()
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.bypassed = 0
+            self.evictions = 0
+            self._hit_similarity = 0.0
@@ -0,0 +1,310 @@
+import heapq
+import json
+import os
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple, Union, Callable
+
+import numpy as np
+
+from .embeddings import BaseEmbedder, HashEmbedder
+from .vector_store import VectorStore
+
+class ShardedVectorStore:
+    """分片向量存储，将文档分散到多个VectorStore中
+
+    分片方式：
+        'hash'      按文本内容的哈希值均匀分到num_shards个分片
+        'source'    每个来源（文件）一个分片
+        其他字符串   按元数据中的对应字段分片，如'tenant'、'department'
+        函数        传入文档，返回分片名称
+
+    查询时在线程池中并发查询各分片（FAISS查询时会释放GIL），再用堆合并各分片的top-k。
+    所有分片共用同一个嵌入器，查询只嵌入一次，各分片的相似度分数可以直接比较。
+    分片可以单独加载和卸载，未加载的分片不参与查询。
+    """
+
+    MANIFEST = "shards.json"
+    FORMAT_VERSION = 1
+
+    def __init__(self, shard_by: Union[str, Callable[[Dict[str, Any]], str]] = "hash", num_shards: int = 8,
+                 embedding_dim: int = 768, embedder: Optional[BaseEmbedder] = None,
+                 max_workers: Optional[int] = None, **store_kwargs):
+        """初始化分片向量存储
+
+        Args:
+            shard_by: 分片方式，'hash'、'source'、元数据字段名或返回分片名称的函数
+            num_shards: 按哈希分片时的分片数量
+            embedding_dim: 嵌入向量的维度（传入embedder时以embedder的维度为准）
+            embedder: 所有分片共用的嵌入器，默认使用基于哈希的模拟嵌入器
+            max_workers: 并发查询分片的线程数量
+            **store_kwargs: 创建分片时传给VectorStore的参数，如index_type、index_params、lexical
+        """
+        self.shard_by = shard_by
+        self.num_shards = num_shards
+        self.embedder = embedder or HashEmbedder(embedding_dim)
+        self.embedding_dim = self.embedder.embedding_dim
+        self.store_kwargs = store_kwargs
+        self.shards: Dict[str, VectorStore] = {}  # 已加载的分片
+        self.path = None  # 保存/加载后绑定的目录
+        self._shard_dirs: Dict[str, str] = {}  # 分片名称 -> 磁盘上的子目录名
+        self._lock = threading.RLock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or min(32, (os.cpu_count() or 1) + 4),
+                                            thread_name_prefix="shard-search")
+
+    def shard_of(self, document: Dict[str, Any]) -> str:
+        """计算文档所属的分片名称
+
+        Args:
+            document: 文档字典
+
+        Returns:
+            分片名称
+        """
+        if callable(self.shard_by):
+            return str(self.shard_by(document))
+        if self.shard_by == "hash":
+            return f"shard_{zlib.crc32(document['content'].encode('utf-8')) % self.num_shards}"
+        return str(document.get("metadata", {}).get(self.shard_by, ""))
+
+    def shard_names(self, loaded_only: bool = False) -> List[str]:
+        """获取分片名称
+
+        Args:
+            loaded_only: 是否只返回已加载的分片
+
+        Returns:
+            分片名称列表
+        """
+        with self._lock:
+            if loaded_only:
+                return list(self.shards)
+            return list(dict.fromkeys([*self._shard_dirs, *self.shards]))
+
+    def __len__(self) -> int:
+        """已加载分片中的文档数量"""
+        with self._lock:
+            return sum(len(shard) for shard in self.shards.values())
+
+    def _get_shard(self, name: str, create: bool = False) -> Optional[VectorStore]:
+        """获取分片，已保存但未加载的分片自动加载，不存在时按需创建"""
+        with self._lock:
+            shard = self.shards.get(name)
+            if shard is None and name in self._shard_dirs:
+                shard = self.load_shard(name)
+            if shard is None and create:
+                shard = self.shards[name] = VectorStore(embedder=self.embedder, **self.store_kwargs)
+            return shard
+
+    def add_documents(self, documents: List[Dict[str, Any]]) -> List[Tuple[str, int]]:
+        """添加文档，按分片方式分组后并发写入各分片
+
+        Args:
+            documents: 文档列表，每个文档是一个字典，包含内容和元数据
+
+        Returns:
+            新文档的(分片名称, 分片内ID)列表
+        """
+        groups: Dict[str, List[Dict[str, Any]]] = {}
+        for doc in documents:
+            groups.setdefault(self.shard_of(doc), []).append(doc)
+
+        shards = {name: self._get_shard(name, create=True) for name in groups}
+        futures = {name: self._executor.submit(shards[name].add_documents, docs) for name, docs in groups.items()}
+        return [(name, doc_id) for name, future in futures.items() for doc_id in future.result()]
+
+    def remove_source(self, source: str) -> int:
+        """在已加载的分片中删除某个来源的全部文档
+
+        Args:
+            source: 文档来源
+
+        Returns:
+            删除的文档数量
+        """
+        with self._lock:
+            if self.shard_by == "source":
+                shard = self._get_shard(source)
+                return shard.remove_source(source) if shard is not None else 0
+            return sum(shard.remove_source(source) for shard in list(self.shards.values()))
+
+    def similarity_search(self, query: str, k: int = 3, shards: Optional[List[str]] = None,
+                          nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> List[Dict[str, Any]]:
+        """在各分片中并发搜索，合并为全局最相似的k个文档
+
+        Args:
+            query: 查询文本
+            k: 返回的最相似文档数量
+            shards: 只搜索指定的分片（未加载的会自动加载），默认搜索全部已加载的分片
+            nprobe: 本次查询使用的IVF探测聚类数量，默认使用各分片的索引设置
+            ef_search: 本次查询使用的HNSW搜索宽度，默认使用各分片的索引设置
+
+        Returns:
+            最相似的k个文档，包含所属分片名称（shard）和分片内ID（id）
+        """
+        return self.similarity_search_batch([query], k=k, shards=shards, nprobe=nprobe, ef_search=ef_search)[0]
+
+    def similarity_search_batch(self, queries: List[str], k: int = 3, shards: Optional[List[str]] = None,
+                                nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> List[List[Dict[str, Any]]]:
+        """批量搜索，所有查询一起嵌入，每个分片只查询一次
+
+        Args:
+            queries: 查询文本列表
+            k: 每个查询返回的最相似文档数量
+            shards: 只搜索指定的分片（未加载的会自动加载），默认搜索全部已加载的分片
+            nprobe: 本次查询使用的IVF探测聚类数量，默认使用各分片的索引设置
+            ef_search: 本次查询使用的HNSW搜索宽度，默认使用各分片的索引设置
+
+        Returns:
+            与queries一一对应的结果列表
+        """
+        with self._lock:
+            if shards is None:
+                targets = dict(self.shards)
+            else:
+                targets = {name: self._get_shard(name) for name in shards}
+                targets = {name: shard for name, shard in targets.items() if shard is not None}
+        if not queries or not targets:
+            return [[] for _ in queries]
+
+        query_embeddings = np.ascontiguousarray(self.embedder.embed(queries), dtype=np.float32)
+        futures = {
+            name: self._executor.submit(shard.similarity_search_by_vectors, query_embeddings, k, nprobe, ef_search)
+            for name, shard in targets.items()
+        }
+
+        # 合并各分片的top-k
+        merged = [[] for _ in queries]
+        for name, future in futures.items():
+            for i, results in enumerate(future.result()):
+                for doc in results:
+                    doc["shard"] = name
+                merged[i].extend(results)
+        return [heapq.nlargest(k, results, key=lambda doc: doc["score"]) for results in merged]
+
+    def load_shard(self, name: str) -> VectorStore:
+        """从磁盘加载单个分片
+
+        Args:
+            name: 分片名称
+
+        Returns:
+            加载的分片
+
+        Raises:
+            ValueError: 如果分片未保存过
+        """
+        with self._lock:
+            if name in self.shards:
+                return self.shards[name]
+            if self.path is None or name not in self._shard_dirs:
+                raise ValueError(f"分片不存在或尚未保存: {name}")
+            shard = VectorStore.load(self.path, self._shard_dirs[name], embedder=self.embedder)
+            self.shards[name] = shard
+            return shard
+
+    def unload_shard(self, name: str, save: bool = True):
+        """卸载单个分片，释放其内存
+
+        Args:
+            name: 分片名称
+            save: 卸载前是否先保存分片（未保存过的分片不保存将丢失）
+        """
+        with self._lock:
+            shard = self.shards.get(name)
+            if shard is None:
+                return
+            if save:
+                if self.path is None:
+                    raise ValueError("分片存储尚未保存过，请先调用save")
+                self._save_shard(name, shard, self.path)
+                self._write_manifest(self.path)
+            del self.shards[name]
+            if shard.storage is not None:
+                shard.storage.close()
+
+    def _save_shard(self, name: str, shard: VectorStore, path: str):
+        if name not in self._shard_dirs:
+            self._shard_dirs[name] = f"shard_{len(self._shard_dirs):04d}"
+        shard.save(path, self._shard_dirs[name])
+
+    def _write_manifest(self, path: str):
+        """原子地写入分片清单"""
+        manifest = {
+            "format_version": self.FORMAT_VERSION,
+            "shard_by": self.shard_by if isinstance(self.shard_by, str) else None,
+            "num_shards": self.num_shards,
+            "embedding_dim": self.embedding_dim,
+            "embedder_id": self.embedder.embedder_id,
+            "store_kwargs": self.store_kwargs,
+            "shards": self._shard_dirs
+        }
+        tmp_path = os.path.join(path, self.MANIFEST + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, os.path.join(path, self.MANIFEST))
+
+    def save(self, directory: str, name: str):
+        """保存全部分片，每个分片保存在独立的子目录中
+
+        保存到新位置时，未加载的分片会先加载再一并保存
+
+        Args:
+            directory: 保存目录
+            name: 保存名称
+        """
+        path = os.path.join(directory, name)
+        with self._lock:
+            if self.path is not None and os.path.abspath(self.path) != os.path.abspath(path):
+                for shard_name in self.shard_names():
+                    self._get_shard(shard_name)
+                self._shard_dirs = {}
+            os.makedirs(path, exist_ok=True)
+            for shard_name, shard in self.shards.items():
+                self._save_shard(shard_name, shard, path)
+            self._write_manifest(path)
+            self.path = path
+
+    @classmethod
+    def load(cls, directory: str, name: str, embedder: Optional[BaseEmbedder] = None,
+             shards: Optional[List[str]] = None, shard_by: Optional[Callable[[Dict[str, Any]], str]] = None,
+             max_workers: Optional[int] = None) -> "ShardedVectorStore":
+        """从磁盘加载分片向量存储
+
+        Args:
+            directory: 加载目录
+            name: 加载名称
+            embedder: 嵌入器，需与保存时使用的嵌入器一致
+            shards: 要加载的分片名称，默认加载全部分片，传入空列表时只读取清单、分片按需加载
+            shard_by: 保存时使用自定义分片函数时，需重新传入该函数
+            max_workers: 并发查询分片的线程数量
+
+        Returns:
+            加载的分片向量存储实例
+        """
+        path = os.path.join(directory, name)
+        with open(os.path.join(path, cls.MANIFEST), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("format_version") != cls.FORMAT_VERSION:
+            raise ValueError(f"不支持的分片存储格式版本: {manifest.get('format_version')}")
+
+        store = cls(
+            shard_by=shard_by or manifest["shard_by"] or "hash",
+            num_shards=manifest["num_shards"],
+            embedding_dim=manifest["embedding_dim"],
+            embedder=embedder,
+            max_workers=max_workers,
+            **manifest["store_kwargs"]
+        )
+        if manifest["shard_by"] is None and shard_by is None:
+            print("警告：保存时使用了自定义分片函数，请通过shard_by参数重新传入，否则新文档将按哈希分片")
+        store.path = path
+        store._shard_dirs = dict(manifest["shards"])
+        for shard_name in (store._shard_dirs if shards is None else shards):
+            store.load_shard(shard_name)
+        return store
+
+    def close(self):
+        """关闭查询线程池"""
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,352 @@
+import json
+import os
+from typing import List, Dict, Any, Optional, Iterator
+
+import numpy as np
+
+# 磁盘格式版本号，格式发生不兼容变化时递增
+FORMAT_VERSION = 1
+
+# 文档偏移表的记录结构：正文和其余字段（JSON）在各自数据文件中的位置
+RECORD_DTYPE = np.dtype([
+    ("text_offset", "<u8"),
+    ("text_length", "<u4"),
+    ("meta_offset", "<u8"),
+    ("meta_length", "<u4")
+])
+
+# 元数据更新记录的结构：文档ID和新元数据（JSON）在meta.bin中的位置
+UPDATE_DTYPE = np.dtype([
+    ("doc_id", "<i8"),
+    ("meta_offset", "<u8"),
+    ("meta_length", "<u4")
+])
+
+class DiskStorage:
+    """追加写入的向量存储磁盘格式
+
+    目录结构：
+        manifest.json  版本号、向量维度、已提交的文档数量等元信息
+        vectors.bin    原始float32向量，按行连续存放，通过mmap读取
+        texts.bin      UTF-8编码的文本块正文
+        meta.bin       除正文外的其余字段（JSON）
+        records.bin    每个文档在texts.bin/meta.bin中的偏移和长度（定长记录）
+        deleted.bin    已删除文档的ID（int64），文档ID即其行号
+        updates.bin    文档元数据的更新记录（新元数据追加在meta.bin末尾），同一文档以最后一条为准
+        index.faiss    可选的FAISS索引快照（由向量派生，保存时可被覆盖）
+        lexical.npz    可选的BM25倒排索引快照（由文本派生，保存时可被覆盖）
+
+    数据文件只追加不改写，manifest.json中的count/deleted_count/update_count是提交点：写入数据后才更新计数，
+    因此中途失败留下的多余字节会在下次追加前被截断。
+    """
+
+    MANIFEST = "manifest.json"
+    VECTORS = "vectors.bin"
+    TEXTS = "texts.bin"
+    META = "meta.bin"
+    RECORDS = "records.bin"
+    DELETED = "deleted.bin"
+    UPDATES = "updates.bin"
+    INDEX = "index.faiss"
+    LEXICAL = "lexical.npz"
+
+    def __init__(self, path: str, embedding_dim: Optional[int] = None):
+        """打开或创建磁盘存储
+
+        Args:
+            path: 存储目录
+            embedding_dim: 向量维度，创建新存储时必须提供
+
+        Raises:
+            ValueError: 如果存储不存在且未提供向量维度，或格式版本不受支持
+        """
+        self.path = path
+        manifest_path = os.path.join(path, self.MANIFEST)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                self.manifest = json.load(f)
+            if self.manifest.get("format_version") != FORMAT_VERSION:
+                raise ValueError(f"不支持的向量存储格式版本: {self.manifest.get('format_version')}")
+        else:
+            if embedding_dim is None:
+                raise ValueError(f"向量存储不存在: {path}")
+            os.makedirs(path, exist_ok=True)
+            self.manifest = {"format_version": FORMAT_VERSION, "embedding_dim": embedding_dim, "count": 0}
+            self._write_manifest()
+
+        self.embedding_dim = self.manifest["embedding_dim"]
+        self._mapping = (-1, None, None)  # (已映射的文档数量, 向量, 偏移表)，整体替换，读取时不会看到一半的状态
+        self._meta_updates = None  # 文档ID -> 最新元数据的(偏移, 长度)，首次读取时加载
+        self._text_fd = None
+        self._meta_fd = None
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        """判断目录中是否已有磁盘存储"""
+        return os.path.exists(os.path.join(path, DiskStorage.MANIFEST))
+
+    def __len__(self) -> int:
+        return self.manifest["count"]
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _write_manifest(self):
+        """原子地写入manifest"""
+        tmp_path = self._file(self.MANIFEST + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._file(self.MANIFEST))
+
+    def _remap(self) -> tuple:
+        """文档数量变化后重新映射向量和偏移表
+
+        先建立新的映射再整体替换旧的映射，同时进行的读取使用旧映射或新映射，不会读到空值
+
+        Returns:
+            (向量, 偏移表)，没有文档时均为None
+        """
+        count = len(self)
+        mapped_count, vectors, records = self._mapping
+        if count != mapped_count:
+            vectors = records = None
+            if count > 0:
+                vectors = np.memmap(self._file(self.VECTORS), dtype=np.float32, mode="r",
+                                    shape=(count, self.embedding_dim))
+                records = np.memmap(self._file(self.RECORDS), dtype=RECORD_DTYPE, mode="r", shape=(count,))
+            self._mapping = (count, vectors, records)
+        return vectors, records
+
+    def _committed_sizes(self) -> Dict[str, int]:
+        """根据已提交的文档数量计算各数据文件的有效长度"""
+        count = len(self)
+        sizes = {
+            self.VECTORS: count * self.embedding_dim * 4,
+            self.RECORDS: count * RECORD_DTYPE.itemsize,
+            self.TEXTS: 0,
+            self.META: 0
+        }
+        if count > 0:
+            last = self._remap()[1][count - 1]
+            sizes[self.TEXTS] = int(last["text_offset"]) + int(last["text_length"])
+            sizes[self.META] = int(last["meta_offset"]) + int(last["meta_length"])
+        # 元数据更新同样追加在meta.bin末尾
+        for offset, length in self._get_meta_updates().values():
+            sizes[self.META] = max(sizes[self.META], offset + length)
+        return sizes
+
+    def append(self, documents: List[Dict[str, Any]], embeddings: np.ndarray):
+        """追加文档和对应的向量，不改写已有数据
+
+        Args:
+            documents: 文档列表，每个文档是一个字典，包含内容和元数据
+            embeddings: 形状为(n, embedding_dim)的嵌入矩阵
+        """
+        if not documents:
+            return
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        if embeddings.shape != (len(documents), self.embedding_dim):
+            raise ValueError(f"向量形状 {embeddings.shape} 与文档数量或维度不匹配")
+
+        sizes = self._committed_sizes()
+        records = np.empty(len(documents), dtype=RECORD_DTYPE)
+        texts = []
+        metas = []
+        text_offset = sizes[self.TEXTS]
+        meta_offset = sizes[self.META]
+        for i, doc in enumerate(documents):
+            text = doc["content"].encode("utf-8")
+            meta = json.dumps({key: value for key, value in doc.items() if key != "content"},
+                              ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            records[i] = (text_offset, len(text), meta_offset, len(meta))
+            text_offset += len(text)
+            meta_offset += len(meta)
+            texts.append(text)
+            metas.append(meta)
+
+        # 截断上次未提交的残留数据后再追加
+        for name, data in ((self.VECTORS, embeddings.tobytes()),
+                           (self.RECORDS, records.tobytes()),
+                           (self.TEXTS, b"".join(texts)),
+                           (self.META, b"".join(metas))):
+            with open(self._file(name), "ab") as f:
+                f.truncate(sizes[name])
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+
+        self.manifest["count"] += len(documents)
+        self._write_manifest()
+
+    def append_deleted(self, ids: List[int]):
+        """追加已删除文档的ID（墓碑）
+
+        Args:
+            ids: 已删除文档的ID列表
+        """
+        if not ids:
+            return
+        deleted_count = self.manifest.get("deleted_count", 0)
+        with open(self._file(self.DELETED), "ab") as f:
+            f.truncate(deleted_count * 8)
+            f.write(np.asarray(ids, dtype="<i8").tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        self.manifest["deleted_count"] = deleted_count + len(ids)
+        self._write_manifest()
+
+    def update_documents(self, documents: Dict[int, Dict[str, Any]]):
+        """更新已保存文档的元数据（正文和向量不变），新元数据追加写入，不改写已有数据
+
+        Args:
+            documents: 文档ID到更新后文档的映射
+        """
+        if not documents:
+            return
+        sizes = self._committed_sizes()
+        update_count = self.manifest.get("update_count", 0)
+        records = np.empty(len(documents), dtype=UPDATE_DTYPE)
+        metas = []
+        meta_offset = sizes[self.META]
+        for i, (doc_id, doc) in enumerate(sorted(documents.items())):
+            if not 0 <= doc_id < len(self):
+                raise IndexError(doc_id)
+            meta = json.dumps({key: value for key, value in doc.items() if key != "content"},
+                              ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            records[i] = (doc_id, meta_offset, len(meta))
+            meta_offset += len(meta)
+            metas.append(meta)
+
+        for name, data, size in ((self.META, b"".join(metas), sizes[self.META]),
+                                 (self.UPDATES, records.tobytes(), update_count * UPDATE_DTYPE.itemsize)):
+            with open(self._file(name), "ab") as f:
+                f.truncate(size)
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+
+        self.manifest["update_count"] = update_count + len(documents)
+        self._write_manifest()
+        for record in records:
+            self._meta_updates[int(record["doc_id"])] = (int(record["meta_offset"]), int(record["meta_length"]))
+
+    def _get_meta_updates(self) -> Dict[int, tuple]:
+        """读取已提交的元数据更新记录"""
+        meta_updates = self._meta_updates
+        if meta_updates is None:
+            meta_updates = {}
+            update_count = self.manifest.get("update_count", 0)
+            if update_count:
+                records = np.fromfile(self._file(self.UPDATES), dtype=UPDATE_DTYPE, count=update_count)
+                for record in records:
+                    meta_updates[int(record["doc_id"])] = (int(record["meta_offset"]), int(record["meta_length"]))
+            self._meta_updates = meta_updates
+        return meta_updates
+
+    def deleted_ids(self) -> np.ndarray:
+        """读取全部已删除文档的ID"""
+        deleted_count = self.manifest.get("deleted_count", 0)
+        if deleted_count == 0:
+            return np.zeros(0, dtype=np.int64)
+        return np.fromfile(self._file(self.DELETED), dtype="<i8", count=deleted_count).astype(np.int64)
+
+    def vectors(self) -> np.ndarray:
+        """获取全部向量的只读内存映射"""
+        vectors = self._remap()[0]
+        if vectors is None:
+            return np.zeros((0, self.embedding_dim), dtype=np.float32)
+        return vectors
+
+    def _read(self, name: str, offset: int, length: int) -> bytes:
+        fd_attr = "_text_fd" if name == self.TEXTS else "_meta_fd"
+        fd = getattr(self, fd_attr)
+        if fd is None:
+            fd = os.open(self._file(name), os.O_RDONLY)
+            setattr(self, fd_attr, fd)
+        return os.pread(fd, length, offset)
+
+    def get_document(self, idx: int) -> Dict[str, Any]:
+        """读取单个文档
+
+        Args:
+            idx: 文档下标
+
+        Returns:
+            文档字典，包含内容和元数据
+        """
+        if not 0 <= idx < len(self):
+            raise IndexError(idx)
+        record = self._remap()[1][idx]
+        document = {"content": self._read(self.TEXTS, int(record["text_offset"]), int(record["text_length"])).decode("utf-8")}
+        meta_offset, meta_length = self._get_meta_updates().get(
+            idx, (int(record["meta_offset"]), int(record["meta_length"])))
+        document.update(json.loads(self._read(self.META, meta_offset, meta_length)))
+        return document
+
+    def update_manifest(self, **fields):
+        """更新manifest中的附加信息（如嵌入器、索引配置）"""
+        self.manifest.update(fields)
+        self._write_manifest()
+
+    def close(self):
+        """关闭打开的文件"""
+        for fd_attr in ("_text_fd", "_meta_fd"):
+            fd = getattr(self, fd_attr)
+            if fd is not None:
+                os.close(fd)
+                setattr(self, fd_attr, None)
+        self._mapping = (-1, None, None)
+        self._meta_updates = None
+
+class LazyDocumentList:
+    """按需从磁盘读取的文档列表
+
+    已持久化的文档只在被访问时才从磁盘读取，新添加的文档在保存前保存在内存中
+    （已删除的新文档以None占位）。已持久化但元数据被修改的文档也保存在内存中，保存时写回磁盘。
+    """
+
+    def __init__(self, storage: DiskStorage):
+        self.storage = storage
+        self.persisted_count = len(storage)  # 创建时磁盘上的文档数量，之后的文档保存在pending中
+        self.pending = []  # 尚未写入磁盘的文档
+        self.modified = {}  # 已持久化、元数据在内存中被修改的文档：文档ID -> 文档
+
+    def __len__(self) -> int:
+        return self.persisted_count + len(self.pending)
+
+    def __getitem__(self, idx: int) -> Dict[str, Any]:
+        if idx < 0:
+            idx += len(self)
+        if idx < self.persisted_count:
+            if idx in self.modified:
+                return self.modified[idx]
+            return self.storage.get_document(idx)
+        return self.pending[idx - self.persisted_count]
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for idx in range(len(self)):
+            yield self[idx]
+
+    def extend(self, documents: List[Dict[str, Any]]):
+        self.pending.extend(documents)
+
+    def append(self, document: Dict[str, Any]):
+        self.pending.append(document)
+
+    def __setitem__(self, idx: int, document: Dict[str, Any]):
+        """替换文档，已持久化的文档记录为待写回的修改"""
+        if idx < 0:
+            idx += len(self)
+        if idx < self.persisted_count:
+            self.modified[idx] = document
+        else:
+            self.pending[idx - self.persisted_count] = document
+
+    def release(self, idx: int):
+        """释放已删除文档占用的内存"""
+        if idx >= self.persisted_count:
+            self.pending[idx - self.persisted_count] = None
+        else:
+            self.modified.pop(idx, None)
@@ -1,28 +1,101 @@
+from __future__ import annotations
+
 import numpy as np
-from typing import List, Dict, Any, Optional
-import faiss
+from typing import List, Dict, Any, Optional, Iterable, TYPE_CHECKING
 import os
+import json
 import pickle
+import shutil
+import threading
+import uuid
 from datetime import datetime
 
+from .embeddings import BaseEmbedder, HashEmbedder
+from ..utils.lazy_import import lazy_import
+from ..utils.tracing import traced
+from .storage import DiskStorage, LazyDocumentList
+from .lexical_index import BM25Index, tokenize
+from .mmr import maximal_marginal_relevance
+from .index_factory import (build_index, training_size, with_ids, supports_remove, prepare_ivf_ids,
+                            set_search_params, make_search_params, describe_index)
+
+# faiss导入较慢，首次创建或读取索引时才导入
+faiss = lazy_import("faiss")
+
+if TYPE_CHECKING:
+    # 只用于类型标注，避免向量存储依赖文档解析库
+    from ..document_processor.dedup import ChunkDeduplicator
+
 class VectorStore:
-    """向量存储类，用于存储和检索文档的向量表示"""
+    """向量存储类，用于存储和检索文档的向量表示
+    
+    可在多个线程中同时使用：FAISS索引不支持边修改边查询，索引的查询、修改和文档读取都持有同一把锁，
+    嵌入和分词等耗时的计算在锁外进行
+    """
     
-    def __init__(self, embedding_dim: int = 768):
+    def __init__(self, embedding_dim: int = 768, batch_size: int = 256, embedder: Optional[BaseEmbedder] = None,
+                 index_type: str = "flat", index_params: Optional[Dict[str, Any]] = None,
+                 compaction_threshold: float = 0.2, deduplicator: Optional["ChunkDeduplicator"] = None,
+                 lexical: bool = False):
         """初始化向量存储
         
         Args:
-            embedding_dim: 嵌入向量的维度
+            embedding_dim: 嵌入向量的维度（传入embedder时以embedder的维度为准）
+            batch_size: 批量嵌入时每批处理的文本数量
+            embedder: 嵌入器，默认使用基于哈希的模拟嵌入器
+            index_type: FAISS索引类型，可选'flat'、'ivf_flat'、'ivf_pq'、'hnsw'
+            index_params: 索引参数，如nlist、pq_m、hnsw_m、nprobe、ef_search等
+            compaction_threshold: 索引中已删除但未物理移除的向量占比超过该值时，在后台重建索引
+            deduplicator: 文本块去重器，设置后添加文档时剔除与已有文本块重复的文本块
+            lexical: 是否同时建立BM25倒排索引，用于关键词检索和混合检索
         """
-        self.embedding_dim = embedding_dim
-        self.index = faiss.IndexFlatL2(embedding_dim)  # 使用L2距离的FAISS索引
-        self.documents = []  # 存储文档内容和元数据
-        self.embeddings = None  # 存储所有文档的嵌入向量
+        self.embedder = embedder or HashEmbedder(embedding_dim)
+        self.embedding_dim = self.embedder.embedding_dim
+        self.batch_size = batch_size
+        self.index_type = index_type
+        self.index_params = dict(index_params or {})
+        self.compaction_threshold = compaction_threshold
+        self.index, self.staging_index = self._new_index()
+        # 文档的ID即其在documents中的下标，删除后不会复用；已删除的文档以None占位
+        self.documents = []  # 存储文档内容和元数据（向量只保存在FAISS索引中，需要时从索引重建）
+        self.deleted_ids = set()  # 已删除文档的ID（墓碑）
+        self.storage = None  # 保存/加载后绑定的磁盘存储
+        self._masked_ids = set()  # 已删除但索引不支持物理删除（HNSW）、查询时需要过滤的ID
+        self._mask_selector = None
+        self._source_ids = None  # 来源到文档ID的映射，首次使用时构建
+        self._lock = threading.RLock()
+        self._version = 0  # 每次增删文档时递增，用于判断后台压缩期间是否有修改，以及让检索缓存失效
+        self._instance_id = uuid.uuid4().hex  # 区分不同的向量存储实例（包括重新加载的实例）
+        self._compaction_thread = None
+        self.deduplicator = deduplicator
+        self.lexical_index = BM25Index() if lexical else None
     
-    def _get_embedding(self, text: str) -> np.ndarray:
-        """获取文本的嵌入向量
+    def set_deduplicator(self, deduplicator: Optional["ChunkDeduplicator"]):
+        """设置文本块去重器，并用当前未删除的文档初始化其状态
         
-        这里使用一个简单的方法来模拟嵌入，实际应用中应该使用预训练模型
+        Args:
+            deduplicator: 文本块去重器，为None时关闭去重
+        """
+        with self._lock:
+            if deduplicator is not None:
+                # 以文档ID登记已有的文档，已有文档之间的重复不做处理，也不计入统计
+                for doc_id in range(len(self.documents)):
+                    if doc_id not in self.deleted_ids:
+                        deduplicator.check(self.documents[doc_id], doc_id)
+                deduplicator.stats = {key: 0 for key in deduplicator.stats}
+            self.deduplicator = deduplicator
+    
+    def _new_index(self):
+        """创建空的正式索引，以及（需要训练时）用于暂存向量的精确索引
+        
+        需要训练的索引在向量数量不足时，先将向量暂存在精确索引中，达到训练数量后自动训练并迁移
+        """
+        index = with_ids(build_index(self.index_type, self.embedding_dim, **self.index_params))  # 使用L2距离的FAISS索引
+        staging_index = None if index.is_trained else faiss.IndexIDMap2(faiss.IndexFlatL2(self.embedding_dim))
+        return index, staging_index
+    
+    def _get_embedding(self, text: str) -> np.ndarray:
+        """获取单个文本的嵌入向量
         
         Args:
             text: 输入文本
@@ -30,98 +103,655 @@ class VectorStore:
         Returns:
             文本的嵌入向量
         """
-        # 注意：这只是一个简单的模拟，实际应用中应该使用如下方式获取嵌入：
-        # 1. 使用预训练模型如BERT、Sentence-BERT等
-        # 2. 使用大模型API提供的嵌入功能
+        return self.embed_batch([text])[0]
+    
+    @traced("vector_store.embed")
+    def embed_batch(self, texts: List[str], batch_size: Optional[int] = None) -> np.ndarray:
+        """批量获取文本的嵌入向量
+        
+        Args:
+            texts: 输入文本列表
+            batch_size: 每批处理的文本数量，默认使用初始化时的设置
+            
+        Returns:
+            形状为(n, embedding_dim)的float32嵌入矩阵
+        """
+        batch_size = batch_size or self.batch_size
+        embeddings = np.empty((len(texts), self.embedding_dim), dtype=np.float32)
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            embeddings[start:start + len(batch)] = self.embedder.embed(batch)
+        return embeddings
+    
+    @traced("vector_store.add_documents")
+    def add_documents(self, documents: List[Dict[str, Any]]) -> List[int]:
+        """添加文档到向量存储
+        
+        Args:
+            documents: 文档列表，每个文档是一个字典，包含内容和元数据
+            
+        Returns:
+            新文档的ID列表（设置了去重器时不包含被剔除的重复文档）
+        """
+        if not documents:
+            return []
+        
+        # 提取文档内容
+        texts = [doc["content"] for doc in documents]
         
-        # 这里使用一个简单的哈希函数来模拟嵌入
-        import hashlib
+        # 批量获取嵌入向量，并在加锁前完成分词
+        new_embeddings = self.embed_batch(texts)
+        token_lists = [tokenize(text) for text in texts] if self.lexical_index is not None else None
         
-        # 创建一个固定大小的向量
-        embedding = np.zeros(self.embedding_dim, dtype=np.float32)
+        with self._lock:
+            # 剔除重复的文本块，重复块的来源合并到已保留的文本块中
+            # （去重需要和分配文档ID在同一次加锁中完成，因此重复块也会先被嵌入，有嵌入缓存时代价很小）
+            if self.deduplicator is not None:
+                documents = list(documents)
+                keep = self._deduplicate(documents)
+                documents = [documents[i] for i in keep]
+                new_embeddings = new_embeddings[keep]
+                if token_lists is not None:
+                    token_lists = [token_lists[i] for i in keep]
+                if not documents:
+                    return []
+            
+            # 分配连续递增的文档ID
+            start = len(self.documents)
+            ids = np.arange(start, start + len(documents), dtype=np.int64)
+            
+            # 添加到FAISS索引
+            self._add_to_index(new_embeddings, ids)
+            
+            # 保存文档
+            self.documents.extend(documents)
+            if self.lexical_index is not None:
+                self.lexical_index.add(ids.tolist(), token_lists)
+            if self._source_ids is not None:
+                for doc_id, doc in zip(ids.tolist(), documents):
+                    for source in self._sources_of(doc):
+                        self._source_ids.setdefault(source, []).append(doc_id)
+            self._version += 1
         
-        # 使用文本的哈希值填充向量
-        hash_object = hashlib.md5(text.encode())
-        hash_bytes = hash_object.digest()
+        return ids.tolist()
+    
+    def _deduplicate(self, documents: List[Dict[str, Any]]) -> List[int]:
+        """剔除与已有文档或同批文档重复的文本块（需持有锁）
         
-        # 将哈希值转换为浮点数并填充向量
-        for i in range(min(16, self.embedding_dim)):
-            embedding[i] = float(hash_bytes[i]) / 255.0
+        重复块的来源合并到规范块中：同批的规范块在原位置替换为合并后的副本，
+        已有的规范块通过_replace_document更新，来源映射和磁盘上的元数据随之更新
         
-        # 填充剩余位置（如果有）
-        if self.embedding_dim > 16:
-            for i in range(16, self.embedding_dim):
-                embedding[i] = np.sin(i * embedding[i % 16])
+        Args:
+            documents: 待添加的文档列表，合并后的规范块会替换列表中的对应元素
+            
+        Returns:
+            需要保留的文档在列表中的下标
+        """
+        start = len(self.documents)
+        keep = []
+        for i, doc in enumerate(documents):
+            canonical_id = self.deduplicator.check(doc, start + len(keep))
+            if canonical_id is None:
+                keep.append(i)
+            elif canonical_id >= start:
+                position = keep[canonical_id - start]
+                documents[position] = self.deduplicator.merge_sources(documents[position], doc)
+            else:
+                self._replace_document(canonical_id, self.deduplicator.merge_sources(self.documents[canonical_id], doc))
+        return keep
+    
+    def add_documents_stream(self, documents: Iterable[Dict[str, Any]], batch_size: Optional[int] = None) -> List[int]:
+        """分批添加来自迭代器的文档（如DocumentProcessor.process_document_stream的输出）
         
-        # 归一化
-        norm = np.linalg.norm(embedding)
-        if norm > 0:
-            embedding = embedding / norm
+        每凑满一批就嵌入并添加，内存中只保留一批尚未添加的文档
         
-        return embedding
+        Args:
+            documents: 文档迭代器
+            batch_size: 每批的文档数量，默认使用嵌入批大小
+            
+        Returns:
+            新文档的ID列表
+        """
+        batch_size = batch_size or self.batch_size
+        ids = []
+        batch = []
+        for doc in documents:
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                ids.extend(self.add_documents(batch))
+                batch = []
+        ids.extend(self.add_documents(batch))
+        return ids
     
-    def add_documents(self, documents: List[Dict[str, Any]]):
-        """添加文档到向量存储
+    def _add_to_index(self, embeddings: np.ndarray, ids: np.ndarray):
+        """将向量添加到FAISS索引，必要时自动训练索引
         
         Args:
-            documents: 文档列表，每个文档是一个字典，包含内容和元数据
+            embeddings: 形状为(n, embedding_dim)的float32嵌入矩阵
+            ids: 对应的文档ID
         """
-        if not documents:
+        if self.index.is_trained:
+            self.index.add_with_ids(embeddings, ids)
             return
         
-        # 提取文档内容
-        texts = [doc["content"] for doc in documents]
+        self.staging_index.add_with_ids(embeddings, ids)
+        if self.staging_index.ntotal >= training_size(self.index_type, **self.index_params):
+            self.train_index()
+    
+    def train_index(self):
+        """使用暂存的向量训练索引，并将暂存向量迁移到正式索引中"""
+        if self.index.is_trained:
+            return
         
-        # 获取嵌入向量
-        new_embeddings = np.array(dtype=np.float32)
+        ids = faiss.vector_to_array(self.staging_index.id_map).astype(np.int64)
+        staged = self.staging_index.reconstruct_batch(ids)
+        self.index.train(staged)
+        prepare_ivf_ids(self.index)
+        self.index.add_with_ids(staged, ids)
+        self.staging_index = None
+    
+    @property
+    def search_index(self) -> faiss.Index:
+        """当前用于检索的索引（正式索引未训练时为暂存的精确索引）"""
+        return self.index if self.index.is_trained else self.staging_index
+    
+    def get_embeddings(self, indices: Optional[List[int]] = None) -> np.ndarray:
+        """获取文档的嵌入向量
         
-        # 添加到FAISS索引
-        self.index.add(new_embeddings)
+        已保存到磁盘的文档直接读取磁盘上的原始向量，其余文档从索引中重建
+        （注意：IVF-PQ索引只保存压缩编码，重建出的向量是近似值）；已删除的文档返回零向量
         
-        # 保存文档
-        self.documents.extend(documents)
+        Args:
+            indices: 文档ID列表，默认返回全部向量
+            
+        Returns:
+            形状为(n, embedding_dim)的float32嵌入矩阵
+        """
+        with self._lock:
+            if indices is None:
+                indices = np.arange(len(self.documents), dtype=np.int64)
+            indices = np.asarray(indices, dtype=np.int64)
+            
+            embeddings = np.zeros((len(indices), self.embedding_dim), dtype=np.float32)
+            persisted = len(self.storage) if self.storage is not None else 0
+            on_disk = indices < persisted
+            if on_disk.any():
+                embeddings[on_disk] = self.storage.vectors()[indices[on_disk]]
+            
+            in_index = ~on_disk
+            if self.deleted_ids:
+                in_index &= ~np.isin(indices, np.fromiter(self.deleted_ids, dtype=np.int64))
+            if in_index.any():
+                embeddings[in_index] = self.search_index.reconstruct_batch(indices[in_index])
+        return embeddings
+    
+    def set_search_params(self, nprobe: Optional[int] = None, ef_search: Optional[int] = None):
+        """设置默认的查询参数
         
-        # 更新嵌入向量存储
-        if self.embeddings is None:
-            self.embeddings = new_embeddings
-        else:
-            self.embeddings = np.vstack([self.embeddings, new_embeddings])
+        Args:
+            nprobe: IVF索引查询时探测的聚类数量，越大召回越高、速度越慢
+            ef_search: HNSW索引查询时的搜索宽度，越大召回越高、速度越慢
+        """
+        with self._lock:
+            if nprobe is not None:
+                self.index_params["nprobe"] = nprobe
+            if ef_search is not None:
+                self.index_params["ef_search"] = ef_search
+            set_search_params(self.index, nprobe=nprobe, ef_search=ef_search)
+    
+    @property
+    def cache_token(self) -> tuple:
+        """当前检索结果的版本标识，增删文档或修改查询参数后改变，用作检索缓存键的一部分"""
+        return self._instance_id, self._version, self.index_params.get("nprobe"), self.index_params.get("ef_search")
+    
+    def index_info(self) -> Dict[str, Any]:
+        """获取索引的基本信息"""
+        info = describe_index(self.index)
+        info["index_type"] = self.index_type
+        info["staged"] = self.staging_index.ntotal if self.staging_index is not None else 0
+        return info
     
-    def similarity_search(self, query: str, k: int = 3) -> List[Dict[str, Any]]:
+    def similarity_search(self, query: str, k: int = 3, nprobe: Optional[int] = None,
+                          ef_search: Optional[int] = None) -> List[Dict[str, Any]]:
         """基于相似度搜索文档
         
         Args:
             query: 查询文本
             k: 返回的最相似文档数量
+            nprobe: 本次查询使用的IVF探测聚类数量，默认使用索引设置
+            ef_search: 本次查询使用的HNSW搜索宽度，默认使用索引设置
             
         Returns:
             最相似的k个文档
         """
-        if not self.documents:
+        return self.similarity_search_batch([query], k=k, nprobe=nprobe, ef_search=ef_search)[0]
+    
+    @traced("vector_store.similarity_search")
+    def similarity_search_batch(self, queries: List[str], k: int = 3, nprobe: Optional[int] = None,
+                                ef_search: Optional[int] = None) -> List[List[Dict[str, Any]]]:
+        """批量基于相似度搜索文档，所有查询一起嵌入并通过一次索引查询完成
+        
+        Args:
+            queries: 查询文本列表
+            k: 每个查询返回的最相似文档数量
+            nprobe: 本次查询使用的IVF探测聚类数量，默认使用索引设置
+            ef_search: 本次查询使用的HNSW搜索宽度，默认使用索引设置
+            
+        Returns:
+            与queries一一对应的结果列表，每项为该查询最相似的k个文档
+        """
+        if len(self) == 0 or not queries:
+            return [[] for _ in queries]
+        
+        # 批量获取查询的嵌入向量
+        query_embeddings = self.embed_batch(queries)
+        return self.similarity_search_by_vectors(query_embeddings, k=k, nprobe=nprobe, ef_search=ef_search)
+    
+    @traced("vector_store.index_search")
+    def similarity_search_by_vectors(self, query_embeddings: np.ndarray, k: int = 3, nprobe: Optional[int] = None,
+                                     ef_search: Optional[int] = None) -> List[List[Dict[str, Any]]]:
+        """用已嵌入的查询向量搜索文档（多个存储共用同一嵌入器时，查询只需嵌入一次）
+        
+        Args:
+            query_embeddings: 形状为(n, embedding_dim)的float32查询向量
+            k: 每个查询返回的最相似文档数量
+            nprobe: 本次查询使用的IVF探测聚类数量，默认使用索引设置
+            ef_search: 本次查询使用的HNSW搜索宽度，默认使用索引设置
+            
+        Returns:
+            与查询向量一一对应的结果列表，每项为该查询最相似的k个文档
+        """
+        if len(query_embeddings) == 0:
             return []
+        query_embeddings = np.ascontiguousarray(query_embeddings, dtype=np.float32)
+        
+        # FAISS索引在写入（添加、删除、训练）时不能同时查询，查询和读取文档都在锁内进行
+        with self._lock:
+            live_count = len(self)
+            if live_count == 0:
+                return [[] for _ in range(len(query_embeddings))]
+            
+            # 搜索最相似的文档
+            k = min(k, live_count)  # 确保k不超过文档数量
+            index = self.search_index
+            params = make_search_params(index, nprobe=nprobe, ef_search=ef_search, sel=self._get_mask_selector())
+            distances, indices = index.search(query_embeddings, k, params=params)
+            
+            # 返回每个查询最相似的文档
+            scores = 1.0 / (1.0 + distances)  # 转换距离为相似度分数
+            all_results = []
+            for row_indices, row_scores in zip(indices.tolist(), scores.tolist()):
+                results = []
+                for idx, score in zip(row_indices, row_scores):
+                    if 0 <= idx < len(self.documents) and idx not in self.deleted_ids:
+                        doc = self.documents[idx].copy()
+                        doc["id"] = idx
+                        doc["score"] = score
+                        results.append(doc)
+                all_results.append(results)
+        
+        return all_results
+    
+    @traced("vector_store.search")
+    def search(self, query: str, k: int = 3, mode: str = "vector", lambda_mult: Optional[float] = None,
+               fetch_k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """按指定方式检索文档
         
-        # 获取查询的嵌入向量
-        query_embedding = self._get_embedding(query)
-        query_embedding = np.array([query_embedding], dtype=np.float32)
+        Args:
+            query: 查询文本
+            k: 返回的文档数量
+            mode: 检索方式，'vector'向量检索、'lexical'关键词检索、'hybrid'混合检索
+            lambda_mult: 设置后对检索结果做MMR多样性重排（见mmr_search），为None时不重排
+            fetch_k: MMR重排的候选数量
+            
+        Returns:
+            最相关的k个文档
+            
+        Raises:
+            ValueError: 如果检索方式不支持
+        """
+        if lambda_mult is not None:
+            return self.mmr_search(query, k=k, fetch_k=fetch_k, lambda_mult=lambda_mult, mode=mode)
+        if mode == "vector":
+            return self.similarity_search(query, k=k)
+        if mode == "lexical":
+            return self.lexical_search(query, k=k)
+        if mode == "hybrid":
+            return self.hybrid_search(query, k=k)
+        raise ValueError(f"不支持的检索方式: {mode}")
+    
+    def mmr_search(self, query: str, k: int = 3, fetch_k: Optional[int] = None, lambda_mult: float = 0.5,
+                   mode: str = "vector") -> List[Dict[str, Any]]:
+        """检索后用最大边际相关性（MMR）重排，减少内容几乎相同的相邻文本块
         
-        # 搜索最相似的文档
-        k = min(k, len(self.documents))  # 确保k不超过文档数量
-        distances, indices = self.index.search(query_embedding, k)
+        先按mode取回fetch_k个候选，再取出候选的向量，从中选出与查询相关且彼此差异较大的k个
         
-        # 返回最相似的文档
- 
-        for i in range(len(indices[0])):
-            idx = indices[0][i]
-            if idx < len(self.documents):
+        Args:
+            query: 查询文本
+            k: 返回的文档数量
+            fetch_k: 候选数量，默认为max(4k, 20)
+            lambda_mult: 相关性与多样性的权衡，1表示只看相关性，0表示只看多样性
+            mode: 取回候选的检索方式
+            
+        Returns:
+            按MMR选择顺序排列的k个文档，score仍为原检索方式的分数
+        """
+        fetch_k = max(fetch_k or max(k * 4, 20), k)
+        query_embedding = self.embed_batch([query])
+        if mode == "vector":
+            candidates = self.similarity_search_by_vectors(query_embedding, k=fetch_k)[0]
+        else:
+            candidates = self.search(query, k=fetch_k, mode=mode)
+        if len(candidates) <= k:
+            return candidates
+        
+        embeddings = self.get_embeddings([doc["id"] for doc in candidates])
+        order = maximal_marginal_relevance(query_embedding[0], embeddings, k, lambda_mult=lambda_mult)
+        return [candidates[i] for i in order]
+    
+    @traced("vector_store.lexical_search")
+    def lexical_search(self, query: str, k: int = 3) -> List[Dict[str, Any]]:
+        """基于BM25的关键词检索，适合编号、条款号、人名等精确词查询
+        
+        Args:
+            query: 查询文本
+            k: 返回的文档数量
+            
+        Returns:
+            BM25分数最高的k个文档
+            
+        Raises:
+            ValueError: 如果未启用BM25索引
+        """
+        if self.lexical_index is None:
+            raise ValueError("未启用BM25索引，请在创建向量存储时设置lexical=True")
+        
+        with self._lock:
+            ids, scores = self.lexical_index.search(query, k)
+            results = []
+            for idx, score in zip(ids.tolist(), scores.tolist()):
                 doc = self.documents[idx].copy()
-                doc["score"] = float(1.0 / (1.0 + distances[0][i]))  # 转换距离为相似度分数
+                doc["id"] = idx
+                doc["score"] = score
                 results.append(doc)
+        return results
+    
+    def hybrid_search(self, query: str, k: int = 3, candidates: Optional[int] = None, rrf_k: int = 60,
+                      nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> List[Dict[str, Any]]:
+        """混合检索：分别进行向量检索和BM25检索，用倒数排名融合（RRF）合并两个结果列表
+        
+        未启用BM25索引时退化为向量检索
+        
+        Args:
+            query: 查询文本
+            k: 返回的文档数量
+            candidates: 每种检索取回的候选数量，默认为max(4k, 20)
+            rrf_k: RRF的平滑常数，文档得分为各列表中1/(rrf_k + 排名)之和
+            nprobe: 本次查询使用的IVF探测聚类数量，默认使用索引设置
+            ef_search: 本次查询使用的HNSW搜索宽度，默认使用索引设置
+            
+        Returns:
+            融合得分最高的k个文档，包含各自在向量和BM25结果中的排名（未出现时为None）
+        """
+        if self.lexical_index is None:
+            return self.similarity_search(query, k=k, nprobe=nprobe, ef_search=ef_search)
+        
+        candidates = candidates or max(k * 4, 20)
+        ranked_lists = {
+            "vector_rank": [doc["id"] for doc in self.similarity_search(query, k=candidates, nprobe=nprobe,
+                                                                        ef_search=ef_search)],
+            "lexical_rank": [doc["id"] for doc in self.lexical_search(query, k=candidates)]
+        }
         
+        fused = {}
+        for ids in ranked_lists.values():
+            for rank, doc_id in enumerate(ids, start=1):
+                fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (rrf_k + rank)
+        top = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:k]
+        
+        results = []
+        with self._lock:
+            for doc_id, score in top:
+                if doc_id in self.deleted_ids:
+                    continue
+                doc = self.documents[doc_id].copy()
+                doc["id"] = doc_id
+                doc["score"] = score
+                for key, ids in ranked_lists.items():
+                    doc[key] = ids.index(doc_id) + 1 if doc_id in ids else None
+                results.append(doc)
         return results
     
+    def __len__(self) -> int:
+        """未删除的文档数量"""
+        return len(self.documents) - len(self.deleted_ids)
+    
+    def _get_mask_selector(self) -> Optional[faiss.IDSelector]:
+        """获取排除已删除向量的查询过滤器，没有需要过滤的向量时返回None"""
+        if not self._masked_ids:
+            return None
+        if self._mask_selector is None:
+            masked = np.fromiter(self._masked_ids, dtype=np.int64)
+            batch = faiss.IDSelectorBatch(masked)
+            selector = faiss.IDSelectorNot(batch)
+            selector.referenced_objects = [batch]  # IDSelectorNot不持有子过滤器的所有权，需要保持引用
+            self._mask_selector = selector
+        return self._mask_selector
+    
+    @staticmethod
+    def _sources_of(document: Dict[str, Any]) -> List[str]:
+        """获取文档的全部来源（包括去重时合并进来的来源）"""
+        metadata = document.get("metadata", {})
+        return metadata.get("sources") or [metadata.get("source", "")]
+    
+    def _get_source_ids(self) -> Dict[str, List[int]]:
+        """获取来源到文档ID的映射，首次调用时扫描全部未删除的文档"""
+        if self._source_ids is None:
+            source_ids = {}
+            for doc_id in range(len(self.documents)):
+                if doc_id not in self.deleted_ids:
+                    for source in self._sources_of(self.documents[doc_id]):
+                        source_ids.setdefault(source, []).append(doc_id)
+            self._source_ids = source_ids
+        return self._source_ids
+    
+    def sources(self) -> List[str]:
+        """获取向量存储中的全部文档来源"""
+        with self._lock:
+            return [source for source, ids in self._get_source_ids().items() if ids]
+    
+    def remove_documents(self, ids: List[int]) -> int:
+        """按ID删除文档，只影响对应的向量
+        
+        Args:
+            ids: 要删除的文档ID列表
+            
+        Returns:
+            实际删除的文档数量
+        """
+        with self._lock:
+            ids = sorted({int(doc_id) for doc_id in ids
+                          if 0 <= doc_id < len(self.documents) and doc_id not in self.deleted_ids})
+            if not ids:
+                return 0
+            
+            id_array = np.asarray(ids, dtype=np.int64)
+            self._remove_from_index(id_array)
+            self.deleted_ids.update(ids)
+            if self.lexical_index is not None:
+                self.lexical_index.remove(ids)
+            
+            if self._source_ids is not None:
+                removed = set(ids)
+                for source in list(self._source_ids):
+                    remaining = [doc_id for doc_id in self._source_ids[source] if doc_id not in removed]
+                    if remaining:
+                        self._source_ids[source] = remaining
+                    else:
+                        del self._source_ids[source]
+            
+            if self.deduplicator is not None:
+                self.deduplicator.forget(ids)
+            
+            # 释放已删除文档占用的内存
+            for doc_id in ids:
+                if isinstance(self.documents, LazyDocumentList):
+                    self.documents.release(doc_id)
+                else:
+                    self.documents[doc_id] = None
+            self._version += 1
+        
+        self._maybe_compact()
+        return len(ids)
+    
+    def _remove_from_index(self, ids: np.ndarray):
+        """从索引中移除向量，不支持物理删除的索引改为在查询时过滤"""
+        index = self.search_index
+        if supports_remove(index):
+            index.remove_ids(ids)
+        else:
+            self._masked_ids.update(ids.tolist())
+            self._mask_selector = None
+    
+    def remove_source(self, source: str) -> int:
+        """删除某个来源（文件）的全部文档
+        
+        去重时合并了其他来源的文档不会被删除，只从其元数据中移除该来源
+        
+        Args:
+            source: 文档来源，即元数据中的source字段
+            
+        Returns:
+            删除的文档数量
+        """
+        with self._lock:
+            return self.remove_documents(self._detach_source(list(self._get_source_ids().get(source, [])), source))
+    
+    def _detach_source(self, ids: List[int], source: str) -> List[int]:
+        """从文档中移除一个来源，返回不再有任何来源、需要删除的文档ID"""
+        to_delete = []
+        for doc_id in ids:
+            doc = self.documents[doc_id]
+            others = [other for other in self._sources_of(doc) if other != source]
+            if not others:
+                to_delete.append(doc_id)
+                continue
+            
+            # 文档仍被其他来源引用，只移除该来源
+            metadata = {**doc["metadata"], "sources": others}
+            if metadata.get("source") == source:
+                metadata["source"] = others[0]
+            self._replace_document(doc_id, {**doc, "metadata": metadata})
+        return to_delete
+    
+    def _replace_document(self, doc_id: int, document: Dict[str, Any]):
+        """替换文档的元数据并同步来源映射（需持有锁），已保存的文档在下次保存时写回磁盘"""
+        old_sources = self._sources_of(self.documents[doc_id])
+        self.documents[doc_id] = document
+        if self._source_ids is None:
+            return
+        new_sources = self._sources_of(document)
+        for source in new_sources:
+            if source not in old_sources:
+                self._source_ids.setdefault(source, []).append(doc_id)
+        for source in old_sources:
+            if source not in new_sources and doc_id in self._source_ids.get(source, ()):
+                self._source_ids[source].remove(doc_id)
+                if not self._source_ids[source]:
+                    del self._source_ids[source]
+    
+    def upsert_document(self, chunks: List[Dict[str, Any]]) -> Dict[str, int]:
+        """用新的文本块替换对应来源的已有文档
+        
+        内容和元数据都未变化的文本块保持原ID不变、不重新嵌入，只删除过期的文本块并添加新的文本块
+        
+        Args:
+            chunks: 同一（或多个）来源的完整文本块列表
+            
+        Returns:
+            包含added、removed、unchanged数量的统计
+        """
+        def fingerprint(doc):
+            # 去重时合并的来源信息不参与比较
+            metadata = {key: value for key, value in doc.get("metadata", {}).items()
+                        if key not in ("sources", "duplicate_count")}
+            return json.dumps({**doc, "metadata": metadata}, sort_keys=True, ensure_ascii=False, default=str)
+        
+        with self._lock:
+            source_ids = self._get_source_ids()
+            existing = {}
+            stale_by_source = {}
+            for source in {chunk.get("metadata", {}).get("source", "") for chunk in chunks}:
+                for doc_id in source_ids.get(source, []):
+                    existing.setdefault(fingerprint(self.documents[doc_id]), []).append((doc_id, source))
+            
+            new_chunks = []
+            unchanged = 0
+            for chunk in chunks:
+                matched = existing.get(fingerprint(chunk))
+                if matched:
+                    matched.pop()
+                    unchanged += 1
+                else:
+                    new_chunks.append(chunk)
+            for matches in existing.values():
+                for doc_id, source in matches:
+                    stale_by_source.setdefault(source, []).append(doc_id)
+            
+            removed = 0
+            for source, stale_ids in stale_by_source.items():
+                removed += self.remove_documents(self._detach_source(stale_ids, source))
+            added = self.add_documents(new_chunks)
+        
+        return {"added": len(added), "removed": removed, "unchanged": unchanged}
+    
+    def _maybe_compact(self):
+        """已删除但未物理移除的向量过多时，在后台线程中重建索引"""
+        ntotal = self.search_index.ntotal
+        if not ntotal or len(self._masked_ids) / ntotal < self.compaction_threshold:
+            return
+        if self._compaction_thread is not None and self._compaction_thread.is_alive():
+            return
+        self._compaction_thread = threading.Thread(target=self.compact, name="vector-store-compaction", daemon=True)
+        self._compaction_thread.start()
+    
+    def compact(self) -> bool:
+        """重建索引，物理移除已删除的向量（文档ID保持不变）
+        
+        重建过程不持有锁，期间若有文档增删，则放弃本次结果
+        
+        Returns:
+            是否完成了重建
+        """
+        with self._lock:
+            if not self._masked_ids:
+                return False
+            version = self._version
+            live_ids = np.asarray([doc_id for doc_id in range(len(self.documents)) if doc_id not in self.deleted_ids],
+                                  dtype=np.int64)
+            vectors = self.get_embeddings(live_ids)
+        
+        index, staging_index = self._new_index()
+        if staging_index is not None and len(live_ids) >= training_size(self.index_type, **self.index_params):
+            index.train(vectors)
+            prepare_ivf_ids(index)
+            staging_index = None
+        (index if staging_index is None else staging_index).add_with_ids(vectors, live_ids)
+        
+        with self._lock:
+            if version != self._version:
+                return False
+            self.index, self.staging_index = index, staging_index
+            self._masked_ids = set()
+            self._mask_selector = None
+        return True
+    
     def save(self, directory: str, name: str = None):
         """保存向量存储到磁盘
         
+        保存后文档改为按需从磁盘读取。再次保存到同一位置时只追加新增的文档、元数据修改和删除记录，
+        不会改写已有的数据文件（FAISS索引快照除外）
+        
         Args:
             directory: 保存目录
             name: 保存名称，默认使用当前时间戳
@@ -129,40 +759,168 @@ class VectorStore:
         if name is None:
             name = f"vector_store_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
         
-        os.makedirs(directory, exist_ok=True)
-        
-        # 保存FAISS索引
-        faiss.write_index(self.index, os.path.join(directory, f"{name}.index"))
-        
-        # 保存文档和嵌入向量
-        with open(os.path.join(directory, f"{name}.pkl"), "wb") as f:
-            pickle.dump({
-                "documents": self.documents,
-                "embeddings": self.embeddings,
-                "embedding_dim": self.embedding_dim
-            }, f)
+        with self._lock:
+            path = os.path.join(directory, name)
+            if self.storage is not None and os.path.abspath(self.storage.path) == os.path.abspath(path):
+                storage = self.storage
+            else:
+                if os.path.exists(path):
+                    shutil.rmtree(path)
+                storage = DiskStorage(path, embedding_dim=self.embedding_dim)
+            
+            # 分批追加尚未写入该位置的文档和向量（已删除的文档写入空占位，保证ID与行号一致）
+            for start in range(len(storage), len(self.documents), self.batch_size):
+                end = min(start + self.batch_size, len(self.documents))
+                batch = [self.documents[i] or {"content": "", "metadata": {}} for i in range(start, end)]
+                storage.append(batch, self.get_embeddings(range(start, end)))
+            
+            # 写回已保存文档的元数据修改（去重合并或移除来源）
+            if storage is self.storage and isinstance(self.documents, LazyDocumentList) and self.documents.modified:
+                storage.update_documents({doc_id: doc for doc_id, doc in self.documents.modified.items()
+                                          if doc_id not in self.deleted_ids})
+            
+            # 追加新的删除记录
+            saved_deleted = set(storage.deleted_ids().tolist())
+            storage.append_deleted(sorted(self.deleted_ids - saved_deleted))
+            
+            storage.update_manifest(
+                embedder_id=self.embedder.embedder_id,
+                index_type=self.index_type,
+                index_params=self.index_params,
+                lexical=self.lexical_index is not None
+            )
+            
+            # 训练过的ANN索引构建代价较高，保存快照；flat索引加载时直接由向量重建
+            snapshot_state = {"index_rows": len(self.documents), "index_deleted": len(self.deleted_ids)}
+            if (self.index_type != "flat" and self.index.is_trained
+                    and any(storage.manifest.get(key) != value for key, value in snapshot_state.items())):
+                index_path = os.path.join(path, DiskStorage.INDEX)
+                faiss.write_index(self.index, index_path + ".tmp")
+                os.replace(index_path + ".tmp", index_path)
+                storage.update_manifest(**snapshot_state)
+            
+            # BM25索引重建需要重新分词，同样保存快照
+            lexical_state = {"lexical_rows": len(self.documents), "lexical_deleted": len(self.deleted_ids)}
+            if (self.lexical_index is not None
+                    and any(storage.manifest.get(key) != value for key, value in lexical_state.items())):
+                self.lexical_index.save(os.path.join(path, DiskStorage.LEXICAL))
+                storage.update_manifest(**lexical_state)
+            
+            # 文档已持久化，改为按需从磁盘读取
+            self.storage = storage
+            self.documents = LazyDocumentList(storage)
     
     @classmethod
-    def load(cls, directory: str, name: str) -> "VectorStore":
+    def load(cls, directory: str, name: str, embedder: Optional[BaseEmbedder] = None,
+             lexical: Optional[bool] = None) -> "VectorStore":
         """从磁盘加载向量存储
         
+        向量通过mmap读取，文档只在被检索命中时才从磁盘读取
+        
         Args:
             directory: 加载目录
             name: 加载名称
+            embedder: 嵌入器，需与保存时使用的嵌入器一致，默认使用基于哈希的模拟嵌入器
+            lexical: 是否启用BM25索引，默认与保存时一致
             
         Returns:
             加载的向量存储实例
         """
-        # 加载文档和嵌入向量
+        if os.path.exists(os.path.join(directory, f"{name}.pkl")):
+            return cls._load_pickle(directory, name, embedder, lexical=bool(lexical))
+        
+        storage = DiskStorage(os.path.join(directory, name))
+        manifest = storage.manifest
+        
+        # 创建实例
+        vector_store = cls(
+            embedding_dim=manifest["embedding_dim"],
+            embedder=embedder,
+            index_type=manifest.get("index_type", "flat"),
+            index_params=manifest.get("index_params"),
+            lexical=manifest.get("lexical", False) if lexical is None else lexical
+        )
+        vector_store._check_embedder(manifest.get("embedder_id"))
+        vector_store.storage = storage
+        vector_store.documents = LazyDocumentList(storage)
+        vector_store.deleted_ids = set(storage.deleted_ids().tolist())
+        
+        # 加载FAISS索引：优先使用索引快照，再补上快照之后追加的向量
+        first_row = 0
+        index_path = os.path.join(storage.path, DiskStorage.INDEX)
+        if vector_store.index_type != "flat" and os.path.exists(index_path) and "index_rows" in manifest:
+            vector_store.index = faiss.read_index(index_path)
+            vector_store.staging_index = None
+            prepare_ivf_ids(vector_store.index)
+            first_row = manifest["index_rows"]
+            # 快照之后删除的文档需要从索引中移除
+            stale_ids = [doc_id for doc_id in vector_store.deleted_ids if doc_id < first_row]
+            if stale_ids:
+                vector_store._remove_from_index(np.asarray(stale_ids, dtype=np.int64))
+        
+        vectors = storage.vectors()
+        for start in range(first_row, len(vectors), vector_store.batch_size):
+            ids = np.arange(start, min(start + vector_store.batch_size, len(vectors)), dtype=np.int64)
+            if vector_store.deleted_ids:
+                ids = ids[~np.isin(ids, np.fromiter(vector_store.deleted_ids, dtype=np.int64))]
+            if len(ids):
+                vector_store._add_to_index(np.ascontiguousarray(vectors[ids]), ids)
+        
+        # 加载BM25索引：优先使用快照，再补上快照之后追加的文档
+        if vector_store.lexical_index is not None:
+            first_row = 0
+            lexical_path = os.path.join(storage.path, DiskStorage.LEXICAL)
+            if os.path.exists(lexical_path) and "lexical_rows" in manifest:
+                vector_store.lexical_index = BM25Index.load(lexical_path)
+                vector_store.lexical_index.remove(sorted(vector_store.deleted_ids))
+                first_row = manifest["lexical_rows"]
+            vector_store._index_lexical(range(first_row, len(storage)))
+        
+        # 索引快照中被过滤的已删除向量过多时，在后台重建索引
+        vector_store._maybe_compact()
+        return vector_store
+    
+    def _index_lexical(self, rows: Iterable[int]):
+        """为指定行中未删除的文档建立BM25索引"""
+        ids = [doc_id for doc_id in rows if doc_id not in self.deleted_ids]
+        for start in range(0, len(ids), self.batch_size):
+            batch = ids[start:start + self.batch_size]
+            self.lexical_index.add_texts(batch, [self.documents[doc_id]["content"] for doc_id in batch])
+    
+    @classmethod
+    def _load_pickle(cls, directory: str, name: str, embedder: Optional[BaseEmbedder] = None,
+                     lexical: bool = False) -> "VectorStore":
+        """加载旧版本的pickle格式向量存储"""
+        # 加载文档和元数据（旧版本文件中的embeddings字段不再使用）
         with open(os.path.join(directory, f"{name}.pkl"), "rb") as f:
             data = pickle.load(f)
         
         # 创建实例
-        vector_store = cls(embedding_dim=data["embedding_dim"])
+        vector_store = cls(
+            embedding_dim=data["embedding_dim"],
+            embedder=embedder,
+            index_type=data.get("index_type", "flat"),
+            index_params=data.get("index_params"),
+            lexical=lexical
+        )
+        vector_store._check_embedder(data.get("embedder_id"))
         vector_store.documents = data["documents"]
-        vector_store.embeddings = data["embeddings"]
         
-        # 加载FAISS索引
-        vector_store.index = faiss.read_index(os.path.join(directory, f"{name}.index"))
+        # 旧版本索引使用顺序编号，从中取出向量后按文档ID重新建立索引
+        old_index = faiss.read_index(os.path.join(directory, f"{name}.index"))
+        staging_path = os.path.join(directory, f"{name}.staging.index")
+        if os.path.exists(staging_path):
+            old_index = faiss.read_index(staging_path)
+        if isinstance(old_index, faiss.IndexIVF):
+            old_index.make_direct_map()
+        vectors = old_index.reconstruct_n(0, old_index.ntotal)
+        vector_store._add_to_index(vectors, np.arange(len(vectors), dtype=np.int64))
+        if vector_store.lexical_index is not None:
+            vector_store._index_lexical(range(len(vector_store.documents)))
         
-        return vector_store
\ No newline at end of file
+        return vector_store
+    
+    def _check_embedder(self, saved_embedder_id: Optional[str]):
+        """检查当前嵌入器是否与保存时一致"""
+        if saved_embedder_id and saved_embedder_id != self.embedder.embedder_id:
+            print(f"警告：当前嵌入器 {self.embedder.embedder_id} 与保存时的嵌入器 {saved_embedder_id} 不一致")
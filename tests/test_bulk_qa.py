@@ -0,0 +1,52 @@
+import asyncio
+import json
+
+from src.pipeline.bulk_qa import BulkQAPipeline, load_completed, read_questions
+
+
+class FakeStore:
+    def similarity_search_batch(self, questions, k=3):
+        return [[{"id": 0, "content": question, "metadata": {"source": "a.txt"}, "score": 1.0}]
+                for question in questions]
+
+
+class FakeModel:
+    def __init__(self, failures):
+        self.failures = failures  # 问题 -> 出错方式
+
+    def pack_context(self, docs):
+        if any(self.failures.get(doc["content"]) == "pack" for doc in docs):
+            raise RuntimeError("打包失败")
+        return {"docs": docs, "packed_tokens": 1, "discarded_tokens": 0}
+
+    async def agenerate(self, question, docs):
+        if self.failures.get(question) == "generate":
+            raise RuntimeError("调用失败")
+        return "答案：" + question
+
+    def is_error_response(self, text):
+        return False
+
+
+def run(tmp_path, failures):
+    questions = tmp_path / "questions.jsonl"
+    questions.write_text("".join(json.dumps({"id": i, "question": f"问题{i}"}) + "\n" for i in range(5)),
+                         encoding="utf-8")
+    output = str(tmp_path / "answers.jsonl")
+    pipeline = BulkQAPipeline(FakeStore(), FakeModel(failures), concurrency=2, batch_size=2)
+    stats = asyncio.run(pipeline.run(read_questions(str(questions)), output, load_completed(output)))
+    with open(output, encoding="utf-8") as f:
+        return stats, [json.loads(line) for line in f]
+
+
+def test_failed_records_are_written_and_replaced_on_retry(tmp_path):
+    stats, results = run(tmp_path, {"问题1": "pack", "问题3": "generate"})
+    assert stats["processed"] == 5 and stats["errors"] == 2
+    errors = {result["id"]: result["error"] for result in results if result["error"]}
+    assert errors == {"1": "RuntimeError: 打包失败", "3": "RuntimeError: 调用失败"}
+
+    # 续跑只重新处理出错的问题，新结果替换原有的错误结果行
+    stats, results = run(tmp_path, {})
+    assert stats["processed"] == 2 and stats["skipped"] == 3 and stats["errors"] == 0
+    assert sorted(result["id"] for result in results) == ["0", "1", "2", "3", "4"]
+    assert all(result["answer"] == "答案：问题" + result["id"] for result in results)
@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from src.document_processor.splitter import count_tokens, truncate_tokens
+from src.models.base_model import BaseModelAdapter
+from src.models.context_packer import ContextPacker, PackedDocs
+from src.pipeline.bulk_qa import BulkQAPipeline
+
+TEXT = "".join(f"第{i}句讲的是向量检索和上下文组装。" for i in range(40))
+
+
+def chunk(doc_id, start, end, source="a.txt"):
+    return {"id": doc_id, "content": TEXT[start:end], "score": 1.0 / (doc_id + 1),
+            "metadata": {"source": source, "start_index": start, "end_index": end}}
+
+
+class EchoModel(BaseModelAdapter):
+    """把构建好的提示原样返回的模型适配器"""
+
+    def generate(self, prompt, context_docs=None):
+        return self._build_prompt_with_context(prompt, context_docs)
+
+    def generate_stream(self, prompt, context_docs=None):
+        yield self.generate(prompt, context_docs)
+
+
+@pytest.fixture
+def pack_calls(monkeypatch):
+    calls = []
+    pack = ContextPacker.pack
+
+    def counting_pack(self, docs):
+        calls.append(docs)
+        return pack(self, docs)
+
+    monkeypatch.setattr(ContextPacker, "pack", counting_pack)
+    return calls
+
+
+def test_merge_overlapping_chunks():
+    # 2被0和1的合并片段包含，5与0内容相同
+    docs = [chunk(0, 100, 200), chunk(1, 150, 260), chunk(2, 120, 180), chunk(3, 700, 760, source="b.txt"),
+            chunk(4, 300, 350), chunk(5, 100, 200, source="b.txt")]
+    result = ContextPacker(budget=10000).pack(docs)
+
+    assert isinstance(result["docs"], PackedDocs)
+    assert [doc["id"] for doc in result["docs"]] == [0, 3, 4]
+    merged = result["docs"][0]
+    assert merged["content"] == TEXT[100:260]
+    assert merged["metadata"]["merged_ids"] == [0, 1, 2]
+    assert (merged["metadata"]["start_index"], merged["metadata"]["end_index"]) == (100, 260)
+    assert result["redundant_tokens"] == result["input_tokens"] - sum(count_tokens(doc["content"])
+                                                                      for doc in result["docs"])
+    assert result["over_budget_tokens"] == 0
+
+
+def test_pack_within_budget():
+    docs = [chunk(0, 0, 100), chunk(1, 200, 400), chunk(2, 500, 520)]
+    budget = count_tokens(docs[0]["content"]) + 80
+    result = ContextPacker(budget=budget, min_fragment_tokens=64).pack(docs)
+
+    # 第二个文本块超出预算，截取剩余预算放入；之后的文本块不再放入
+    assert [doc["id"] for doc in result["docs"]] == [0, 1]
+    truncated = result["docs"][1]
+    assert truncated["metadata"]["truncated"] is True
+    assert truncated["content"] == truncate_tokens(docs[1]["content"], 80)
+    assert TEXT[truncated["metadata"]["start_index"]:truncated["metadata"]["end_index"]] == truncated["content"]
+    assert result["packed_tokens"] == budget
+    assert result["discarded_tokens"] == result["input_tokens"] - budget
+
+
+def test_prompt_packs_once(pack_calls):
+    model = EchoModel("echo", context_budget=200)
+    docs = [chunk(0, 0, 300), chunk(1, 250, 500), chunk(2, 600, 900)]
+
+    prompt = model.generate("什么是向量检索？", docs)
+    assert len(pack_calls) == 1
+
+    # 已组装好的上下文直接使用，提示与直接传入检索结果时相同
+    context = model.pack_context(docs)
+    assert len(pack_calls) == 2
+    assert model.generate("什么是向量检索？", context["docs"]) == prompt
+    assert asyncio.run(model.agenerate("什么是向量检索？", context["docs"])) == prompt
+    assert len(pack_calls) == 2
+
+
+def test_bulk_pipeline_packs_once_per_question(pack_calls):
+    class Store:
+        def similarity_search_batch(self, questions, k=3):
+            return [[chunk(0, 0, 300), chunk(1, 250, 500)] for _ in questions]
+
+    pipeline = BulkQAPipeline(Store(), EchoModel("echo", context_budget=100), batch_size=2)
+    records = ({"id": str(i), "question": f"问题{i}"} for i in range(3))
+    stats = asyncio.run(pipeline.run(records, "/dev/null"))
+
+    assert stats["processed"] == 3 and stats["errors"] == 0
+    assert len(pack_calls) == 3
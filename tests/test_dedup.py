@@ -0,0 +1,68 @@
+import copy
+
+from src.document_processor.dedup import ChunkDeduplicator
+from src.vector_store.vector_store import VectorStore
+
+TEXT = "向量检索把文本映射为向量，再按距离查找最相近的文本块，常用的索引有倒排和图索引。" * 3
+
+
+def chunk(content, source):
+    return {"content": content, "metadata": {"source": source}}
+
+
+def test_deduplicate_merges_sources():
+    deduplicator = ChunkDeduplicator(threshold=0.8)
+    first = deduplicator.deduplicate([chunk(TEXT, "a.txt"), chunk("另一段内容，与其他文本块都不相同。" * 3, "a.txt")])
+    second = deduplicator.deduplicate([
+        chunk("  " + TEXT.upper() + "\n", "b.txt"),  # 规范化后完全重复
+        chunk(TEXT[:-2] + "索引", "c.txt"),  # 近似重复
+        chunk(TEXT, "a.txt")  # 同一来源不重复记录
+    ])
+
+    assert len(first) == 2 and second == []
+    assert first[0]["metadata"] == {"source": "a.txt", "sources": ["a.txt", "b.txt", "c.txt"], "duplicate_count": 3}
+    assert "sources" not in first[1]["metadata"]
+    assert deduplicator.stats == {"input": 5, "exact_duplicates": 2, "near_duplicates": 1, "output": 2}
+
+
+def test_merge_sources_returns_copy():
+    canonical = {"content": TEXT, "metadata": {"source": "a.txt", "sources": ["a.txt", "b.txt"], "duplicate_count": 1}}
+    original = copy.deepcopy(canonical)
+    merged = ChunkDeduplicator.merge_sources(canonical, chunk(TEXT, "c.txt"))
+
+    assert canonical == original
+    assert merged["metadata"] == {"source": "a.txt", "sources": ["a.txt", "b.txt", "c.txt"], "duplicate_count": 2}
+
+
+def test_forget_allows_chunk_again():
+    deduplicator = ChunkDeduplicator()
+    assert deduplicator.check(chunk(TEXT, "a.txt"), 0) is None
+    assert deduplicator.check(chunk(TEXT, "b.txt"), 1) == 0
+    deduplicator.forget([0])
+    assert deduplicator.check(chunk(TEXT, "b.txt"), 2) is None
+
+
+def test_vector_store_merged_sources(tmp_path):
+    store = VectorStore(embedding_dim=32, deduplicator=ChunkDeduplicator())
+    assert store.add_documents([chunk(TEXT, "a.txt"), chunk(TEXT, "a.txt"), chunk("其他内容" * 10, "a.txt")]) == [0, 1]
+    store.save(str(tmp_path), "kb")
+
+    # 与已保存的文档重复：不添加新文档，来源合并到已有文档并在保存时写回磁盘
+    assert store.add_documents([chunk(TEXT, "b.txt")]) == []
+    assert store.documents[0]["metadata"]["sources"] == ["a.txt", "b.txt"]
+    assert sorted(store.sources()) == ["a.txt", "b.txt"]
+    store.save(str(tmp_path), "kb")
+
+    loaded = VectorStore.load(str(tmp_path), "kb", embedder=store.embedder)
+    loaded.set_deduplicator(ChunkDeduplicator())
+    assert loaded.documents[0]["metadata"] == {"source": "a.txt", "sources": ["a.txt", "b.txt"], "duplicate_count": 2}
+
+    # 删除a.txt后，合并的文档仍属于b.txt
+    assert loaded.remove_source("a.txt") == 1
+    assert loaded.sources() == ["b.txt"]
+    assert loaded.documents[0]["metadata"]["source"] == "b.txt"
+    assert loaded.remove_source("b.txt") == 1
+    assert len(loaded) == 0
+
+    # 规范块删除后，相同内容可以重新添加
+    assert loaded.add_documents([chunk(TEXT, "c.txt")]) == [2]
@@ -0,0 +1,44 @@
+import random
+
+import pytest
+
+from src.document_processor.processor import DocumentProcessor
+from src.document_processor.splitter import count_tokens
+
+WORDS = ["向量", "检索", "文本", "模型", "alpha", "beta", "gamma", "数据库", "索引"]
+PUNCTUATION = ["。", "，", " ", "！", ".", "\n", "\n\n", "？", ""]
+
+
+def random_segments(rng):
+    segments = ["".join(rng.choice(WORDS) + rng.choice(PUNCTUATION) for _ in range(rng.randint(1, 60)))
+                for _ in range(rng.randint(1, 400))]
+    # 所有分隔符都出现在第一个文本段中，流式分块与整篇分块选择相同的顶层分隔符
+    segments.insert(0, "开头。！？. 结束")
+    return segments
+
+
+def stream_spans(processor, segments):
+    chunks = processor._chunk_segments(((None, segment) for segment in segments), "test.txt")
+    return [(chunk["metadata"]["start_index"], chunk["metadata"]["end_index"]) for chunk in chunks]
+
+
+@pytest.mark.parametrize("seed", range(60))
+def test_stream_chunks_match_whole_text(seed):
+    rng = random.Random(seed)
+    chunk_size = rng.choice([20, 50, 100, 300, 1000])
+    chunk_overlap = rng.choice([0, chunk_size // 10, chunk_size // 5, chunk_size // 2])
+    length_function = rng.choice([None, count_tokens])
+    processor = DocumentProcessor(chunk_size=chunk_size, chunk_overlap=chunk_overlap,
+                                  length_function=length_function)
+    segments = random_segments(rng)
+
+    text = processor._clean_text("".join(segments))
+    assert stream_spans(processor, segments) == processor.text_splitter.split_spans(text)
+
+
+def test_stream_chunks_without_separators():
+    # 不含任何分隔符的文本逐字切分，缓冲区仍可分批输出
+    processor = DocumentProcessor(chunk_size=100, chunk_overlap=20)
+    segments = ["向量检索数据库索引" * 50] * 40
+    text = processor._clean_text("".join(segments))
+    assert stream_spans(processor, segments) == processor.text_splitter.split_spans(text)
@@ -0,0 +1,40 @@
+import asyncio
+
+from src.models.http_client import TokenCache
+
+
+def test_async_background_refresh(capsys):
+    cache = TokenCache(refresh_ratio=1.0)  # 每次获取都触发后台刷新
+    results = iter([("t1", 60), RuntimeError("网络错误"), ("t2", 60)])
+
+    async def fetch():
+        result = next(results)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    async def main():
+        assert await cache.aget("key", fetch) == "t1"
+        # 刷新失败时保留旧令牌，并输出警告
+        assert await cache.aget("key", fetch) == "t1"
+        assert len(cache._refresh_tasks) == 1
+        await asyncio.gather(*cache._refresh_tasks, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert "后台刷新访问令牌失败: 网络错误" in capsys.readouterr().out
+
+        # 被取消的刷新不会阻止之后的刷新
+        assert await cache.aget("key", fetch) == "t1"
+        tasks = list(cache._refresh_tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert not cache._refresh_tasks and not cache._refreshing
+
+        assert await cache.aget("key", fetch) == "t1"
+        await asyncio.gather(*cache._refresh_tasks)
+        await asyncio.sleep(0)
+        assert not cache._refresh_tasks
+
+    asyncio.run(main())
+    assert cache._entries["key"]["token"] == "t2"
@@ -0,0 +1,110 @@
+import threading
+
+import pytest
+
+from src.config import DOCUMENT_PROCESSING, VECTOR_STORE_CONFIG
+from src.server.knowledge_base import KnowledgeBaseService
+from src.vector_store.embeddings import get_embedder
+from src.vector_store.vector_store import VectorStore
+
+SHARED = "向量检索把文本映射为向量，再按距离查找最相近的文本块。" * 4
+OTHER = "流式生成让模型边生成边返回，首字延迟决定了用户等待的时间。" * 4
+
+
+@pytest.fixture(params=[False, True], ids=["per_source_dedup", "cross_source_dedup"])
+def service(request, tmp_path, monkeypatch):
+    monkeypatch.setitem(DOCUMENT_PROCESSING, "cross_source_dedup", request.param)
+    return KnowledgeBaseService(directory=str(tmp_path / "stores"), embedder=get_embedder("hash"))
+
+
+def write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def contents(service, query):
+    return [doc["content"] for doc in service.search("kb", query, k=5, mode="vector")]
+
+
+def test_remove_overlapping_sources(service, tmp_path):
+    service.ingest("kb", write(tmp_path, "a.txt", SHARED))
+    service.ingest("kb", write(tmp_path, "b.txt", SHARED + "\n\n" + OTHER))
+    store = service.get_store("kb")
+    assert sorted(store.sources()) == ["a.txt", "b.txt"]
+
+    # 删除a.txt后，b.txt的全部内容仍可检索
+    service.remove("kb", "a.txt")
+    assert store.sources() == ["b.txt"]
+    assert any(SHARED[:20] in content for content in contents(service, SHARED))
+    assert any(OTHER[:20] in content for content in contents(service, OTHER))
+
+    # 重新加载后来源信息不变
+    reloaded = VectorStore.load(service.directory, "kb", embedder=service.embedder)
+    assert reloaded.sources() == ["b.txt"]
+    assert len(reloaded) == len(store)
+
+    service.remove("kb", "b.txt")
+    assert len(store) == 0
+    assert store.sources() == []
+    assert contents(service, SHARED) == []
+
+
+def test_remove_keeps_identical_source(service, tmp_path):
+    service.ingest("kb", write(tmp_path, "a.txt", SHARED))
+    result = service.ingest("kb", write(tmp_path, "b.txt", SHARED))
+    store = service.get_store("kb")
+    assert sorted(store.sources()) == ["a.txt", "b.txt"]
+    if DOCUMENT_PROCESSING["cross_source_dedup"]:
+        assert result["added"] == 0
+
+    service.remove("kb", "a.txt")
+    assert store.sources() == ["b.txt"]
+    assert len(store) > 0
+    assert contents(service, SHARED)
+
+    reloaded = VectorStore.load(service.directory, "kb", embedder=service.embedder)
+    assert reloaded.sources() == ["b.txt"]
+    assert reloaded.remove_source("b.txt") == len(store)
+
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw"])
+def test_search_during_ingest_and_remove(service, tmp_path, monkeypatch, index_type):
+    # HNSW索引在边修改边查询时会直接崩溃
+    monkeypatch.setitem(VECTOR_STORE_CONFIG, "index_type", index_type)
+    service.retrieval_cache = None  # 每次检索都查询索引
+    service.ingest("kb", write(tmp_path, "base.txt", SHARED + "\n\n" + OTHER))
+    errors = []
+    stop = threading.Event()
+
+    def search():
+        while not stop.is_set():
+            try:
+                for mode in ("vector", "lexical", "hybrid"):
+                    service.search("kb", "第3批文档的第5段", k=5, mode=mode)
+                store = service.get_store("kb")
+                store.similarity_search_batch([f"第{i}批文档" for i in range(16)], k=5)
+                store.mmr_search("向量检索", k=3)
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+
+    threads = [threading.Thread(target=search) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    try:
+        for i in range(40):
+            text = "\n\n".join(f"第{i}批文档的第{j}段，内容各不相同，编号{i * 100 + j}。" * 3 for j in range(20))
+            service.ingest("kb", write(tmp_path, f"doc{i}.txt", text))
+            if i % 2:
+                service.remove("kb", f"doc{i - 1}.txt")
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    assert errors == []
+    store = service.get_store("kb")
+    assert sorted(store.sources()) == sorted(["base.txt"] + [f"doc{i}.txt" for i in range(1, 40, 2)])
+    results = service.search("kb", "流式生成 首字延迟", k=3, mode="lexical")
+    assert results[0]["metadata"]["source"] == "base.txt"
@@ -0,0 +1,40 @@
+import random
+
+import pytest
+
+from src.document_processor.splitter import DEFAULT_SEPARATORS, RecursiveTextSplitter, count_tokens
+
+WORDS = ["向量", "检索", "文本", "模型", "alpha", "beta", "gamma", "数据库", "索引", "x" * 40]
+PUNCTUATION = ["。", "，", " ", "  ", "！", "？", ".", "!", "?", "\n", "\n\n", " \n ", ""]
+
+
+def random_text(rng):
+    return "".join(rng.choice(WORDS) + rng.choice(PUNCTUATION) for _ in range(rng.randint(0, 400)))
+
+
+@pytest.mark.parametrize("seed", range(100))
+def test_matches_langchain(seed):
+    text_splitters = pytest.importorskip("langchain_text_splitters")
+    rng = random.Random(seed)
+    chunk_size = rng.choice([5, 20, 50, 100, 300])
+    chunk_overlap = rng.choice([0, chunk_size // 10, chunk_size // 5, chunk_size // 2])
+    length_function = rng.choice([None, count_tokens])
+    text = random_text(rng)
+
+    splitter = RecursiveTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap,
+                                     separators=DEFAULT_SEPARATORS, length_function=length_function)
+    reference = text_splitters.RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size, chunk_overlap=chunk_overlap, separators=DEFAULT_SEPARATORS, keep_separator=True,
+        length_function=length_function or len)
+
+    assert splitter.split_text(text) == reference.split_text(text)
+
+
+def test_spans_point_into_text():
+    text = "第一段。第二段！\n\n第三段很长" + "，内容" * 50 + "\n结尾"
+    splitter = RecursiveTextSplitter(chunk_size=30, chunk_overlap=10)
+    spans = splitter.split_spans(text)
+    assert [text[start:end] for start, end in spans] == splitter.split_text(text)
+    assert all(start < end for start, end in spans)
+    assert [start for start, _ in spans] == sorted(start for start, _ in spans)
+
@@ -0,0 +1,118 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from src.vector_store.storage import DiskStorage, LazyDocumentList
+
+DIM = 4
+
+
+def make_docs(start, n):
+    return [{"content": f"文本块{i}，内容{'很长' * i}", "metadata": {"source": f"{i % 3}.txt", "chunk_id": i}}
+            for i in range(start, start + n)]
+
+
+def make_vectors(start, n):
+    return np.arange(start * DIM, (start + n) * DIM, dtype=np.float32).reshape(n, DIM)
+
+
+def test_append_and_reload(tmp_path):
+    path = str(tmp_path / "store")
+    storage = DiskStorage(path, embedding_dim=DIM)
+    storage.append(make_docs(0, 3), make_vectors(0, 3))
+    storage.append(make_docs(3, 2), make_vectors(3, 2))
+    storage.close()
+
+    reloaded = DiskStorage(path)
+    assert len(reloaded) == 5
+    assert [reloaded.get_document(i) for i in range(5)] == make_docs(0, 5)
+    np.testing.assert_array_equal(reloaded.vectors(), make_vectors(0, 5))
+    with pytest.raises(IndexError):
+        reloaded.get_document(5)
+
+
+def test_remap_keeps_earlier_mapping_valid(tmp_path):
+    storage = DiskStorage(str(tmp_path / "store"), embedding_dim=DIM)
+    assert storage.vectors().shape == (0, DIM)
+    storage.append(make_docs(0, 2), make_vectors(0, 2))
+    before = storage.vectors()
+    storage.append(make_docs(2, 3), make_vectors(2, 3))
+
+    # 追加后重新映射，之前取得的映射仍可读取
+    np.testing.assert_array_equal(before, make_vectors(0, 2))
+    np.testing.assert_array_equal(storage.vectors(), make_vectors(0, 5))
+    assert storage.get_document(4) == make_docs(4, 1)[0]
+
+
+def test_uncommitted_bytes_are_truncated(tmp_path):
+    path = str(tmp_path / "store")
+    storage = DiskStorage(path, embedding_dim=DIM)
+    storage.append(make_docs(0, 2), make_vectors(0, 2))
+    # 模拟写入数据后、更新manifest前中断
+    for name in (DiskStorage.VECTORS, DiskStorage.TEXTS, DiskStorage.META, DiskStorage.RECORDS):
+        with open(os.path.join(path, name), "ab") as f:
+            f.write(b"\xff" * 37)
+    storage.close()
+
+    reloaded = DiskStorage(path)
+    assert len(reloaded) == 2
+    reloaded.append(make_docs(2, 2), make_vectors(2, 2))
+    assert [reloaded.get_document(i) for i in range(4)] == make_docs(0, 4)
+    np.testing.assert_array_equal(reloaded.vectors(), make_vectors(0, 4))
+
+
+def test_deleted_ids_and_updates(tmp_path):
+    path = str(tmp_path / "store")
+    storage = DiskStorage(path, embedding_dim=DIM)
+    storage.append(make_docs(0, 4), make_vectors(0, 4))
+    storage.append_deleted([1])
+    storage.append_deleted([3])
+    updated = dict(make_docs(2, 1)[0], metadata={"source": "new.txt", "sources": ["2.txt", "new.txt"]})
+    storage.update_documents({2: updated})
+    # 更新之后追加的文档不能覆盖追加在meta.bin末尾的新元数据
+    storage.append(make_docs(4, 1), make_vectors(4, 1))
+    with pytest.raises(IndexError):
+        storage.update_documents({9: updated})
+    storage.close()
+
+    reloaded = DiskStorage(path)
+    assert reloaded.deleted_ids().tolist() == [1, 3]
+    assert reloaded.get_document(2) == updated
+    assert [reloaded.get_document(i) for i in (0, 1, 3, 4)] == [make_docs(i, 1)[0] for i in (0, 1, 3, 4)]
+
+
+def test_format_errors(tmp_path):
+    with pytest.raises(ValueError):
+        DiskStorage(str(tmp_path / "missing"))
+
+    path = str(tmp_path / "store")
+    DiskStorage(path, embedding_dim=DIM).close()
+    manifest_path = os.path.join(path, DiskStorage.MANIFEST)
+    with open(manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    manifest["format_version"] += 1
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    with pytest.raises(ValueError):
+        DiskStorage(path)
+
+
+def test_lazy_document_list(tmp_path):
+    storage = DiskStorage(str(tmp_path / "store"), embedding_dim=DIM)
+    storage.append(make_docs(0, 2), make_vectors(0, 2))
+    documents = LazyDocumentList(storage)
+    documents.extend(make_docs(2, 2))
+    assert len(documents) == 4
+    assert list(documents) == make_docs(0, 4)
+
+    replaced = {"content": "替换", "metadata": {}}
+    documents[0] = replaced
+    documents[-1] = replaced
+    assert documents[0] == replaced and documents.modified == {0: replaced}
+    assert documents[3] == replaced
+    documents.release(0)
+    documents.release(3)
+    assert documents[0] == make_docs(0, 1)[0]
+    assert documents[3] is None
@@ -0,0 +1,111 @@
+import threading
+
+import numpy as np
+import pytest
+
+from src.vector_store.vector_store import VectorStore
+
+# IVF探测全部聚类、HNSW搜索宽度不小于向量数量，检索结果与精确检索一致
+INDEX_PARAMS = {"flat": {}, "ivf_flat": {"nlist": 4, "nprobe": 4}, "hnsw": {"ef_search": 400}}
+
+
+def make_store(index_type, **kwargs):
+    return VectorStore(embedding_dim=64, index_type=index_type, index_params=INDEX_PARAMS[index_type], **kwargs)
+
+
+def make_docs(source, n):
+    return [{"content": f"{source}的第{i}段：向量检索 文本{i} 关键词{i * 7 % 13}", "metadata": {"source": source}}
+            for i in range(n)]
+
+
+def exact_ids(store, query, k):
+    live_ids = [doc_id for doc_id in range(len(store.documents)) if doc_id not in store.deleted_ids]
+    distances = ((store.get_embeddings(live_ids) - store.embed_batch([query])[0]) ** 2).sum(axis=1)
+    return [live_ids[i] for i in np.argsort(distances, kind="stable")[:k]]
+
+
+def check_search(store, deleted_contents):
+    live_contents = [store.documents[doc_id]["content"] for doc_id in (3, 50, 150, 199)]
+    for query in live_contents + deleted_contents:
+        results = store.similarity_search(query, k=5)
+        ids = [doc["id"] for doc in results]
+        assert not set(ids) & store.deleted_ids
+        assert ids == exact_ids(store, query, 5)
+        if query in live_contents:
+            assert results[0]["content"] == query
+
+
+@pytest.mark.parametrize("index_type", list(INDEX_PARAMS))
+def test_remove_compact_and_reload(index_type, tmp_path):
+    store = make_store(index_type, compaction_threshold=2.0)  # 不自动压缩
+    store.add_documents(make_docs("a.txt", 200) + make_docs("b.txt", 100))
+    deleted_contents = [store.documents[doc_id]["content"] for doc_id in (0, 1, 2, 210)]
+
+    assert store.remove_source("b.txt") == 100
+    assert store.remove_documents([0, 1, 2, 2, 250, 1000]) == 3
+    assert len(store) == 197
+    assert store.sources() == ["a.txt"]
+    # 只有HNSW索引不支持物理删除，改为查询时过滤
+    assert bool(store._masked_ids) == (index_type == "hnsw")
+    check_search(store, deleted_contents)
+
+    assert store.compact() == (index_type == "hnsw")
+    assert not store._masked_ids
+    assert store.search_index.ntotal == 197
+    check_search(store, deleted_contents)
+
+    store.save(str(tmp_path), "kb")
+    loaded = VectorStore.load(str(tmp_path), "kb", embedder=store.embedder)
+    assert len(loaded) == 197 and loaded.deleted_ids == store.deleted_ids
+    check_search(loaded, deleted_contents)
+
+
+def test_load_compacts_masked_deletions(tmp_path):
+    store = make_store("hnsw", compaction_threshold=2.0)
+    store.add_documents(make_docs("a.txt", 200) + make_docs("b.txt", 100))
+    store.save(str(tmp_path), "kb")
+    deleted_contents = [store.documents[doc_id]["content"] for doc_id in (200, 299)]
+    store.remove_source("b.txt")
+    store.save(str(tmp_path), "kb")
+
+    # 索引快照中仍有被过滤的已删除向量，超过阈值时加载后在后台重建索引
+    loaded = VectorStore.load(str(tmp_path), "kb", embedder=store.embedder)
+    loaded._compaction_thread.join()
+    assert not loaded._masked_ids
+    assert loaded.search_index.ntotal == 200
+    check_search(loaded, deleted_contents)
+
+
+@pytest.mark.parametrize("index_type", list(INDEX_PARAMS))
+def test_search_during_add_and_remove(index_type):
+    # 边修改边查询时，HNSW索引会崩溃，flat索引会重建已删除的向量而报错
+    store = make_store(index_type, lexical=True)
+    store.add_documents(make_docs("base", 300))
+    errors = []
+    stop = threading.Event()
+
+    def search():
+        while not stop.is_set():
+            try:
+                for results in store.similarity_search_batch(["文本3", "文本7"] * 8, k=5):
+                    assert all(doc["metadata"]["source"] is not None for doc in results)
+                store.search("文本5", k=3, mode="hybrid")
+                store.mmr_search("文本9", k=3)
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+
+    threads = [threading.Thread(target=search) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    try:
+        for i in range(60):
+            store.add_documents(make_docs(f"s{i}", 40))
+            store.remove_source(f"s{i}")
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    assert errors == []
+    assert len(store) == 300 and store.sources() == ["base"]